@@ -0,0 +1,422 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# pylint: disable=line-too-long,invalid-name
+
+"""Module runs the widget fetchers in a process of its own so the library
+queries and transforms do not compete with Kodi's GUI for the embedded
+interpreter.  The engine talks to Kodi's JSON-RPC TCP interface over one
+persistent connection, the requests of widgets fetched together are
+pipelined on it and only the final properties of each widget go back to
+the service.  The service starts the engine with EngineProcess and sends
+json lines on its stdin, one line per batch, and reads one line per
+widget and a final done line from its stdout, an engine that sends
+nothing for a while is stopped and started again with the next batch:
+    {"widgets": ["RecentMovie"], "settings": {...}, "addonid": "...", "unwatched_plot": "...", "playlists": [...], "deadline": 10, "limit": 20, "limits": {...}, "workers": 4}
+    {"widget": "RecentMovie", "properties": {"RecentMovie.1.Title": "..."}}
+    {"done": true}
+Library and PVR notifications on the connection keep the recently added
+marks, the library index and the PVR cache current.
+Does not import xbmc, run as "python3 -m resources.lib.engine --port 9090"
+from the addon folder, --host and --port also point it at a test server
+
+"""
+
+import argparse
+import codecs
+import concurrent.futures
+import itertools
+import json
+import queue
+import socket
+import subprocess
+import sys
+import threading
+import types
+
+from resources.lib.fetchers import Widgets_Fetcher
+from resources.lib.window import PropertyRecorder, WidgetWindow
+
+# widgets fetched at the same time, their requests share the connection
+ENGINE_WORKERS = 4
+# seconds to wait for a response before the request fails
+RESPONSE_TIMEOUT = 30
+# seconds the service waits for the next line of the engine
+ENGINE_TIMEOUT = 60
+
+
+class JsonRpcConnection:
+    """persistent connection to Kodi's JSON-RPC TCP interface.  Requests
+    from several threads are sent without waiting for earlier responses,
+    a reader thread hands each response to the request with its id
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 9090,
+                 timeout: float = RESPONSE_TIMEOUT, notification=None):
+        """
+        Args:
+            host (str, optional): Kodi host
+            port (int, optional): JSON-RPC TCP port
+            timeout (float, optional): seconds to wait for a response
+            notification (callable, optional): called with method and JSON
+            data for every Kodi notification
+        """
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.notification = notification
+        self.sock = None
+        self.ids = itertools.count(1)
+        # request id: [event, response, socket it was sent on]
+        self.waiting = {}
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        """opens the connection and starts its reader, called with the lock
+        held
+        """
+        sock = socket.create_connection((self.host, self.port),
+                                        timeout=self.timeout)
+        sock.settimeout(None)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = sock
+        threading.Thread(target=self._read, args=(sock,), daemon=True,
+                         name='SkinWidgetsEngineReader').start()
+
+    def _read(self, sock: socket.socket):
+        """reads the json messages Kodi sends back to back until the
+        connection closes, then fails the requests still waiting
+
+        Args:
+            sock (socket.socket): the connection
+        """
+        decoder = json.JSONDecoder()
+        text = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        buffer = ''
+        while True:
+            try:
+                chunk = sock.recv(65536)
+            except OSError:
+                chunk = b''
+            if not chunk:
+                break
+            buffer += text.decode(chunk)
+            while True:
+                buffer = buffer.lstrip()
+                if not buffer:
+                    break
+                try:
+                    message, end = decoder.raw_decode(buffer)
+                except ValueError:
+                    # incomplete, wait for more
+                    break
+                buffer = buffer[end:]
+                self._deliver(message)
+        with self.lock:
+            if self.sock is sock:
+                self.sock = None
+            failed = [request_id for request_id, slot in self.waiting.items()
+                      if slot[2] is sock]
+            failed = [self.waiting.pop(request_id) for request_id in failed]
+        for slot in failed:
+            slot[0].set()
+
+    def _deliver(self, message: dict):
+        """hands a response to its request, notifications to the callback
+
+        Args:
+            message (dict): decoded message
+        """
+        if 'id' not in message:
+            if self.notification is not None and 'method' in message:
+                self.notification(message['method'], json.dumps(
+                    message.get('params', {}).get('data')))
+            return
+        with self.lock:
+            slot = self.waiting.pop(message['id'], None)
+        if slot is not None:
+            slot[1] = message
+            slot[0].set()
+
+    def execute(self, request: str) -> str:
+        """sends a JSON-RPC request and waits for its response
+
+        Args:
+            request (str): JSON-RPC request
+
+        Returns:
+            str: JSON-RPC response, an error response if the connection
+            failed or timed out
+        """
+        request = json.loads(request)
+        original = request.get('id', 1)
+        request['id'] = next(self.ids)
+        slot = [threading.Event(), None, None]
+        data = json.dumps(request).encode('utf-8')
+        try:
+            with self.lock:
+                self.waiting[request['id']] = slot
+                for attempt in (1, 2):
+                    try:
+                        if self.sock is None:
+                            self._connect()
+                        slot[2] = self.sock
+                        self.sock.sendall(data)
+                        break
+                    except OSError:
+                        # reconnect once after a dropped connection
+                        self._close()
+                        if attempt == 2:
+                            raise
+        except OSError as error:
+            with self.lock:
+                self.waiting.pop(request['id'], None)
+            return error_response(original, f'not connected: {error}')
+        if not slot[0].wait(self.timeout):
+            with self.lock:
+                self.waiting.pop(request['id'], None)
+            return error_response(original, 'timeout')
+        if slot[1] is None:
+            return error_response(original, 'connection closed')
+        slot[1]['id'] = original
+        return json.dumps(slot[1])
+
+    def _close(self):
+        """closes the socket, called with the lock held"""
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
+    def close(self):
+        """closes the connection"""
+        with self.lock:
+            self._close()
+
+
+def error_response(request_id, message: str) -> str:
+    """builds a JSON-RPC error response, fetchers skip a widget on errors
+
+    Args:
+        request_id: id of the request
+        message (str): error message
+
+    Returns:
+        str: JSON-RPC response
+    """
+    return json.dumps({'jsonrpc': '2.0', 'id': request_id, 'error': {
+        'code': -32000, 'message': message}})
+
+
+class Engine:
+    """fetches widgets on a JSON-RPC connection, the recently added marks
+    are kept between batches
+    """
+
+    def __init__(self, connection: JsonRpcConnection,
+                 workers: int = ENGINE_WORKERS):
+        """
+        Args:
+            connection (JsonRpcConnection): connection to Kodi
+            workers (int, optional): widgets fetched at the same time
+        """
+        self.window = WidgetWindow(PropertyRecorder())
+        self.fetcher = Widgets_Fetcher(self.window, connection.execute, '', '')
+        self.connection = connection
+        self.workers = workers
+        connection.notification = self._notification
+
+    def _notification(self, method: str, data: str):
+        """keeps the recently added marks, the library index and the PVR
+        cache current
+
+        Args:
+            method (str): notification ie VideoLibrary.OnUpdate
+            data (str): JSON notification data
+        """
+        self.fetcher.watermark.notification(method, data)
+        self.fetcher.index.notification(method, data)
+        self.fetcher.pvr.notification(method, data)
+
+    def fetch(self, batch: dict):
+        """fetches a batch of widgets
+
+        Args:
+            batch (dict): widgets, settings, addonid, unwatched_plot,
+            playlist folders and optionally the seconds a request may take
+            and the item counts and workers chosen by the auto-tuner
+
+        Yields:
+            dict: the result line of each widget
+        """
+        self.fetcher.settings = types.SimpleNamespace(**batch['settings'])
+        self.fetcher.addonid = batch.get('addonid', '')
+        self.fetcher.unwatched_plot = batch.get('unwatched_plot', '')
+        self.fetcher.LIMIT = batch.get('limit', self.fetcher.LIMIT)
+        self.fetcher.limits = batch.get('limits', {})
+        self.connection.timeout = batch.get('deadline', RESPONSE_TIMEOUT)
+        if batch.get('playlists'):
+            self.fetcher.playlists.directories = batch['playlists']
+            self.fetcher.playlists.scan()
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=batch.get('workers', self.workers)) as pool:
+            futures = {pool.submit(self._fetch, request): request
+                       for request in batch['widgets']}
+            for future in concurrent.futures.as_completed(futures):
+                request = futures[future]
+                try:
+                    yield {'widget': request, 'properties': future.result()}
+                except Exception as error:  # pylint: disable=broad-except
+                    yield {'widget': request, 'error': repr(error)}
+
+    def _fetch(self, request: str) -> dict:
+        """runs the fetcher of a widget
+
+        Args:
+            request (str): widget request ie RecentMovie
+
+        Returns:
+            dict: the widget properties by key
+        """
+        self.fetcher.fetch(request)
+        return self.window.widget(request)
+
+
+class EngineProcess:
+    """starts the fetch engine and exchanges batches with it, used by the
+    service inside Kodi
+    """
+
+    def __init__(self, command: list, cwd: str,
+                 timeout: float = ENGINE_TIMEOUT):
+        """
+        Args:
+            command (list): command line of the engine ie
+            ["python3", "-m", "resources.lib.engine", "--port", "9090"]
+            cwd (str): addon folder the engine runs in
+            timeout (float, optional): seconds to wait for the next line
+            before the engine is stopped
+        """
+        self.command = command
+        self.cwd = cwd
+        self.timeout = timeout
+        self.process = None
+        # lines read from the engine's stdout, None when it closed
+        self.lines = None
+        self.lock = threading.Lock()
+
+    def _start(self):
+        """starts the engine and the reader of its stdout, called with the
+        lock held
+        """
+        self.process = subprocess.Popen(
+            self.command, cwd=self.cwd, stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE, encoding='utf-8', bufsize=1)
+        self.lines = queue.Queue()
+
+        def read(stdout, lines):
+            for line in stdout:
+                lines.put(line)
+            lines.put(None)
+
+        threading.Thread(target=read, args=(self.process.stdout, self.lines),
+                         daemon=True, name='SkinWidgetsEngineOutput').start()
+
+    def fetch(self, widgets: list, batch: dict) -> dict:
+        """fetches widgets in the engine, started on first use and again
+        after it exited or was stopped
+
+        Args:
+            widgets (list): widget requests ie RecentMovie
+            batch (dict): settings, addonid and unwatched_plot
+
+        Raises:
+            OSError: the engine could not be started or exited,
+            TimeoutError if it sent nothing for timeout seconds
+
+        Returns:
+            dict: properties by widget, widgets that failed are missing
+        """
+        with self.lock:
+            if self.process is None or self.process.poll() is not None:
+                self._start()
+            try:
+                self.process.stdin.write(
+                    json.dumps(dict(batch, widgets=widgets)) + '\n')
+                self.process.stdin.flush()
+            except OSError:
+                self._stop()
+                raise
+            results = {}
+            while True:
+                try:
+                    line = self.lines.get(timeout=self.timeout)
+                except queue.Empty as error:
+                    self._stop()
+                    raise TimeoutError(f'fetch engine sent nothing for '
+                                       f'{self.timeout} s') from error
+                if not line:
+                    self._stop()
+                    raise OSError('fetch engine exited')
+                message = json.loads(line)
+                if message.get('done'):
+                    return results
+                if 'properties' in message:
+                    results[message['widget']] = message['properties']
+
+    def _stop(self):
+        """stops the engine, called with the lock held"""
+        if self.process is not None:
+            self.process.kill()
+            self.process.wait()
+            self.process = None
+
+    def close(self):
+        """stops the engine"""
+        with self.lock:
+            self._stop()
+
+
+def main(argv: list = None):
+    """runs the engine on the batches read from stdin
+
+    Args:
+        argv (list, optional): command line arguments
+    """
+    parser = argparse.ArgumentParser(description='Skin Widgets fetch engine')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9090)
+    parser.add_argument('--workers', type=int, default=ENGINE_WORKERS)
+    args = parser.parse_args(argv)
+    connection = JsonRpcConnection(args.host, args.port)
+    engine = Engine(connection, args.workers)
+    try:
+        for line in sys.stdin:
+            if not line.strip():
+                continue
+            for result in engine.fetch(json.loads(line)):
+                sys.stdout.write(json.dumps(result) + '\n')
+            sys.stdout.write('{"done": true}\n')
+            sys.stdout.flush()
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# pylint: disable=line-too-long,invalid-name
+
+"""Module runs the widget fetchers, each queries the library through
+JSON-RPC and sets the widget properties ie "RecentMovie.<n>.Title" on a
+window.  The fetchers of each media type live in resources.lib.providers
+and are imported with the first widget of their type.  Does not import
+xbmc, the window, JSON-RPC function and abort check are passed in, so the
+fetchers also run outside Kodi in the fetch engine.  Before a widget is
+fetched its first list query is probed for one item, the total and the
+top item's id, lastplayed, dateadded and playcount; if that fingerprint
+and the settings are unchanged since its last fetch nothing is rewritten
+
+"""
+
+import json
+import threading
+
+from resources.lib import providers, trace
+from resources.lib.index import GENRES, MAKERS, PLAYCOUNT, LibraryIndex, week_ago
+from resources.lib.playlists import PlaylistWidgets
+from resources.lib.pvr import PvrCache
+from resources.lib.watermark import RecentWatermark
+
+# plot and description length in low memory mode
+TEXT_LIMIT = 400
+# widgets computed from the library index: media type, group by, sum of
+# (0 counts items), only items added this week
+AGGREGATE_WIDGETS = {
+    'TopGenreMovie': ('movie', GENRES, 0, False),
+    'TopGenreTVShow': ('tvshow', GENRES, 0, False),
+    'NewStudioMovie': ('movie', MAKERS, 0, True),
+    'NewStudioTVShow': ('tvshow', MAKERS, 0, True),
+    'TopArtist': ('album', MAKERS, PLAYCOUNT, False),
+}
+# list methods probed before a widget is fetched: result key, id key
+PROBE_METHODS = {
+    'VideoLibrary.GetMovies': ('movies', 'movieid'),
+    'VideoLibrary.GetTVShows': ('tvshows', 'tvshowid'),
+    'VideoLibrary.GetEpisodes': ('episodes', 'episodeid'),
+    'VideoLibrary.GetMusicVideos': ('musicvideos', 'musicvideoid'),
+    'AudioLibrary.GetAlbums': ('albums', 'albumid'),
+    'AudioLibrary.GetSongs': ('songs', 'songid'),
+}
+PROBE_PROPERTIES = ['lastplayed', 'dateadded', 'playcount']
+# played media type: details method, result key, provider of its widgets
+PLAYED_TYPES = {
+    'movie': ('VideoLibrary.GetMovieDetails', 'moviedetails', 'movies'),
+    'episode': ('VideoLibrary.GetEpisodeDetails', 'episodedetails',
+                'episodes'),
+    'musicvideo': ('VideoLibrary.GetMusicVideoDetails', 'musicvideodetails',
+                   'musicvideos'),
+}
+
+
+class Unchanged(Exception):
+    """raised by the probe of a widget whose items have not changed"""
+
+
+class Widgets_Fetcher:
+    """sets the properties of a widget from library queries
+    """
+
+    def __init__(self, window, execute, addonid: str, unwatched_plot: str,
+                 abort=lambda: False):
+        """
+        Args:
+            window (WidgetWindow): the window properties are set on
+            execute (callable): sends a JSON-RPC request, returns the response
+            addonid (str): id of this addon for the play actions
+            unwatched_plot (str): plot shown for unwatched items if plots are
+            hidden
+            abort (callable, optional): returns True if Kodi is exiting
+        """
+        self.WINDOW = window
+        self.send = execute
+        self.addonid = addonid
+        self.unwatched_plot = unwatched_plot
+        self.abort = abort
+        # Widgets_Settings or any object with the same attributes
+        self.settings = None
+        # largest item count, widgets may fetch fewer, see limit
+        self.LIMIT = 20
+        # request: item count chosen by the auto-tuner
+        self.limits = {}
+        # items and dateadded marks of the recently added widgets
+        self.watermark = RecentWatermark(self.execute)
+        # genres, studios and playcounts for the aggregate widgets
+        self.index = LibraryIndex(execute)
+        # smart playlist widgets, the service sets the folders
+        self.playlists = PlaylistWidgets()
+        # recordings and timers kept current from PVR notifications
+        self.pvr = PvrCache(execute)
+        # request: (query, fingerprint) of its last completed fetch
+        self.fingerprints = {}
+        # widget whose first query is probed and the fingerprint seen,
+        # per fetching thread
+        self.local = threading.local()
+
+    def fetch(self, request: str):
+        """runs the fetcher of a widget
+
+        Args:
+            request (str): widget request ie RecommendedEpisode
+        """
+        # playlists are fetched like their type with their sort and filter
+        kind = self._kind(request)
+        if not kind:
+            self.clear(request)
+            return
+        if request in AGGREGATE_WIDGETS:
+            self._fetch_aggregate(request)
+        elif providers.provider(kind):
+            self.local.probe, self.local.seen = request, None
+            try:
+                providers.load(providers.provider(kind)).fetch(self, request)
+            except Unchanged:
+                trace.event('%s unchanged', request)
+                return
+            finally:
+                self.local.probe = None
+            if self.local.seen is not None:
+                self.fingerprints[request] = self.local.seen
+        if kind != request:
+            self.WINDOW.setProperty(f"{request}.Name", (
+                self.playlists.playlist(request) or {}).get('name', ''))
+
+    def execute(self, query: str) -> str:
+        """sends a JSON-RPC request for the providers, the first list query
+        of a widget fetch is probed first
+
+        Args:
+            query (str): the JSON-RPC request
+
+        Returns:
+            str: the response
+
+        Raises:
+            Unchanged: the widget has the items the query would return
+        """
+        request = getattr(self.local, 'probe', None)
+        if request is not None:
+            self.local.probe = None
+            self._probe(request, query)
+        return self.send(query)
+
+    def _probe(self, request: str, query: str):
+        """fetches one item of a widget's query and compares the total and
+        the top item with the last fetch.  Random widgets and methods that
+        are not library lists are not probed.  Changes below the top item
+        are not seen, the played item is updated in place by update_item
+
+        Args:
+            request (str): widget request ie RecentMovie
+            query (str): the JSON-RPC request of the widget
+
+        Raises:
+            Unchanged: the fingerprint matches and the widget has items
+        """
+        decoded = json.loads(query)
+        params = decoded.get('params', {})
+        if (decoded.get('method') not in PROBE_METHODS
+                or params.get('sort', {}).get('method') == 'random'
+                or self.watermark.unseen(request)):
+            # added items may be dated before the mark, see watermark
+            return
+        key, id_key = PROBE_METHODS[decoded['method']]
+        probe = dict(decoded, params=dict(params, properties=PROBE_PROPERTIES,
+                                          limits={'start': 0, 'end': 1}))
+        response = json.loads(self.send(json.dumps(probe)))
+        result = response.get('result')
+        if result is None:
+            return
+        items = result.get(key) or []
+        top = items[0] if items else {}
+        seen = (json.dumps(decoded, sort_keys=True),
+                (self.settings,
+                 result.get('limits', {}).get('total', len(items)),
+                 top.get(id_key), top.get('lastplayed'),
+                 top.get('dateadded'), top.get('playcount')))
+        if (self.fingerprints.get(request) == seen
+                and self.WINDOW.getProperty(f'{request}.1.Title')):
+            raise Unchanged(request)
+        self.local.seen = seen
+
+    def forget(self, request: str):
+        """drops the fingerprint of a widget, its next fetch runs in full,
+        ie after its properties were cleared or its refresh was dropped
+
+        Args:
+            request (str): widget request ie RecentMovie
+        """
+        self.fingerprints.pop(request, None)
+
+    def update_item(self, media: str, dbid: int) -> list:
+        """sets the playcount and resume point of a library item in every
+        published widget slot showing it, ie right after it was played
+
+        Args:
+            media (str): media type ie movie
+            dbid (int): library id of the item
+
+        Returns:
+            list: the slots updated ie RecentMovie.3
+        """
+        if media not in PLAYED_TYPES:
+            return []
+        method, key, provider = PLAYED_TYPES[media]
+        slots = [slot for slot in self.WINDOW.find('DBID', str(dbid))
+                 if providers.provider(self._kind(slot.partition('.')[0]))
+                 == provider]
+        if not slots:
+            return []
+        response = json.loads(self.execute(json.dumps({
+            'jsonrpc': '2.0', 'id': 1, 'method': method, 'params': {
+                f'{media}id': dbid,
+                'properties': ['playcount', 'resume', 'plot']}})))
+        item = response.get('result', {}).get(key)
+        if not item:
+            return []
+        properties = providers.playback_properties(item)
+        # music video widgets always show the plot
+        if not self.settings.plot_enable and media != 'musicvideo':
+            properties['Plot'] = (self.text(item['plot']) if item['playcount']
+                                  else self.unwatched_plot)
+        for slot in slots:
+            for name, value in properties.items():
+                self.WINDOW.setProperty(f'{slot}.{name}', value)
+        return slots
+
+    def _kind(self, request: str) -> str:
+        """gets what a widget is fetched as
+
+        Args:
+            request (str): widget request ie PlaylistUnwatchedScifi
+
+        Returns:
+            str: the request or the fetcher suffix of a playlist widget
+        """
+        if request.startswith('Playlist'):
+            return self.playlists.fetcher(request)
+        return request
+
+    def limit(self, request: str) -> int:
+        """gets the number of items a widget fetches
+
+        Args:
+            request (str): widget request ie RecentMovie
+
+        Returns:
+            int: the tuned item count, LIMIT if the widget is not tuned
+        """
+        return min(self.limits.get(request, self.LIMIT), self.LIMIT)
+
+    def clear(self, request: str):
+        """Clears hoime window properties of the requested type
+
+        Args:
+            request (str): in progress/random/last added
+        """
+        count = 0
+        for count in range(int(self.LIMIT)):
+            count += 1
+            self.WINDOW.clearProperty(f"{request}.{count}.Title")
+
+    def _fetch_aggregate(self, request: str):
+        """sets the groups of an aggregate widget from the library index,
+        ie "TopGenreMovie.<n>.Title" and "TopGenreMovie.<n>.Count"
+
+        Args:
+            request (str): widget request ie TopGenreMovie
+        """
+        media, field, weight, new = AGGREGATE_WIDGETS[request]
+        self.index.sync(media)
+        groups = self.index.aggregate(media, field, weight,
+                                      week_ago() if new else '',
+                                      self.limit(request))
+        self.clear(request)
+        count = 0
+        for count, (name, amount) in enumerate(groups, 1):
+            self.WINDOW.setProperty(f"{request}.{count}.Title", name)
+            self.WINDOW.setProperty(f"{request}.{count}.Count", str(amount))
+        self.WINDOW.setProperty(f"{request}.Count", str(count))
+
+    def text(self, text: str) -> str:
+        """caps plots and descriptions to TEXT_LIMIT in low memory mode
+
+        Args:
+            text (str): the text
+
+        Returns:
+            str: the text, shortened if needed
+        """
+        if self.settings.lowmem_enable and len(text) > TEXT_LIMIT:
+            return text[:TEXT_LIMIT - 3] + '...'
+        return text
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# pylint: disable=line-too-long,invalid-name
+
+"""Module tags widget refreshes with a generation per widget.  A trigger
+that replaces the running work (settings change, scan finished, playback
+ended) bumps the generations of its widgets, a refresh started with an
+older generation raises Superseded at its next JSON-RPC request or item
+and its properties are never published.  Publishing and bumping share a
+lock so a refresh cannot publish between a bump and the clearing of the
+widget.  Threads outside a refresh are never stopped.  Does not import
+xbmc
+
+"""
+
+import contextlib
+import threading
+
+# request: current generation
+_current = {}
+_lock = threading.RLock()
+# widget and generation of the refresh run by the thread
+_local = threading.local()
+
+
+class Superseded(Exception):
+    """raised in a refresh whose widget a newer trigger has replaced"""
+
+
+def generation(request: str) -> int:
+    """gets the current generation of a widget
+
+    Args:
+        request (str): widget request ie RecentMovie
+
+    Returns:
+        int: the generation, 0 until the widget is first superseded
+    """
+    return _current.get(request, 0)
+
+
+def supersede(requests: list):
+    """bumps the generation of widgets, their running refreshes stop
+
+    Args:
+        requests (list): widget requests ie RECENT_WIDGETS
+    """
+    with _lock:
+        for request in requests:
+            _current[request] = _current.get(request, 0) + 1
+
+
+@contextlib.contextmanager
+def superseding(requests: list):
+    """bumps the generation of widgets and holds off publishing in the
+    with block, ie while their properties are cleared
+
+    Args:
+        requests (list): widget requests ie RECENT_WIDGETS
+    """
+    with _lock:
+        supersede(requests)
+        yield
+
+
+@contextlib.contextmanager
+def running(request: str):
+    """tags the refresh run by this thread in the with block with the
+    current generation of its widget
+
+    Args:
+        request (str): widget request ie RecentMovie
+
+    Yields:
+        int: the generation
+    """
+    previous = getattr(_local, 'running', None)
+    _local.running = (request, generation(request))
+    try:
+        yield _local.running[1]
+    finally:
+        _local.running = previous
+
+
+def check():
+    """stops the refresh of this thread if it was superseded, called
+    before each JSON-RPC request and item
+
+    Raises:
+        Superseded: a newer trigger has replaced the refresh
+    """
+    refresh = getattr(_local, 'running', None)
+    if refresh is not None and generation(refresh[0]) != refresh[1]:
+        raise Superseded(f'{refresh[0]} generation {refresh[1]} superseded')
+
+
+@contextlib.contextmanager
+def publishing():
+    """checks the refresh of this thread and holds off bumps while it
+    publishes in the with block
+
+    Raises:
+        Superseded: a newer trigger has replaced the refresh
+    """
+    with _lock:
+        check()
+        yield
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# pylint: disable=line-too-long,invalid-name
+
+"""Module limits the library queries sent to Kodi.  Queries are limited
+in concurrency and per minute, with a lower per minute budget while Kodi
+scans a library.  Does not import xbmc, the clock and wait functions
+are passed in
+
+"""
+
+import collections
+import contextlib
+import threading
+import time
+
+
+class QueryGovernor:
+    """limits concurrent and per minute library queries and tracks library
+    scans
+    """
+
+    def __init__(self, concurrency: int = 2, per_minute: int = 120,
+                 scan_per_minute: int = 20, wait=time.sleep,
+                 clock=time.monotonic):
+        """
+        Args:
+            concurrency (int, optional): queries running at the same time
+            per_minute (int, optional): queries started per minute
+            scan_per_minute (int, optional): queries started per minute
+            while a library is scanned
+            wait (callable, optional): sleeps for the given seconds, returns
+            True if the wait was aborted ie xbmc.Monitor.waitForAbort
+            clock (callable, optional): monotonic clock in seconds
+        """
+        self.per_minute = per_minute
+        self.scan_per_minute = scan_per_minute
+        self.wait = wait
+        self.clock = clock
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.started = collections.deque()
+        self.libraries = set()
+        self.lock = threading.Lock()
+        # slot of the query running on each thread, see detach
+        self.local = threading.local()
+
+    def resize(self, concurrency: int):
+        """changes the number of queries running at the same time, queries
+        already running finish in their old slots
+
+        Args:
+            concurrency (int): queries running at the same time
+        """
+        self.slots = threading.BoundedSemaphore(concurrency)
+
+    @property
+    def scanning(self) -> bool:
+        """True while any library is scanned"""
+        return bool(self.libraries)
+
+    def scan_started(self, library: str):
+        """records the start of a library scan
+
+        Args:
+            library (str): video/music
+        """
+        with self.lock:
+            self.libraries.add(library)
+
+    def scan_finished(self, library: str):
+        """records the end of a library scan
+
+        Args:
+            library (str): video/music
+        """
+        with self.lock:
+            self.libraries.discard(library)
+
+    def _delay(self) -> float:
+        """reserves a start time within the per minute budget
+
+        Returns:
+            float: seconds to wait before the query may start
+        """
+        budget = self.scan_per_minute if self.scanning else self.per_minute
+        with self.lock:
+            now = self.clock()
+            while self.started and self.started[0] <= now - 60:
+                self.started.popleft()
+            if len(self.started) < budget:
+                self.started.append(now)
+                return 0
+            return self.started[-budget] + 60 - now
+
+    @contextlib.contextmanager
+    def query(self):
+        """waits for a free slot within the limits, use as
+        "with governor.query() as allowed:", allowed is False if the wait
+        was aborted and the query should not be sent.  The slot is freed
+        at the end of the block unless it was detached
+
+        Yields:
+            bool: True if the query may be sent
+        """
+        delay = self._delay()
+        while delay > 0:
+            if self.wait(min(delay, 1)):
+                yield False
+                return
+            delay = self._delay()
+        slots = self.slots
+        slots.acquire()
+        self.local.slots = slots
+        try:
+            yield True
+        finally:
+            if self.local.slots is slots:
+                slots.release()
+            self.local.slots = None
+
+    def detach(self):
+        """keeps the slot of this thread's query taken after its with
+        block, for a query still running in Kodi after its caller gave up
+
+        Returns:
+            callable: frees the slot, None if the thread holds no slot
+        """
+        slots = getattr(self.local, 'slots', None)
+        self.local.slots = None
+        return slots.release if slots is not None else None
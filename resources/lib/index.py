@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# pylint: disable=line-too-long,invalid-name
+
+"""Module keeps a compact local index of the library for aggregate
+widgets ie top genres, new this week per studio or most played artists.
+Each item keeps only its genres, studios (artists for albums), year,
+dateadded, playcount and rating.  The index is built with paged queries
+on first use and kept current from library notifications: updated items
+are queried one by one, removed items dropped, a played song updates its
+album, and after many changes or a clean the media type is built again.
+Does not import xbmc, the JSON-RPC function is passed in
+
+"""
+
+import collections
+import datetime
+import itertools
+import json
+import threading
+import time
+
+# media type: list method, result key, id key, detail method, maker field
+INDEX_TYPES = {
+    'movie': ('VideoLibrary.GetMovies', 'movies', 'movieid',
+              'VideoLibrary.GetMovieDetails', 'studio'),
+    'tvshow': ('VideoLibrary.GetTVShows', 'tvshows', 'tvshowid',
+               'VideoLibrary.GetTVShowDetails', 'studio'),
+    'album': ('AudioLibrary.GetAlbums', 'albums', 'albumid',
+              'AudioLibrary.GetAlbumDetails', 'artist'),
+}
+# items per query when building
+PAGE_SIZE = 5000
+# changed items queried one by one, more rebuild the media type
+MAX_UPDATES = 50
+
+GENRES = 0
+MAKERS = 1
+YEAR = 2
+DATEADDED = 3
+PLAYCOUNT = 4
+RATING = 5
+
+
+class LibraryIndex:
+    """per media type map of item id to (genres, makers, year, dateadded,
+    playcount, rating), names are interned so each genre or studio is
+    stored once
+    """
+
+    def __init__(self, execute):
+        """
+        Args:
+            execute (callable): sends a JSON-RPC request, returns the response
+        """
+        self.execute = execute
+        # media type: {id: entry}
+        self.items = {}
+        # media type: ids changed since the last sync, None to rebuild
+        self.changed = {}
+        # songs changed since the last album sync, their albums are updated
+        self.songs = set()
+        self.names = {}
+        self.lock = threading.Lock()
+
+    def _name(self, name: str) -> str:
+        """gets the stored copy of a genre, studio or artist
+
+        Args:
+            name (str): the name
+
+        Returns:
+            str: the one stored copy
+        """
+        return self.names.setdefault(name, name)
+
+    def _entry(self, media: str, item: dict) -> tuple:
+        """builds the compact entry of an item
+
+        Args:
+            media (str): media type ie movie
+            item (dict): item of a JSON-RPC result
+
+        Returns:
+            tuple: genres, makers, year, dateadded, playcount, rating
+        """
+        return (tuple(self._name(genre) for genre in item.get('genre', [])),
+                tuple(self._name(maker) for maker
+                      in item.get(INDEX_TYPES[media][4], [])),
+                item.get('year', 0), item.get('dateadded', ''),
+                item.get('playcount', 0), float(item.get('rating', 0)))
+
+    def _query(self, method: str, params: dict) -> dict:
+        """sends a JSON-RPC request
+
+        Args:
+            method (str): method ie VideoLibrary.GetMovies
+            params (dict): parameters
+
+        Returns:
+            dict: the result, empty on errors
+        """
+        response = json.loads(self.execute(json.dumps({
+            'jsonrpc': '2.0', 'id': 1, 'method': method, 'params': params})))
+        return response.get('result') or {}
+
+    def _properties(self, media: str) -> list:
+        """gets the item properties the index keeps
+
+        Args:
+            media (str): media type ie movie
+
+        Returns:
+            list: JSON-RPC property names
+        """
+        return ['genre', INDEX_TYPES[media][4], 'year', 'dateadded',
+                'playcount', 'rating']
+
+    def build(self, media: str):
+        """builds the index of a media type with paged queries, a failed
+        query keeps the previous index
+
+        Args:
+            media (str): media type ie movie
+        """
+        method, key, id_key, _, _ = INDEX_TYPES[media]
+        items = {}
+        start = 0
+        while True:
+            result = self._query(method, {
+                'properties': self._properties(media),
+                'limits': {'start': start, 'end': start + PAGE_SIZE}})
+            if not result:
+                return
+            page = result.get(key, [])
+            for item in page:
+                items[item[id_key]] = self._entry(media, item)
+            start += PAGE_SIZE
+            if len(page) < PAGE_SIZE or start >= result.get(
+                    'limits', {}).get('total', 0):
+                break
+        with self.lock:
+            self.items[media] = items
+            self.changed[media] = set()
+            if media == 'album':
+                self.songs = set()
+
+    def sync(self, media: str):
+        """brings the index of a media type up to date, built on first use
+
+        Args:
+            media (str): media type ie movie
+        """
+        with self.lock:
+            changed = self.changed.get(media)
+            rebuild = media not in self.items or changed is None
+            songs = set()
+            if not rebuild:
+                self.changed[media] = set()
+                if media == 'album':
+                    songs, self.songs = self.songs, set()
+        if rebuild:
+            self.build(media)
+            return
+        changed.update(self._albums(songs))
+        _, key, id_key, detail, _ = INDEX_TYPES[media]
+        for item_id in changed:
+            item = self._query(detail, {id_key: item_id, 'properties':
+                                        self._properties(media)}).get(
+                                            key[:-1] + 'details')
+            with self.lock:
+                if item:
+                    self.items[media][item_id] = self._entry(media, item)
+                else:
+                    self.items[media].pop(item_id, None)
+
+    def _albums(self, songs: set) -> set:
+        """gets the albums of changed songs, their playcounts follow the
+        songs
+
+        Args:
+            songs (set): song ids
+
+        Returns:
+            set: album ids
+        """
+        albums = set()
+        for song in songs:
+            albumid = self._query('AudioLibrary.GetSongDetails', {
+                'songid': song, 'properties': ['albumid']}).get(
+                    'songdetails', {}).get('albumid')
+            if albumid:
+                albums.add(albumid)
+        return albums
+
+    def notification(self, method: str, data: str):
+        """records a library change, OnUpdate marks the item for the next
+        sync, a song OnUpdate (ie played) marks its album, OnRemove drops
+        the item and a clean rebuilds
+
+        Args:
+            method (str): notification ie VideoLibrary.OnUpdate
+            data (str): JSON notification data
+        """
+        library, _, event = method.partition('.')
+        if library not in ('VideoLibrary', 'AudioLibrary'):
+            return
+        try:
+            data = json.loads(data) or {}
+        except (ValueError, TypeError):
+            data = {}
+        item = data.get('item', data) if isinstance(data, dict) else {}
+        media = item.get('type', '')
+        with self.lock:
+            if event == 'OnCleanFinished':
+                for indexed in INDEX_TYPES:
+                    if (indexed == 'album') == (library == 'AudioLibrary'):
+                        self.changed[indexed] = None
+            elif media == 'song' and event == 'OnUpdate':
+                if self.changed.get('album') is None:
+                    return
+                self.songs.add(item.get('id'))
+                if len(self.songs) + len(self.changed['album']) > MAX_UPDATES:
+                    self.changed['album'] = None
+            elif media not in self.items:
+                return
+            elif event == 'OnRemove':
+                self.items[media].pop(item.get('id'), None)
+            elif event == 'OnUpdate' and self.changed.get(media) is not None:
+                self.changed[media].add(item.get('id'))
+                if len(self.changed[media]) > MAX_UPDATES:
+                    self.changed[media] = None
+
+    def aggregate(self, media: str, field: int = GENRES, weight: int = 0,
+                  since: str = '', limit: int = 20) -> list:
+        """counts the items of a media type per genre or maker
+
+        Args:
+            media (str): media type ie movie
+            field (int, optional): GENRES or MAKERS
+            weight (int, optional): PLAYCOUNT to sum playcounts instead of
+            counting items
+            since (str, optional): only items added after this dateadded
+            limit (int, optional): number of groups returned
+
+        Returns:
+            list: (name, count) of the largest groups, largest first
+        """
+        counts = collections.Counter()
+        with self.lock:
+            entries = list(self.items.get(media, {}).values())
+        if since:
+            entries = [entry for entry in entries if entry[DATEADDED] >= since]
+        if not weight:
+            counts.update(itertools.chain.from_iterable(
+                entry[field] for entry in entries))
+        else:
+            for entry in entries:
+                if entry[weight]:
+                    for name in entry[field]:
+                        counts[name] += entry[weight]
+        return counts.most_common(limit)
+
+
+def week_ago(now: float = None) -> str:
+    """gets the dateadded of seven days ago
+
+    Args:
+        now (float, optional): time in seconds, defaults to now
+
+    Returns:
+        str: dateadded ie 2024-01-01 10:00:00
+    """
+    then = datetime.datetime.fromtimestamp(
+        time.time() if now is None else now) - datetime.timedelta(days=7)
+    return then.strftime('%Y-%m-%d %H:%M:%S')
+
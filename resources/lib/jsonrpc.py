@@ -0,0 +1,470 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# pylint: disable=line-too-long,invalid-name
+
+"""Module sends the JSON-RPC requests of the service.  The backend is
+Kodi (live), Kodi with every request and response appended to a fixture
+file (record) or a fixture file without Kodi library access (replay).
+Fixtures are json lines {"request": {...}, "response": {...}}
+Live responses are cached for the ttl set with cache_ttl, keyed by the
+normalised request.  Within deadline a request that takes too long
+raises DeadlineExceeded, its response is still cached when it arrives.
+Each request sent to Kodi is traced as an rpc span and counted with its
+time within measure
+
+"""
+
+import collections
+import concurrent.futures
+import contextlib
+import hashlib
+import json
+import re
+import threading
+import time
+
+import xbmc
+
+from resources.lib import generations, trace
+
+LIVE = 0
+RECORD = 1
+REPLAY = 2
+
+# string values replaced when recording with anonymise, file and art
+# values keep their separators so path quirks (stacks, rar://,
+# multipath://) survive
+ANONYMISE_KEYS = {'title', 'originaltitle', 'showtitle', 'label', 'plot',
+                  'plotoutline', 'tagline', 'description', 'comment',
+                  'file', 'trailer', 'thumbnail', 'fanart', 'art', 'album',
+                  'artist', 'director', 'studio', 'albumlabel'}
+
+# response for a library query the governor did not allow
+ABORTED = '{"jsonrpc": "2.0", "id": 1, "error": {"code": -32100, "message": "Aborted"}}'
+
+_backend = {'mode': LIVE, 'fixture': '', 'anonymise': False,
+            'responses': {}, 'governor': None}
+_lock = threading.Lock()
+# normalised request: (expiry, response), least recently used first
+_cache = collections.OrderedDict()
+_cache_stats = {'hits': 0, 'misses': 0, 'size': 64}
+# ttl and deadline of the widget being fetched, per thread
+_local = threading.local()
+# runs requests with a deadline, created on first use
+_pool = {'executor': None}
+
+
+class DeadlineExceeded(Exception):
+    """a request did not complete within its deadline"""
+
+
+def request_key(request) -> str:
+    """normalises a request so equal requests match regardless of id,
+    key order and whitespace
+
+    Args:
+        request (str|dict): JSON-RPC request
+
+    Returns:
+        str: the normalised request
+    """
+    if isinstance(request, str):
+        request = json.loads(request)
+    request = {k: v for k, v in request.items() if k != 'id'}
+    return json.dumps(request, sort_keys=True, separators=(',', ':'))
+
+
+def method(request: str) -> str:
+    """gets the method of a request for traces
+
+    Args:
+        request (str): JSON-RPC request
+
+    Returns:
+        str: method ie VideoLibrary.GetMovies
+    """
+    try:
+        return json.loads(request).get('method', '')
+    except ValueError:
+        return ''
+
+
+def set_backend(mode: int, fixture: str = '', anonymise: bool = False):
+    """selects how requests are executed
+
+    Args:
+        mode (int): LIVE, RECORD or REPLAY
+        fixture (str, optional): fixture file to append to or replay from
+        anonymise (bool, optional): anonymise recorded responses
+    """
+    responses = {}
+    if mode == REPLAY:
+        with open(fixture, encoding='utf-8') as fixture_file:
+            for line in fixture_file:
+                if line.strip():
+                    pair = json.loads(line)
+                    responses.setdefault(request_key(pair['request']),
+                                         []).append(pair['response'])
+        trace.event('replaying %d requests from %s', len(responses), fixture)
+    with _lock:
+        _backend.update(mode=mode, fixture=fixture, anonymise=anonymise,
+                        responses=responses)
+
+
+def set_governor(governor):
+    """limits library queries with a governor
+
+    Args:
+        governor (governor.QueryGovernor): the governor or None
+    """
+    _backend['governor'] = governor
+
+
+@contextlib.contextmanager
+def cache_ttl(ttl: float):
+    """caches the responses of the requests sent in the with block,
+    use as "with cache_ttl(60):"
+
+    Args:
+        ttl (float): seconds a response is served from the cache, 0 for
+        no caching
+    """
+    previous = getattr(_local, 'ttl', 0)
+    _local.ttl = ttl
+    try:
+        yield
+    finally:
+        _local.ttl = previous
+
+
+@contextlib.contextmanager
+def measure():
+    """counts the requests sent to Kodi in the with block and the time
+    they took including the governor wait, use as
+    "with measure() as cost:", cost is [requests, seconds]
+
+    Yields:
+        list: number of requests and seconds, filled in by the block
+    """
+    previous = getattr(_local, 'measured', None)
+    cost = [0, 0.0]
+    _local.measured = cost
+    try:
+        yield cost
+    finally:
+        _local.measured = previous
+
+
+@contextlib.contextmanager
+def deadline(seconds: float):
+    """limits the time each request sent in the with block may take, use
+    as "with deadline(10):"
+
+    Args:
+        seconds (float): time limit per request, 0 for none
+    """
+    previous = getattr(_local, 'deadline', 0)
+    _local.deadline = seconds
+    try:
+        yield
+    finally:
+        _local.deadline = previous
+
+
+@contextlib.contextmanager
+def ungoverned():
+    """sends the requests in the with block without waiting for the
+    governor, for single queries that must not queue behind widget
+    refreshes, use as "with ungoverned():"
+    """
+    previous = getattr(_local, 'ungoverned', False)
+    _local.ungoverned = True
+    try:
+        yield
+    finally:
+        _local.ungoverned = previous
+
+
+def shutdown():
+    """stops the deadline worker threads without waiting for requests
+    still running
+    """
+    executor = _pool['executor']
+    _pool['executor'] = None
+    if executor is not None:
+        executor.shutdown(wait=False)
+
+
+def set_cache_size(size: int):
+    """limits the number of cached responses
+
+    Args:
+        size (int): maximum cached responses
+    """
+    with _lock:
+        _cache_stats['size'] = size
+        while len(_cache) > size:
+            _cache.popitem(last=False)
+
+
+def invalidate(prefix: str = ''):
+    """drops cached responses of a method namespace after the library
+    changed
+
+    Args:
+        prefix (str, optional): method prefix ie VideoLibrary, all if empty
+    """
+    with _lock:
+        for key in [key for key in _cache
+                    if json.loads(key).get('method', '').startswith(prefix)]:
+            del _cache[key]
+
+
+def cache_hit_rate() -> float:
+    """gets the share of cacheable requests served from the cache
+
+    Returns:
+        float: hit rate in percent
+    """
+    total = _cache_stats['hits'] + _cache_stats['misses']
+    return 100.0 * _cache_stats['hits'] / total if total else 0.0
+
+
+def execute(request: str) -> str:
+    """executes a JSON-RPC request on the selected backend, library
+    queries wait for the governor.  Within cache_ttl live responses are
+    served from the cache
+
+    Args:
+        request (str): JSON-RPC request
+
+    Raises:
+        generations.Superseded: a newer trigger replaced the refresh
+        sending the request
+
+    Returns:
+        str: JSON-RPC response
+    """
+    generations.check()
+    mode = _backend['mode']
+    if mode == REPLAY:
+        return _replay(request)
+    ttl = getattr(_local, 'ttl', 0)
+    if ttl <= 0:
+        return _execute(request)
+    key = request_key(request)
+    with _lock:
+        cached = _cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            _cache_stats['hits'] += 1
+            _cache.move_to_end(key)
+            trace.event('rpc %s cached', lambda: method(request))
+            return cached[1]
+        _cache_stats['misses'] += 1
+    return _execute(request, key, ttl)
+
+
+def _store(key: str, ttl: float, response: str):
+    """caches a successful response
+
+    Args:
+        key (str): normalised request
+        ttl (float): seconds the response is served from the cache
+        response (str): JSON-RPC response
+    """
+    if '"result"' not in response:
+        return
+    with _lock:
+        _cache[key] = (time.monotonic() + ttl, response)
+        _cache.move_to_end(key)
+        while len(_cache) > _cache_stats['size']:
+            _cache.popitem(last=False)
+
+
+def _execute(request: str, key: str = '', ttl: float = 0) -> str:
+    """executes a JSON-RPC request in Kodi, library queries wait for the
+    governor unless sent within ungoverned.  Traced as a span including
+    the wait
+
+    Args:
+        request (str): JSON-RPC request
+        key (str, optional): normalised request if the response is cached
+        ttl (float, optional): seconds the response is cached
+
+    Returns:
+        str: JSON-RPC response
+    """
+    governor = (None if getattr(_local, 'ungoverned', False)
+                else _backend['governor'])
+    cost = getattr(_local, 'measured', None)
+    start = time.perf_counter()
+    try:
+        with trace.span('rpc %s', lambda: method(request)):
+            if governor is not None and 'Library.Get' in request:
+                with governor.query() as allowed:
+                    if not allowed:
+                        return ABORTED
+                    return _call(request, key, ttl)
+            return _call(request, key, ttl)
+    finally:
+        if cost is not None:
+            cost[0] += 1
+            cost[1] += time.perf_counter() - start
+
+
+def _call(request: str, key: str, ttl: float) -> str:
+    """sends a request to Kodi, within the deadline if one is set.  A
+    request still waiting for a worker at the deadline is never sent, one
+    already sent keeps its governor slot until Kodi answers and its
+    response is still recorded and cached
+
+    Args:
+        request (str): JSON-RPC request
+        key (str): normalised request if the response is cached
+        ttl (float): seconds the response is cached
+
+    Raises:
+        DeadlineExceeded: the request took longer than the deadline
+
+    Returns:
+        str: JSON-RPC response
+    """
+    seconds = getattr(_local, 'deadline', 0)
+    if seconds <= 0:
+        response = xbmc.executeJSONRPC(request)
+        _done(request, key, ttl, response)
+        return response
+    with _lock:
+        if _pool['executor'] is None:
+            _pool['executor'] = concurrent.futures.ThreadPoolExecutor(
+                max_workers=2, thread_name_prefix='SkinWidgetsRPC')
+        future = _pool['executor'].submit(xbmc.executeJSONRPC, request)
+    try:
+        response = future.result(timeout=seconds)
+    except concurrent.futures.TimeoutError:
+        if not future.cancel():
+            governor = _backend['governor']
+            release = governor.detach() if governor is not None else None
+
+            def late(done):
+                if release is not None:
+                    release()
+                _done(request, key, ttl, done.result())
+
+            future.add_done_callback(late)
+        raise DeadlineExceeded(f'no response within {seconds} s') from None
+    _done(request, key, ttl, response)
+    return response
+
+
+def _done(request: str, key: str, ttl: float, response: str):
+    """records and caches a response
+
+    Args:
+        request (str): JSON-RPC request
+        key (str): normalised request if the response is cached
+        ttl (float): seconds the response is cached
+        response (str): JSON-RPC response
+    """
+    if _backend['mode'] == RECORD:
+        _record(request, response)
+    if key:
+        _store(key, ttl, response)
+
+
+def _replay(request: str) -> str:
+    """serves a recorded response, repeated requests get the recorded
+    responses in order and then the last one again
+
+    Args:
+        request (str): JSON-RPC request
+
+    Returns:
+        str: recorded response or a JSON-RPC error if not recorded
+    """
+    key = request_key(request)
+    with _lock:
+        responses = _backend['responses'].get(key)
+        if not responses:
+            trace.event('no recorded response for %s', key)
+            return json.dumps({'jsonrpc': '2.0', 'id': 1, 'error': {
+                'code': -32601, 'message': 'Not recorded'}})
+        response = responses.pop(0) if len(responses) > 1 else responses[0]
+    return json.dumps(response)
+
+
+def _record(request: str, response: str):
+    """appends a request and response to the fixture file
+
+    Args:
+        request (str): JSON-RPC request
+        response (str): JSON-RPC response
+    """
+    try:
+        response = json.loads(response)
+    except ValueError:
+        return
+    if _backend['anonymise']:
+        response = anonymise(response)
+    line = json.dumps({'request': json.loads(request), 'response': response})
+    with _lock:
+        with open(_backend['fixture'], 'a', encoding='utf-8') as fixture_file:
+            fixture_file.write(line + '\n')
+
+
+def anonymise(value, key: str = ''):
+    """replaces the words of identifying strings with hashed letters of
+    the same length so sizes and separators of the original are kept
+
+    Args:
+        value: decoded JSON value
+        key (str, optional): the key the value is stored under
+
+    Returns:
+        the anonymised value
+    """
+    if isinstance(value, dict):
+        # every artwork url in an art map is anonymised
+        return {k: anonymise(v, 'art' if key == 'art' else k)
+                for k, v in value.items()}
+    if isinstance(value, list):
+        return [anonymise(v, key) for v in value]
+    if isinstance(value, str) and key in ANONYMISE_KEYS:
+        return re.sub(r'%[0-9a-fA-F]{2}|[^\W_]+', _hash_word, value)
+    return value
+
+
+def _hash_word(match) -> str:
+    """hashes a word to letters of the same length, url escapes and
+    protocol names are kept
+
+    Args:
+        match (re.Match): the word
+
+    Returns:
+        str: the replacement
+    """
+    word = match.group(0)
+    if word.startswith('%') or word.lower() in ('rar', 'multipath', 'stack', 'image', 'http',
+                        'https', 'smb', 'nfs'):
+        return word
+    digest = hashlib.sha1(word.encode('utf-8')).hexdigest()
+    while len(digest) < len(word):
+        digest += hashlib.sha1(digest.encode('utf-8')).hexdigest()
+    return ''.join(chr(ord('a') + int(c, 16) % 26)
+                   for c in digest[:len(word)])
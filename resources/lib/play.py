@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# pylint: disable=line-too-long,invalid-name
+
+"""Module handles the widget "Play" actions ie
+RunScript(service.skin.widgets,movieid=N), recordingid plays a PVR
+recording and channelid tunes to a PVR channel.  Every click starts a new
+interpreter so only xbmc is imported, the trace module only while debug
+logging is on and the service modules never.  Also holds the kodi log
+writer of the trace
+
+"""
+
+import time
+
+import xbmc
+
+# argument name, Player.Open item key and if the resume option applies
+PLAY_ITEMS = [('movieid', True),
+              ('episodeid', True),
+              ('musicvideoid', False),
+              ('albumid', False),
+              ('songid', False),
+              ('recordingid', True),
+              ('channelid', False)]
+
+
+def kodi_writer(name: str):
+    """gets the trace write function for kodi log at debug level
+
+    Args:
+        name (str): addon name each line starts with
+
+    Returns:
+        callable: writes a traced line
+    """
+    def write(line: str):
+        xbmc.log(msg=f'{name}: {line}', level=xbmc.LOGDEBUG)
+    return write
+
+
+def debug_logging() -> bool:
+    """checks if Kodi's debug logging is on
+
+    Returns:
+        bool: True if debug messages are written to kodi log
+    """
+    return bool(xbmc.getCondVisibility('System.GetBool(debug.showloginfo)'))
+
+
+def init_trace():
+    """traces to kodi log while debug logging is on, a RunScript
+    interpreter has no tracing set up by the service
+
+    Returns:
+        module: resources.lib.trace, None if debug logging is off
+    """
+    if not debug_logging():
+        return None
+    # only loaded with debug logging on
+    import xbmcaddon  # pylint: disable=import-outside-toplevel
+    from resources.lib import trace  # pylint: disable=import-outside-toplevel
+    if not trace.enabled():
+        trace.configure(kodi_writer(xbmcaddon.Addon().getAddonInfo('name')))
+    return trace
+
+
+def parse_argv(argv: list) -> dict:
+    """gets the arguments passed from Kodi, "a=1&b=2" in the first argument
+    and resume=false in any argument
+
+    Args:
+        argv (list): sys.argv
+
+    Returns:
+        dict: the parameters, resume is always set to "true" or "false"
+    """
+    try:
+        params = dict(arg.split("=") for arg in argv[1].split("&"))
+    except Exception:
+        params = {}
+    params['resume'] = "true"
+    for arg in argv:
+        param = str(arg)
+        if 'resume=' in param:
+            if param.replace('resume=', '') == "false":
+                params['resume'] = "false"
+    return params
+
+
+def play(params: dict, start: float = None) -> bool:
+    """starts playback of a library item with JSON-RPC Player.Open
+
+    Args:
+        params (dict): parameters from parse_argv
+        start (float, optional): time.perf_counter() when the script
+        started, the logged latency includes the imports.  Defaults to now
+
+    Returns:
+        bool: True if the parameters held an item to play
+    """
+    if start is None:
+        start = time.perf_counter()
+    for key, resume in PLAY_ITEMS:
+        if params.get(key):
+            break
+    else:
+        return False
+    if resume:
+        options = ', "options":{ "resume": %s }' % params['resume']
+    else:
+        options = ''
+    xbmc.executeJSONRPC(
+        '{ "jsonrpc": "2.0", "method": "Player.Open", '
+        '"params": { "item": { "%s": %d }%s }, "id": 1 }'
+        % (key, int(params[key]), options))
+    elapsed = (time.perf_counter() - start) * 1000
+    trace = init_trace()
+    if trace is not None:
+        trace.event('play %s=%s opened %.1f ms after the script started',
+                    key, params[key], elapsed)
+    return True
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# pylint: disable=line-too-long,invalid-name
+
+"""Module turns smart playlists (.xsp) into widgets.  Each playlist of the
+playlist folders becomes widget "Playlist<name>", ie unwatched_scifi.xsp
+is PlaylistUnwatchedScifi.  A playlist is compiled once into a JSON-RPC
+sort and filter and kept until the file's mtime changes, the fetcher of
+its type then runs the query with them.  Rules JSON-RPC cannot filter on
+(playlist, virtualfolder) are left out, the widget item limit applies
+instead of the playlist limit.  Does not import xbmc, the folders are
+passed in
+
+"""
+
+import json
+import os
+import re
+import threading
+
+# playlist type: the fetcher suffix it is fetched as
+PLAYLIST_TYPES = {'movies': 'Movie', 'episodes': 'Episode',
+                  'musicvideos': 'MusicVideo', 'albums': 'Album',
+                  'songs': 'Song'}
+# rule fields JSON-RPC filters do not support
+UNSUPPORTED_FIELDS = ('playlist', 'virtualfolder')
+
+
+class PlaylistWidgets:
+    """finds the smart playlists and keeps their compiled queries by mtime
+    """
+
+    def __init__(self, directories: list = ()):
+        """
+        Args:
+            directories (list, optional): folders with .xsp files
+        """
+        self.directories = list(directories)
+        # request: path of the playlist
+        self.widgets = {}
+        # path: (mtime, compiled playlist)
+        self.compiled = {}
+        self.lock = threading.Lock()
+
+    def scan(self) -> list:
+        """finds the playlists of the folders
+
+        Returns:
+            list: the playlist widget requests
+        """
+        widgets = {}
+        for directory in self.directories:
+            try:
+                names = sorted(os.listdir(directory))
+            except OSError:
+                continue
+            for name in names:
+                stem, extension = os.path.splitext(name)
+                if extension.lower() == '.xsp':
+                    request = 'Playlist' + ''.join(
+                        word[:1].upper() + word[1:]
+                        for word in re.split(r'[^0-9A-Za-z]+', stem))
+                    widgets[request] = os.path.join(directory, name)
+        with self.lock:
+            self.widgets = widgets
+            for path in [path for path in self.compiled
+                         if path not in widgets.values()]:
+                del self.compiled[path]
+        return list(widgets)
+
+    def playlist(self, request: str):
+        """gets the compiled playlist of a widget, parsed again only after
+        the file changed
+
+        Args:
+            request (str): widget request ie PlaylistUnwatchedScifi
+
+        Returns:
+            dict: type, name, sort and filter or None if the playlist is
+            missing, unreadable or of an unsupported type
+        """
+        path = self.widgets.get(request)
+        if path is None:
+            return None
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return None
+        with self.lock:
+            cached = self.compiled.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        try:
+            playlist = compile_playlist(path)
+        except (OSError, SyntaxError):
+            # ElementTree.ParseError is a SyntaxError
+            playlist = None
+        with self.lock:
+            self.compiled[path] = (mtime, playlist)
+        return playlist
+
+    def fetcher(self, request: str) -> str:
+        """gets the fetcher suffix of a playlist widget
+
+        Args:
+            request (str): widget request ie PlaylistUnwatchedScifi
+
+        Returns:
+            str: ie Movie, empty if the playlist cannot be fetched
+        """
+        playlist = self.playlist(request)
+        return PLAYLIST_TYPES.get(playlist['type'], '') if playlist else ''
+
+    def query(self, request: str, json_string: str) -> str:
+        """completes a fetcher query with the sort and filter of the
+        playlist
+
+        Args:
+            request (str): widget request ie PlaylistUnwatchedScifi
+            json_string (str): fetcher query up to the limits
+
+        Returns:
+            str: JSON-RPC request
+        """
+        playlist = self.playlist(request) or {}
+        params = [f'"sort": {json.dumps(playlist.get("sort") or {"method": "none"})}']
+        if playlist.get('filter'):
+            params.append(f'"filter": {json.dumps(playlist["filter"])}')
+        return f'{json_string} {", ".join(params)}}}}}'
+
+
+def compile_playlist(path: str) -> dict:
+    """parses a smart playlist into a JSON-RPC sort and filter
+
+    Args:
+        path (str): path of the .xsp file
+
+    Raises:
+        OSError: the file cannot be read
+        ElementTree.ParseError: the file is not valid xml
+
+    Returns:
+        dict: type, name, sort and filter
+    """
+    # imported with the first playlist, not when the service starts
+    import xml.etree.ElementTree as ElementTree  # pylint: disable=import-outside-toplevel
+    root = ElementTree.parse(path).getroot()
+    order = root.find('order')
+    sort = {}
+    if order is not None and (order.text or '').strip():
+        sort = {'method': order.text.strip(),
+                'order': order.get('direction', 'ascending')}
+    return {'type': root.get('type', ''),
+            'name': root.findtext('name', '').strip(),
+            'sort': sort,
+            'filter': compile_rules(root)}
+
+
+def compile_rules(element) -> dict:
+    """compiles the rules and nested rule groups of an element
+
+    Args:
+        element (ElementTree.Element): smartplaylist or rules element
+
+    Returns:
+        dict: JSON-RPC filter, empty if there are no supported rules
+    """
+    rules = []
+    for child in element:
+        if child.tag == 'rule':
+            if child.get('field') in UNSUPPORTED_FIELDS:
+                continue
+            values = [value.text or '' for value in child.findall('value')]
+            if not values:
+                # playlists written before Kodi 17 keep the value as text
+                values = [(child.text or '').strip()]
+            rules.append({'field': child.get('field'),
+                          'operator': child.get('operator', 'is'),
+                          'value': values[0] if len(values) == 1 else values})
+        elif child.tag == 'rules':
+            group = compile_rules(child)
+            if group:
+                rules.append(group)
+    if len(rules) == 1:
+        return rules[0]
+    if not rules:
+        return {}
+    return {'or' if element.findtext('match', 'all').strip() == 'one'
+            or element.get('match') == 'one' else 'and': rules}
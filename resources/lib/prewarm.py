@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# pylint: disable=line-too-long,invalid-name
+
+"""Module warms Kodi's texture cache for widget artwork.  Artwork not yet
+in the cache (Textures.GetTextures) is requested from Kodi's web server
+/image/ path, which decodes and caches it like the GUI would.  Images
+are requested on a worker thread so a slow web server never holds up
+the daemon.  Does not import xbmc, the JSON-RPC function is passed in
+
+"""
+
+import base64
+import collections
+import concurrent.futures
+import json
+import threading
+import time
+import urllib.parse
+
+# seconds an image request may take
+IMAGE_TIMEOUT = 5
+# seconds before a web server found off is checked again
+SERVER_RECHECK = 300
+# seconds the worker sleeps while there is nothing to warm
+WORKER_POLL = 1
+# prefix of the artwork urls Kodi wraps for its image loader
+IMAGE_PREFIX = 'image://'
+
+
+def unwrap(url: str) -> str:
+    """gets the url of an artwork as stored in the texture database, ie
+    image://https%3a%2f%2fexample.org%2fposter.jpg/ is stored as
+    https://example.org/poster.jpg
+
+    Args:
+        url (str): artwork url
+
+    Returns:
+        str: the unwrapped url, other urls unchanged
+    """
+    if not url.startswith(IMAGE_PREFIX):
+        return url
+    url = url[len(IMAGE_PREFIX):]
+    if url.endswith('/'):
+        url = url[:-1]
+    return urllib.parse.unquote(url)
+
+
+class TexturePrewarmer:
+    """queues artwork urls and caches the uncached ones in small batches
+    """
+
+    def __init__(self, execute, concurrency: int = 2, batch: int = 10,
+                 remember: int = 2000, clock=time.monotonic):
+        """
+        Args:
+            execute (callable): sends a JSON-RPC request, returns the response
+            concurrency (int, optional): images requested at the same time
+            batch (int, optional): urls checked per run
+            remember (int, optional): urls remembered as warmed
+            clock (callable, optional): monotonic clock in seconds
+        """
+        self.execute = execute
+        self.concurrency = concurrency
+        self.batch = batch
+        self.queue = collections.deque()
+        # recently warmed urls in order, oldest first
+        self.warmed = collections.OrderedDict()
+        self.remember = remember
+        self.clock = clock
+        # base url and headers, () while the web server is off
+        self.server = None
+        self.checked = 0.0
+        # guards queue and warmed, added to by the refreshes
+        self.lock = threading.Lock()
+        self.worker = None
+        self.stopping = threading.Event()
+
+    def add(self, urls):
+        """queues artwork urls that were not warmed recently
+
+        Args:
+            urls (iterable): artwork urls ie image://...
+        """
+        with self.lock:
+            for url in urls:
+                if url and url not in self.warmed and url not in self.queue:
+                    self.queue.append(url)
+
+    def _remember(self, url: str):
+        """marks a url as warmed, forgetting the oldest past the limit
+
+        Args:
+            url (str): artwork url
+        """
+        with self.lock:
+            self.warmed[url] = True
+            self.warmed.move_to_end(url)
+            while len(self.warmed) > self.remember:
+                self.warmed.popitem(last=False)
+
+    def _setting(self, setting: str):
+        """gets a Kodi system setting
+
+        Args:
+            setting (str): setting id ie services.webserver
+
+        Returns:
+            the setting value or None
+        """
+        response = json.loads(self.execute(json.dumps({
+            'jsonrpc': '2.0', 'id': 1, 'method': 'Settings.GetSettingValue',
+            'params': {'setting': setting}})))
+        return response.get('result', {}).get('value')
+
+    def _web_server(self):
+        """gets the base url and authorization header of Kodi's web server,
+        checked again SERVER_RECHECK seconds after it was found off
+
+        Returns:
+            tuple: base url and headers, or None if the web server is off
+        """
+        if self.server == () and self.clock() - self.checked >= SERVER_RECHECK:
+            self.server = None
+        if self.server is None:
+            self.checked = self.clock()
+            if not self._setting('services.webserver'):
+                self.server = ()
+            else:
+                headers = {}
+                username = self._setting('services.webserverusername')
+                password = self._setting('services.webserverpassword')
+                if username or password:
+                    token = base64.b64encode(
+                        f'{username}:{password}'.encode()).decode()
+                    headers['Authorization'] = f'Basic {token}'
+                port = self._setting('services.webserverport')
+                self.server = (f'http://127.0.0.1:{port}/image/', headers)
+        return self.server or None
+
+    def _uncached(self, urls: list) -> list:
+        """filters out the urls already in the texture cache, the texture
+        database stores them unwrapped
+
+        Args:
+            urls (list): artwork urls
+
+        Returns:
+            list: urls not in the texture cache
+        """
+        response = json.loads(self.execute(json.dumps({
+            'jsonrpc': '2.0', 'id': 1, 'method': 'Textures.GetTextures',
+            'params': {'properties': ['url'], 'filter': {'or': [
+                {'field': 'url', 'operator': 'is', 'value': unwrap(url)}
+                for url in urls]}}})))
+        cached = {texture.get('url') for texture
+                  in response.get('result', {}).get('textures', [])}
+        return [url for url in urls if unwrap(url) not in cached]
+
+    def _warm(self, server: tuple, url: str) -> bool:
+        """requests an image from the web server so Kodi caches it
+
+        Args:
+            server (tuple): base url and headers
+            url (str): artwork url
+
+        Returns:
+            bool: True if the image was served
+        """
+        # imported with the first image, prewarming is off by default
+        import urllib.request  # pylint: disable=import-outside-toplevel
+        request = urllib.request.Request(
+            server[0] + urllib.parse.quote(url, safe=''), headers=server[1])
+        try:
+            with urllib.request.urlopen(request, timeout=IMAGE_TIMEOUT) as image:
+                image.read()
+            return True
+        except OSError:
+            return False
+
+    def run(self, should_stop) -> int:
+        """warms one batch of queued urls
+
+        Args:
+            should_stop (callable): returns True if warming has to stop
+            ie playback started
+
+        Returns:
+            int: number of images warmed
+        """
+        if not self.queue or should_stop():
+            return 0
+        server = self._web_server()
+        with self.lock:
+            if server is None:
+                self.queue.clear()
+                return 0
+            urls = [self.queue.popleft()
+                    for _ in range(min(self.batch, len(self.queue)))]
+        uncached = self._uncached(urls)
+        for url in urls:
+            if url not in uncached:
+                self._remember(url)
+        warmed = 0
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.concurrency) as pool:
+            futures = {}
+            for url in uncached:
+                if should_stop():
+                    # requeue what was not started
+                    with self.lock:
+                        self.queue.extendleft(reversed(
+                            [u for u in uncached if u not in futures]))
+                    break
+                futures[url] = pool.submit(self._warm, server, url)
+                if len(futures) % self.concurrency == 0:
+                    concurrent.futures.wait(futures.values())
+            for url, future in futures.items():
+                if future.result():
+                    warmed += 1
+                    self._remember(url)
+        return warmed
+
+    def start(self, should_stop):
+        """warms the queued urls on a worker thread until stop is called
+
+        Args:
+            should_stop (callable): returns True if warming has to pause
+            ie playback started
+        """
+        if self.worker is not None:
+            return
+        self.stopping.clear()
+
+        def stop() -> bool:
+            return self.stopping.is_set() or should_stop()
+
+        def work():
+            while not self.stopping.wait(WORKER_POLL):
+                while self.queue and not stop():
+                    self.run(stop)
+
+        self.worker = threading.Thread(target=work, name='prewarm',
+                                       daemon=True)
+        self.worker.start()
+
+    def stop(self):
+        """stops the worker thread, an image being requested finishes
+        within IMAGE_TIMEOUT
+        """
+        self.stopping.set()
+        if self.worker is not None:
+            self.worker.join()
+            self.worker = None
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# pylint: disable=line-too-long,invalid-name
+
+"""Module holds the fetchers of the widgets, one module per media type.
+A module is imported on the first refresh of one of its widgets, so a
+skin showing only video widgets never loads the music and addon fetchers.
+Each module has fetch(fetcher, request) which queries the library with
+the Widgets_Fetcher's JSON-RPC function, or reads its PVR cache, and sets
+the properties on its window
+
+"""
+
+import importlib
+import os
+
+from resources.lib import generations
+
+# widget suffix: provider module, the first match wins so MusicVideo is
+# checked before Movie
+PROVIDERS = (('MusicVideo', 'musicvideos'),
+             ('Movie', 'movies'),
+             ('Episode', 'episodes'),
+             ('Album', 'albums'),
+             ('Artist', 'artists'),
+             ('Song', 'songs'),
+             ('Addon', 'addons'),
+             ('Recording', 'recordings'),
+             ('Timer', 'recordings'))
+
+
+def provider(kind: str) -> str:
+    """gets the provider module name of a widget
+
+    Args:
+        kind (str): widget request or fetcher suffix ie RecentMovie
+
+    Returns:
+        str: module name ie movies, empty if no provider fetches it
+    """
+    for suffix, module in PROVIDERS:
+        if kind.endswith(suffix):
+            return module
+    return ''
+
+
+def load(module: str):
+    """imports a provider module, only once
+
+    Args:
+        module (str): module name ie movies
+
+    Returns:
+        module: the provider
+    """
+    return importlib.import_module(f'{__name__}.{module}')
+
+
+def playback_properties(item: dict) -> dict:
+    """gets the item properties that change when a video is played
+
+    Args:
+        item (dict): item with playcount and resume
+
+    Returns:
+        dict: Resume, PercentPlayed, PercentPlayedAsInt and Watched
+    """
+    position, total = item['resume']['position'], item['resume']['total']
+    resumable = (position and total) > 0
+    percent = int(float(position) / float(total) * 100) if resumable else 0
+    return {'Resume': 'true' if resumable else 'false',
+            'PercentPlayed': f'{percent}%',
+            'PercentPlayedAsInt': str(percent),
+            'Watched': 'true' if item['playcount'] >= 1 else 'false'}
+
+
+def consume(items: list):
+    """yields the items of a decoded response and drops each one from
+    the list, so an item is released as soon as its properties are set.
+    Stops a refresh that was superseded before the next item
+
+    Args:
+        items (list): items of a JSON-RPC result
+
+    Raises:
+        generations.Superseded: a newer trigger replaced the refresh
+
+    Yields:
+        dict: the next item
+    """
+    items.reverse()
+    while items:
+        generations.check()
+        yield items.pop()
+
+
+def media_path(path: str) -> str:
+    """fixes path to media based on kodi special protocol
+    stacked media
+    rar'ed media
+    multipath media
+
+    Args:
+        path (str): a Kodi media path
+
+    Returns:
+        str: actual path to media
+    """
+    # Check for stacked movies
+    try:
+        path = os.path.split(path)[0].rsplit(' , ', 1)[1].replace(",,", ",")
+    except Exception:
+        path = os.path.split(path)[0]
+    # Fixes problems with rared movies and multipath
+    if path.startswith(("rar://", "multipath://")):
+        # only these paths need it, importing it costs more than the rest
+        # of the fetchers
+        import urllib.request  # pylint: disable=import-outside-toplevel
+    if path.startswith("rar://"):
+        pathlist = [os.path.split(
+            urllib.request.url2pathname(path.replace("rar://", "")))[0]]
+    elif path.startswith("multipath://"):
+        temp_path = path.replace("multipath://", "").split('%2f/')
+        pathlist = []
+        for item in temp_path:
+            pathlist.append(urllib.request.url2pathname(item))
+    else:
+        pathlist = [path]
+    return pathlist[0]
+
+
+def media_streamdetails(filename: str, streamdetails: dict) -> dict:
+    """gets the streamdetails for an item from the filename or
+    library streamdetails
+
+    Args:
+        filename (str): filename of item
+        streamdetails (dict): dict of audio , video, subtitle streams of item
+
+    Returns:
+        dict of the streamdetails
+    """
+    info = {}
+    video = streamdetails['video']
+    audio = streamdetails['audio']
+    if '3d' in filename:
+        info['videoresolution'] = '3d'
+    elif video:
+        # videowidth = video[0]['width']
+        videoheight = video[0]['height']
+        if (video[0]['width'] <= 720 and videoheight <= 480):
+            info['videoresolution'] = "480"
+        elif (video[0]['width'] <= 768 and videoheight <= 576):
+            info['videoresolution'] = "576"
+        elif (video[0]['width'] <= 960 and videoheight <= 544):
+            info['videoresolution'] = "540"
+        elif (video[0]['width'] <= 1280 and videoheight <= 720):
+            info['videoresolution'] = "720"
+        elif (video[0]['width'] >= 1281 or videoheight >= 721):
+            info['videoresolution'] = "1080"
+        else:
+            info['videoresolution'] = ""
+    elif ((('dvd') in filename and not ('hddvd' or 'hd-dvd') in filename)
+          or (filename.endswith('.vob' or '.ifo'))):
+        info['videoresolution'] = '576'
+    elif (('bluray' or 'blu-ray' or 'brrip' or 'bdrip' or 'hddvd' or 'hd-dvd')
+          in filename):
+        info['videoresolution'] = '1080'
+    else:
+        info['videoresolution'] = '1080'
+    if video:
+        if 'hdrtpe' in video[0].keys():
+            info['hdrtype'] = video[0]['hdrtype']
+            # log('got hdrtype {}'.format(info['hdrtype']))
+        else:
+            info['hdrtype'] = 'SDR'
+            # log('NO hdrtype {}'.format(info['hdrtype']))
+        info['videocodec'] = video[0]['codec']
+        if video[0]['aspect'] < 1.4859:
+            info['videoaspect'] = "1.33"
+        elif video[0]['aspect'] < 1.7190:
+            info['videoaspect'] = "1.66"
+        elif video[0]['aspect'] < 1.8147:
+            info['videoaspect'] = "1.78"
+        elif video[0]['aspect'] < 2.0174:
+            info['videoaspect'] = "1.85"
+        elif video[0]['aspect'] < 2.2738:
+            info['videoaspect'] = "2.20"
+        else:
+            info['videoaspect'] = "2.35"
+    else:
+        info['videocodec'] = ''
+        info['videoaspect'] = ''
+        info['hdrtype'] = ''
+    if audio:
+        info['audiocodec'] = audio[0]['codec']
+        info['audiochannels'] = audio[0]['channels']
+    else:
+        info['audiocodec'] = ''
+        info['audiochannels'] = ''
+    # log('media_streamdetails: {}'.format(info))
+    return info
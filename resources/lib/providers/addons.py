@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# pylint: disable=line-too-long,invalid-name
+
+"""Module fetches the addon widgets with Addons.GetAddons.  Imported by the
+fetcher on the first refresh of one of them
+
+"""
+
+import json as simplejson
+import random
+
+
+def fetch(fetcher, request):
+    if not fetcher.abort():
+        addonlist = []
+        json_query = ''
+        for content in ['audio', 'video', 'unknown']:
+            json_query = fetcher.execute('{"jsonrpc": "2.0", '
+                                         '"method": "Addons.GetAddons", '
+                                         f'"params": {{"content": "{content}", '
+                                         '"properties": '
+                                         '["name", '
+                                         '"author", '
+                                         '"summary", '
+                                         '"version", '
+                                         '"fanart", '
+                                         '"thumbnail", '
+                                         '"enabled" ,'
+                                         '"extrainfo" ,'
+                                         '"broken"]}, '
+                                         '"id": 1}')
+            json_query = simplejson.loads(json_query) if json_query else {}
+            if 'result' in json_query and 'addons' in json_query['result']:
+                # find plugins and scripts
+                for item in json_query['result']['addons']:
+                    if (item['type'] == 'xbmc.python.script' or item['type'] == 'xbmc.python.pluginsource') and item['enabled']:
+                        item['content'] = content
+                        if item.get('extrainfo'):
+                            for info in item['extrainfo']:
+                                if info.get('key') and info['key'] == 'provides':
+                                    item['provides'] = info['value']
+                        addonlist.append(item)
+        # randomize the list
+        random.shuffle(addonlist)
+        fetcher.clear(request)
+        count = 0
+        for item in addonlist:
+            count += 1
+            # if count <= 2:
+            # log(f'addon request {request} json response: {item}')  # debug
+            #autopep8: off
+            fetcher.WINDOW.setProperty(f"{request}.{count}.Title"       , item['name'])
+            fetcher.WINDOW.setProperty(f"{request}.{count}.Author"      , item['author'])
+            fetcher.WINDOW.setProperty(f"{request}.{count}.Summary"     , item['summary'])
+            fetcher.WINDOW.setProperty(f"{request}.{count}.Version"     , item['version'])
+            fetcher.WINDOW.setProperty(f"{request}.{count}.Path"        , item['addonid'])
+            fetcher.WINDOW.setProperty(f"{request}.{count}.Thumb"       , item['thumbnail']) #remove
+            fetcher.WINDOW.setProperty(f"{request}.{count}.Fanart"      , item['fanart']) #remove
+            fetcher.WINDOW.setProperty(f"{request}.{count}.Art(thumb)"  , item['thumbnail'])
+            fetcher.WINDOW.setProperty(f"{request}.{count}.Art(fanart)" , item['fanart'])
+            fetcher.WINDOW.setProperty(f"{request}.{count}.Type"        , item['type'])
+            fetcher.WINDOW.setProperty(f"{request}.{count}.Content"     , item['content'])
+            fetcher.WINDOW.setProperty(f"{request}.{count}.Provides"    , item.get('provides', ''))
+            #autopep8: on
+            # stop if we've reached the number of items we need
+            if count == fetcher.limit(request):
+                break
+        if json_query:
+            fetcher.WINDOW.setProperty(f"{request}.Count", str(
+                json_query['result']['limits']['total']))
+        del json_query
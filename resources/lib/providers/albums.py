@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# pylint: disable=line-too-long,invalid-name
+
+"""Module fetches the album widgets with AudioLibrary.GetAlbums.  Imported
+by the fetcher on the first refresh of one of them
+
+"""
+
+import json as simplejson
+
+from resources.lib.providers import consume
+
+
+def fetch(fetcher, request):
+    if not fetcher.abort():
+        json_string = ('{"jsonrpc": "2.0", "id": 1, '
+                       '"method": "AudioLibrary.GetAlbums", '
+                       '"params": {"properties": '
+                       '["title", '
+                       '"description", '
+                       '"albumlabel", '
+                       '"theme", '
+                       '"mood", '
+                       '"style", '
+                       '"type", '
+                       '"artist", '
+                       '"genre", '
+                       '"year", '
+                       '"thumbnail", '
+                       '"fanart", '
+                       '"art", '
+                       '"rating", '
+                       '"userrating", '
+                       '"playcount"], '
+                       '"limits": {"end": %d},' % fetcher.limit(request))
+        if request.startswith('Playlist'):
+            json_query = fetcher.execute(
+                fetcher.playlists.query(request, json_string))
+        elif request == 'RecommendedAlbum':
+            json_query = fetcher.execute('%s "sort": '
+                                         '{"order": "descending", '
+                                         '"method": "playcount" }}}'
+                                         % json_string)
+        elif request == 'RecentAlbum':
+            json_query = fetcher.watermark.query(request, '%s "sort": '
+                                              '{"order": "descending", '
+                                              '"method": "dateadded" }}}'
+                                              % json_string)
+        else:
+            json_query = fetcher.execute('%s "sort": '
+                                         '{"method": "random"}}}'
+                                         % json_string)
+        json_query = simplejson.loads(json_query)
+        if 'result' in json_query and 'albums' in json_query['result']:
+            fetcher.clear(request)
+            count = 0
+            for item in consume(json_query['result']['albums']):
+                count += 1
+                # if count <= 2:
+                # log('music album json respone: {}'.format(item))  # debug
+                rating = str(item['rating'])
+                if rating == '48':
+                    rating = ''
+                play = 'RunScript(' + fetcher.addonid + \
+                    ',albumid=' + str(item.get('albumid')) + ')'
+                #autopep8: off
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Title"       , item['title'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Label"       , item['title']) #needs to be removed
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Artist"      , " / ".join(item['artist']))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Genre"       , " / ".join(item['genre']))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Theme"       , " / ".join(item['theme']))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Mood"        , " / ".join(item['mood']))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Style"       , " / ".join(item['style']))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Type"        , " / ".join(item['type']))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Year"        , str(item['year']))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.RecordLabel" , item['albumlabel'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Description" , fetcher.text(item['description']))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Rating"      , rating)
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Userrating"  , str(item['userrating']))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Thumb"       , item['thumbnail']) #remove
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Fanart"      , item['fanart']) #remove
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Art(thumb)"  , item['thumbnail'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Art(fanart)" , item['fanart'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Play"        , play)
+                #autopep8: on
+        del json_query
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# pylint: disable=line-too-long,invalid-name
+
+"""Module fetches the artist widgets with AudioLibrary.GetArtists.  Imported
+by the fetcher on the first refresh of one of them
+
+"""
+
+import json as simplejson
+
+from resources.lib.providers import consume
+
+
+def fetch(fetcher, request):
+    if not fetcher.abort():
+        # Random artist
+        json_query = fetcher.execute('{"jsonrpc": "2.0", '
+                                     '"method": "AudioLibrary.GetArtists", '
+                                     '"params": {"properties": '
+                                     '["genre", '
+                                     '"description", '
+                                     '"mood", '
+                                     '"style", '
+                                     '"born", '
+                                     '"died", '
+                                     '"formed", '
+                                     '"disbanded", '
+                                     '"yearsactive", '
+                                     '"instrument", '
+                                     '"fanart", '
+                                     '"thumbnail", '
+                                     '"art"], '
+                                     '"sort": {"method": "random"}, '
+                                     '"limits": {"end": %d}}, "id": 1}' % fetcher.limit(request))
+        json_query = simplejson.loads(json_query)
+        if 'result' in json_query and 'artists' in json_query['result']:
+            fetcher.clear(request)
+            count = 0
+            for item in consume(json_query['result']['artists']):
+                count += 1
+                # if count <= 2:
+                # log('music artist json respone: {}'.format(item))  # debug
+                path = 'musicdb://2/' + str(item['artistid']) + '/'
+                #autopep8: off
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Title"       , item['label'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Genre"       , " / ".join(item['genre']))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Thumb"       , item['thumbnail']) #remove
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Fanart"      , item['fanart']) #remove
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Art(thumb)"  , item['thumbnail'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Art(fanart)" , item['fanart'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Description" , fetcher.text(item['description']))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Born"        , item['born'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Died"        , item['died'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Formed"      , item['formed'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Disbanded"   , item['disbanded'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.YearsActive" , " / ".join(item['yearsactive']))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Style"       , " / ".join(item['style']))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Mood"        , " / ".join(item['mood']))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Instrument"  , " / ".join(item['instrument']))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.LibraryPath" , path)
+                #autopep8: on
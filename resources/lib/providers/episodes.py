@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# pylint: disable=line-too-long,invalid-name
+
+"""Module fetches the episode widgets with VideoLibrary.GetEpisodes.
+Imported by the fetcher on the first refresh of one of them
+
+"""
+
+import json as simplejson
+import os
+
+from resources.lib.providers import consume, media_path, media_streamdetails
+
+
+def fetch(fetcher, request: str):
+    """sets the properties of an episode widget
+
+    Args:
+        fetcher (Widgets_Fetcher): sets the properties and sends the queries
+        request (str): widget request ie RecentEpisode
+    """
+    if request == 'RecommendedEpisode':
+        _recommended(fetcher, request)
+    else:
+        _episodes(fetcher, request)
+
+
+def _recommended(fetcher, request: str):
+    """Gets unplayed episodes of tv shows via json rpc
+    VideoLibrary.GetTVShows based on request
+
+    Args:
+        fetcher (Widgets_Fetcher): sets the properties and sends the queries
+        request (str): in progress/random/last added
+    """
+    if not fetcher.abort():
+        # First unplayed episode of recent played tvshows
+        json_query = fetcher.execute('{"jsonrpc": "2.0", '
+                                     '"method": "VideoLibrary.GetTVShows", '
+                                     '"params": {"properties": ["title", '
+                                     '"studio", '
+                                     '"mpaa", '
+                                     '"file", '
+                                     '"art"'
+                                     '], '
+                                     '"sort": {"order": "descending", '
+                                     '"method": "lastplayed"}, '
+                                     '"filter": {"field": "inprogress", '
+                                     '"operator": "true", "value": ""}, '
+                                     '"limits": {"end": %d}}, "id": 1}' % fetcher.limit(request))
+        json_query = simplejson.loads(json_query)
+        if 'result' in json_query and 'tvshows' in json_query['result']:
+            fetcher.clear(request)
+            count = 0
+            for item in consume(json_query['result']['tvshows']):
+                if fetcher.abort():
+                    return
+                count += 1
+                json_query2 = fetcher.execute(
+                    '{"jsonrpc": "2.0", '
+                    '"method": "VideoLibrary.GetEpisodes", '
+                    '"params": {"tvshowid": %d, "properties": ["title", '
+                    '"playcount", '
+                    '"plot", '
+                    '"season", '
+                    '"episode", '
+                    '"showtitle", '
+                    '"file", '
+                    '"lastplayed", '
+                    '"rating", '
+                    '"userrating", '
+                    '"resume", '
+                    '"art", '
+                    '"streamdetails", '
+                    '"firstaired", '
+                    '"runtime"'
+                    '], '
+                    '"sort": {"method": "episode"}, '
+                    '"filter": {"field": '
+                    '"playcount", '
+                    '"operator": "is", '
+                    '"value": "0"}, '
+                    '"limits": {"end": 1}}, '
+                    '"id": 1}' % item['tvshowid'])
+                json_query2 = simplejson.loads(json_query2)
+                if ('result' in json_query2
+                    and json_query2['result'] is not None
+                        and 'episodes' in json_query2['result']):
+                    for item2 in consume(json_query2['result']['episodes']):
+                        episode = f"{float(item2['episode']):.2f}"
+                        season = f"{float(item2['season']):.2f}"
+                        rating = str(round(float(item2['rating']), 1))
+                        episodeno = f"s{season}e{episode}"
+                        art2 = item2['art']
+                        # if float(item2['episode']) <= 2:
+                        # log('TVshow episode item2: {}'.format(item2))  #debug
+                        # seasonthumb = ''
+                        if (item2['resume']['position']
+                                and item2['resume']['total']) > 0:
+                            resume = "true"
+                            played = f"{int((float(item2['resume']['position']) / float(item2['resume']['total'])) * 100)}%"
+                            played_asint = f"{int((float(item2['resume']['position']) / float(item2['resume']['total'])) * 100)}"
+                        else:
+                            resume = "false"
+                            played = '0%'
+                            played_asint = '0'
+                        if item2['playcount'] >= 1:
+                            watched = "true"
+                        else:
+                            watched = "false"
+                        if not fetcher.settings.plot_enable and watched == "false":
+                            plot = fetcher.unwatched_plot
+                        else:
+                            plot = fetcher.text(item2['plot'])
+                        art = item['art']
+                        path = media_path(item['file'])
+                        play = ('RunScript(' + fetcher.addonid + ',episodeid='
+                                + str(item2.get('episodeid')) + ')')
+                        streaminfo = media_streamdetails(item['file'].lower(),
+                                                         item2['streamdetails'])
+                        if len(item['studio']) > 0:
+                            studio = item['studio'][0]
+                        else:
+                            studio = ""
+                        #autopep8: off
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.DBID"                     , str(item2.get('episodeid')))
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.Title"                    , item2['title'])
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.Episode"                  , episode)
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.EpisodeNo"                , episodeno)
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.Season"                   , season)
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.Plot"                     , plot)
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.TVshowTitle"              , item2['showtitle'])
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.Rating"                   , rating)
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.Runtime"                  , str(int((item2['runtime'] / 60) + 0.5)))
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.Premiered"                , item2['firstaired'])
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.Art(thumb)"               , art2.get('thumb'     ,''))
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.Art(icon)"                , art2.get('icon',''))
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.Art(tvshow.fanart)"       , art2.get('tvshow.fanart',''))
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.Art(tvshow.poster)"       , art2.get('tvshow.poster',''))
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.Art(tvshow.banner)"       , art2.get('tvshow.banner',''))
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.Art(tvshow.clearlogo)"    , art2.get('tvshow.clearlogo',''))
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.Art(tvshow.clearart)"     , art2.get('tvshow.clearart',''))
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.Art(tvshow.landscape)"    , art2.get('tvshow.landscape',''))
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.Art(tvshow.characterart)" , art2.get('tvshow.characterart',''))
+                        #fetcher.WINDOW.setProperty(f"{request}.{count}.Art(season.poster)"      , seasonthumb)
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.Studio"                   , studio)
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.mpaa"                     , item['mpaa'])
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.Resume"                   , resume)
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.PercentPlayed"            , played)
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.PercentPlayedAsInt"       , played_asint)
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.Watched"                  , watched)
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.File"                     , item2['file'])
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.Path"                     , path)
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.Play"                     , play)
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.VideoCodec"               , streaminfo['videocodec'])
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.VideoResolution"          , streaminfo['videoresolution'])
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.VideoAspect"              , streaminfo['videoaspect'])
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.AudioCodec"               , streaminfo['audiocodec'])
+                        fetcher.WINDOW.setProperty(f"{request}.{count}.AudioChannels"            , str(streaminfo['audiochannels']))
+                        #autopep8: on
+                del json_query2
+        del json_query
+
+
+def _episodes(fetcher, request):
+    if not fetcher.abort():
+        json_string = ('{"jsonrpc": "2.0", "id": 1, '
+                       '"method": "VideoLibrary.GetEpisodes", '
+                       '"params": { "properties": '
+                       '["title", '
+                       '"playcount", '
+                       '"season", '
+                       '"episode", '
+                       '"showtitle", '
+                       '"plot", '
+                       '"file", '
+                       '"rating", '
+                       '"userrating", '
+                       '"resume", '
+                       '"tvshowid", '
+                       '"art", '
+                       '"streamdetails", '
+                       '"firstaired", '
+                       '"runtime"], '
+                       '"limits": {"end": %d},' % fetcher.limit(request))
+        if request.startswith('Playlist'):
+            json_query = fetcher.execute(
+                fetcher.playlists.query(request, json_string))
+        elif request == 'RecentEpisode' and fetcher.settings.recentitems_unplayed:
+            json_query = fetcher.watermark.query(
+                request, '%s "sort": {"order": "descending", '
+                '"method": "dateadded"}, '
+                '"filter": {"field": "playcount", '
+                '"operator": "lessthan", '
+                '"value": "1"}}}' % json_string)
+        elif request == 'RecentEpisode':
+            json_query = fetcher.watermark.query(
+                request, '%s "sort": {"order": "descending", "method": "dateadded"}}}' % json_string)
+        elif request == 'RandomEpisode' and fetcher.settings.randomitems_unplayed:
+            json_query = fetcher.execute(
+                '%s "sort": {"method": "random" }, "filter": {"field": "playcount", "operator": "lessthan", "value": "1"}}}' % json_string)
+        else:
+            json_query = fetcher.execute(
+                '%s "sort": {"method": "random" }}}' % json_string)
+        json_query = simplejson.loads(json_query)
+        if 'result' in json_query and 'episodes' in json_query['result']:
+            fetcher.clear(request)
+            count = 0
+            for item in consume(json_query['result']['episodes']):
+                count += 1
+                # if count <= 2:
+                #   log('tvshow episeode json resuolt: {}'.format(item))  #debug
+                '''
+                # This part is commented out because it takes 1.5second extra on my system
+                # to request these which doubles the total time.
+                # Hence the ugly path hack that will require users to have season folders.
+                json_query2 = fetcher.execute('{"jsonrpc": "2.0", "method": "VideoLibrary.GetTVShowDetails", "params": {"properties": ["file", "studio"], "tvshowid":%s}, "id": 1}' %item['tvshowid'])
+                json_query2 = simplejson.loads(json_query2)
+                path = json_query2['result']['tvshowdetails']['file']
+                studio = json_query2['result']['tvshowdetails']['studio'][0]
+                '''
+                if fetcher.settings.randomitems_seasonfolders:
+                    path = os.path.split(media_path(item['file']))[0]
+                else:
+                    path = media_path(item['file'])
+                episode = f"{float(item['episode']):.2f}"
+                season = f"{float(item['season']):.2f}"
+                episodeno = f"s{season}e{episode}"
+                # seasonthumb = ''
+                rating = str(round(float(item['rating']), 1))
+                if (item['resume']['position'] and item['resume']['total']) > 0:
+                    resume = "true"
+                    played = f"{int((float(item['resume']['position']) / float(item['resume']['total'])) * 100)}%"
+                    played_asint = f"{int((float(item['resume']['position']) / float(item['resume']['total'])) * 100)}"
+                else:
+                    resume = "false"
+                    played = '0%'
+                    played_asint = '0'
+                if item['playcount'] >= 1:
+                    watched = "true"
+                else:
+                    watched = "false"
+                if not fetcher.settings.plot_enable and watched == "false":
+                    plot = fetcher.unwatched_plot
+                else:
+                    plot = fetcher.text(item['plot'])
+                art = item['art']
+                path = media_path(item['file'])
+                play = 'RunScript(' + fetcher.addonid + ',episodeid=' + \
+                    str(item.get('episodeid')) + ')'
+                streaminfo = media_streamdetails(item['file'].lower(),
+                                                 item['streamdetails'])
+                #autopep8: off
+                fetcher.WINDOW.setProperty(f"{request}.{count}.DBID"                     , str(item.get('episodeid')))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Title"                    , item['title'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Episode"                  , episode)
+                fetcher.WINDOW.setProperty(f"{request}.{count}.EpisodeNo"                , episodeno)
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Season"                   , season)
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Plot"                     , plot)
+                fetcher.WINDOW.setProperty(f"{request}.{count}.TVshowTitle"              , item['showtitle'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Rating"                   , rating)
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Runtime"                  , str(int((item['runtime'] / 60) + 0.5)))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Premiered"                , item['firstaired'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Art(thumb)"               , art.get('thumb',''))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Art(icon)"                , art.get('icon',''))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Art(tvshow.fanart)"       , art.get('tvshow.fanart',''))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Art(tvshow.poster)"       , art.get('tvshow.poster',''))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Art(tvshow.banner)"       , art.get('tvshow.banner',''))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Art(tvshow.clearlogo)"    , art.get('tvshow.clearlogo',''))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Art(tvshow.clearart)"     , art.get('tvshow.clearart',''))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Art(tvshow.landscape)"    , art.get('tvshow.landscape',''))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Art(tvshow.characterart)" , art.get('tvshow.characterart',''))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Resume"                   , resume)
+                fetcher.WINDOW.setProperty(f"{request}.{count}.PercentPlayed"            , played)
+                fetcher.WINDOW.setProperty(f"{request}.{count}.PercentPlayedAsInt"       , played_asint)
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Watched"                  , watched)
+                fetcher.WINDOW.setProperty(f"{request}.{count}.File"                     , item['file'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Path"                     , path)
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Play"                     , play)
+                fetcher.WINDOW.setProperty(f"{request}.{count}.VideoCodec"               , streaminfo['videocodec'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.VideoResolution"          , streaminfo['videoresolution'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.VideoAspect"              , streaminfo['videoaspect'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.AudioCodec"               , streaminfo['audiocodec'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.AudioChannels"            , str(streaminfo['audiochannels']))
+                #autopep8: on
+        del json_query
+
+
+def _seasonthumb(fetcher, tvshowid, seasonnumber):
+    json_query = fetcher.execute('{"jsonrpc": "2.0", '
+                                 '"method": "VideoLibrary.GetSeasons", '
+                                 '"params": {"properties": ["season", "thumbnail"], '
+                                 '"tvshowid":%s }, "id": 1}' % tvshowid)
+    json_query = simplejson.loads(json_query)
+    if 'result' in json_query and 'seasons' in json_query['result']:
+        for item in json_query['result']['seasons']:
+            season = f"{float(item['season']):.2f}"
+            if season == seasonnumber:
+                thumbnail = item['thumbnail']
+                return thumbnail
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# pylint: disable=line-too-long,invalid-name
+
+"""Module fetches the movie widgets with VideoLibrary.GetMovies.  Imported
+by the fetcher on the first refresh of one of them
+
+"""
+
+import json as simplejson
+
+from resources.lib.providers import consume, media_path, media_streamdetails
+
+
+def fetch(fetcher, request: str):
+    """gets info via json rpc VideoLibrary.GetMovies for movies based on
+    request type
+
+    Args:
+        fetcher (Widgets_Fetcher): sets the properties and sends the queries
+        request (str enum):  RecommendedMovie (in progress)/RandomMovie/RecentMovie (last added)
+    """
+    if not fetcher.abort():
+        json_string = ('{"jsonrpc": "2.0",  "id": 1, '
+                       '"method": "VideoLibrary.GetMovies", '
+                       '"params": {"properties": ['
+                       '"title", '
+                       '"originaltitle", '
+                       '"playcount", '
+                       '"year", '
+                       '"genre", '
+                       '"studio", '
+                       '"country", '
+                       '"tagline", '
+                       '"plot", '
+                       '"runtime", '
+                       '"file", '
+                       '"plotoutline", '
+                       '"lastplayed", '
+                       '"trailer", '
+                       '"rating", '
+                       '"ratings", '
+                       '"userrating", '
+                       '"resume", '
+                       '"art", '
+                       '"streamdetails", '
+                       '"mpaa", '
+                       '"director"'
+                       '], '
+                       '"limits": {"end": %d},'
+                       % fetcher.limit(request))
+        if request.startswith('Playlist'):
+            json_query = fetcher.execute(
+                fetcher.playlists.query(request, json_string))
+        elif request == 'RecommendedMovie':
+            json_query = fetcher.execute(
+                '%s "sort": {"order": "descending", "method": "lastplayed"},'
+                '"filter": {"field": "inprogress", "operator": "true", '
+                '"value": ""}}}' % json_string)
+        elif request == 'RecentMovie' and fetcher.settings.recentitems_unplayed:
+            json_query = fetcher.watermark.query(
+                request, '%s "sort": {"order": "descending", "method": "dateadded"}, '
+                '"filter": {"field": "playcount", "operator": "is", '
+                '"value": "0"}}}' % json_string)
+        elif request == 'RecentMovie':
+            json_query = fetcher.watermark.query(
+                request, '%s "sort": {"order": "descending", "method": "dateadded"}}}'
+                % json_string)
+        elif request == "RandomMovie" and fetcher.settings.randomitems_unplayed:
+            json_query = fetcher.execute(
+                '%s "sort": {"method": "random" }, "filter": '
+                '{"field": "playcount", "operator": "lessthan", '
+                '"value": "1"}}}' % json_string)
+        else:
+            json_query = fetcher.execute(
+                '%s "sort": {"method": "random" } }}' % json_string)
+        json_query = simplejson.loads(json_query)
+        if 'result' in json_query and 'movies' in json_query['result']:
+            fetcher.clear(request)
+            count = 0
+            for item in consume(json_query['result']['movies']):
+                count += 1
+                # if count <= 2:
+                # log('get movie json response: {}'.format(item))  #debug
+                if (item['resume']['position']
+                        and item['resume']['total']) > 0:
+                    resume = "true"
+                    played = f"{int((float(item['resume']['position']) / float(item['resume']['total'])) * 100)}%"
+                    played_asint = f"{int((float(item['resume']['position']) / float(item['resume']['total'])) * 100)}"
+                else:
+                    resume = "false"
+                    played = '0%'
+                    played_asint = '0'
+                if item['playcount'] >= 1:
+                    watched = "true"
+                else:
+                    watched = "false"
+                if not fetcher.settings.plot_enable and watched == "false":
+                    plot = fetcher.unwatched_plot
+                else:
+                    plot = fetcher.text(item['plot'])
+                art = item['art']
+                path = media_path(item['file'])
+                play = ('RunScript(' + fetcher.addonid + ',movieid='
+                        + str(item.get('movieid')) + ')')
+                streaminfo = media_streamdetails(item['file'].lower(),
+                                                 item['streamdetails'])
+                if len(item['studio']) > 0:
+                    studio = item['studio'][0]
+                else:
+                    studio = ""
+                if len(item['country']) > 0:
+                    country = item['country'][0]
+                else:
+                    country = ""
+                #autopep8: off
+                fetcher.WINDOW.setProperty(f"{request}.{count}.DBID"                 , str(item.get('movieid')))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Title"                , item['title'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.OriginalTitle"        , item['originaltitle'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Year"                 , str(item['year']))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Genre"                , " / ".join(item['genre']))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Studio"               , studio)
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Country"              , country)
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Plot"                 , plot)
+                fetcher.WINDOW.setProperty(f"{request}.{count}.PlotOutline"          , fetcher.text(item['plotoutline']))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Tagline"              , item['tagline'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Runtime"              , str(int((item['runtime'] / 60) + 0.5)))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Rating"               , str(round(float(item['rating'])     ,1)))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Userrating"           , str(item['userrating']))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.mpaa"                 , item['mpaa'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Director"             , " / ".join(item['director']))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Trailer"              , item['trailer'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Art(poster)"          , art.get('poster',''))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Art(fanart)"          , art.get('fanart',''))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Art(clearlogo)"       , art.get('clearlogo',''))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Art(clearart)"        , art.get('clearart',''))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Art(landscape)"       , art.get('landscape',''))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Art(banner)"          , art.get('banner',''))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Art(discart)"         , art.get('discart',''))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Art(icon)"            , art.get('icon',''))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Resume"               , resume)
+                fetcher.WINDOW.setProperty(f"{request}.{count}.PercentPlayed"        , played)
+                fetcher.WINDOW.setProperty(f"{request}.{count}.PercentPlayedAsInt"   , played_asint)
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Watched"              , watched)
+                fetcher.WINDOW.setProperty(f"{request}.{count}.File"                 , item['file'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Path"                 , path)
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Play"                 , play)
+                fetcher.WINDOW.setProperty(f"{request}.{count}.VideoCodec"           , streaminfo['videocodec'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.VideoResolution"      , streaminfo['videoresolution'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.VideoAspect"          , streaminfo['videoaspect'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.HDRType"              , streaminfo['hdrtype'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.AudioCodec"           , streaminfo['audiocodec'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.AudioChannels"        , str(streaminfo['audiochannels']))
+                for k,v in art.items():
+                    fetcher.WINDOW.setProperty(f"{request}.{count}.Art({k})"         , str(v))
+                #autopep8: on
+
+        del json_query
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# pylint: disable=line-too-long,invalid-name
+
+"""Module fetches the music video widgets with VideoLibrary.GetMusicVideos.
+Imported by the fetcher on the first refresh of one of them
+
+"""
+
+import json as simplejson
+
+from resources.lib.providers import consume, media_path, media_streamdetails
+
+
+def fetch(fetcher, request):
+    if not fetcher.abort():
+        json_string = ('{"jsonrpc": "2.0",  "id": 1, '
+                       '"method": "VideoLibrary.GetMusicVideos", '
+                       '"params": {"properties": '
+                       '["title", '
+                       '"artist", '
+                       '"playcount", '
+                       '"year", '
+                       '"plot", '
+                       '"genre", '
+                       '"runtime", '
+                       '"userrating", '
+                       '"art", '
+                       '"file", '
+                       '"streamdetails", '
+                       '"resume"],  '
+                       '"limits": {"end": %d},' % fetcher.limit(request))
+        if request.startswith('Playlist'):
+            json_query = fetcher.execute(
+                fetcher.playlists.query(request, json_string))
+        elif request == 'RecommendedMusicVideo':
+            json_query = fetcher.execute(
+                '%s "sort": {"order": "descending", "method": "playcount" }}}' % json_string)
+        elif request == 'RecentMusicVideo':
+            json_query = fetcher.watermark.query(
+                request, '%s "sort": {"order": "descending", "method": "dateadded"}}}' % json_string)
+        else:
+            json_query = fetcher.execute(
+                '%s "sort": {"method": "random"}}}' % json_string)
+        json_query = simplejson.loads(json_query)
+        if 'result' in json_query and 'musicvideos' in json_query['result']:
+            fetcher.clear(request)
+            count = 0
+            for item in consume(json_query['result']['musicvideos']):
+                count += 1
+                # if count <= 2:
+                # log('music vidoe jsopn respone: {}'.format(item))  # debug
+                if (item['resume']['position'] and item['resume']['total']) > 0:
+                    resume = "true"
+                    played = f"{int((float(item['resume']['position']) / float(item['resume']['total'])) * 100)}%"
+                    played_asint = f"{int((item['resume']['position'] / item['resume']['total']) * 100)}"
+                else:
+                    resume = "false"
+                    played = '0%'
+                    played_asint = '0'
+                if item['playcount'] >= 1:
+                    watched = "true"
+                else:
+                    watched = "false"
+                art = item['art']
+                play = 'RunScript(' + fetcher.addonid + ',musicvideoid=' + \
+                    str(item.get('musicvideoid')) + ')'
+                path = media_path(item['file'])
+                streaminfo = media_streamdetails(item['file'].lower(),
+                                                 item['streamdetails'])
+                runtimesecs = f'{str(item["runtime"] // 60)}:{item["runtime"] % 60:02d}'
+                #autopep8: off
+                fetcher.WINDOW.setProperty(f"{request}.{count}.DBID"               , str(item.get('musicvideoid')))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Title"              , item['title'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Artist"             , " / ".join(item['artist']))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Year"               , str(item['year']))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Plot"               , fetcher.text(item['plot']))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Genre"              , " / ".join(item['genre']))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Userrating"         , str(item['userrating']))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Runtime"            , str(int((item['runtime'] / 60) + 0.5)))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Runtimesecs"        , runtimesecs)
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Thumb"              , art.get('thumb','')) #remove
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Fanart"             , art.get('fanart','')) #remove
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Art(thumb)"         , art.get('thumb',''))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Art(fanart)"        , art.get('fanart',''))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Art(clearlogo)"     , art.get('clearlogo',''))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Art(clearart)"      , art.get('clearart',''))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Art(landscape)"     , art.get('landscape',''))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Art(banner)"        , art.get('banner',''))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Art(cover)"         , art.get('cover',''))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Art(icon)"          , art.get('icon',''))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.File"               , item['file'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Path"               , path)
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Resume"             , resume)
+                fetcher.WINDOW.setProperty(f"{request}.{count}.PercentPlayed"      , played)
+                fetcher.WINDOW.setProperty(f"{request}.{count}.PercentPlayedAsInt" , played_asint)
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Watched"            , watched)
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Play"               , play)
+                fetcher.WINDOW.setProperty(f"{request}.{count}.VideoCodec"         , streaminfo['videocodec'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.VideoResolution"    , streaminfo['videoresolution'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.VideoAspect"        , streaminfo['videoaspect'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.AudioCodec"         , streaminfo['audiocodec'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.AudioChannels"      , str(streaminfo['audiochannels']))
+                #autopep8: on
+        del json_query
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# pylint: disable=line-too-long,invalid-name
+
+"""Module fetches the PVR recording and timer widgets from the fetcher's
+PvrCache.  Imported by the fetcher on the first refresh of one of them
+
+"""
+
+import datetime
+
+from resources.lib.providers import playback_properties
+from resources.lib.pvr import DATE_FORMAT
+
+
+def fetch(fetcher, request: str):
+    """sets the properties of a recording or timer widget
+
+    Args:
+        fetcher (Widgets_Fetcher): sets the properties and holds the cache
+        request (str): widget request ie RecentRecording
+    """
+    if fetcher.abort():
+        return
+    if request.endswith('Timer'):
+        fetcher.pvr.sync('timer')
+        _timers(fetcher, request, fetcher.pvr.timers(fetcher.limit(request)))
+    else:
+        fetcher.pvr.sync('recording')
+        _recordings(fetcher, request, fetcher.pvr.recordings(
+            in_progress=request == 'InProgressRecording',
+            unplayed=(request == 'RecentRecording'
+                      and fetcher.settings.recentitems_unplayed),
+            limit=fetcher.limit(request)))
+
+
+def _recordings(fetcher, request: str, items: list):
+    """sets the properties of recording items
+
+    Args:
+        fetcher (Widgets_Fetcher): sets the properties
+        request (str): RecentRecording or InProgressRecording
+        items (list): recordings from the cache
+    """
+    fetcher.clear(request)
+    for count, item in enumerate(items, 1):
+        art = item.get('art', {})
+        played = playback_properties(item)
+        if not fetcher.settings.plot_enable and played['Watched'] == "false":
+            plot = fetcher.unwatched_plot
+        else:
+            plot = fetcher.text(item['plot'])
+        play = ('RunScript(' + fetcher.addonid + ',recordingid='
+                + str(item.get('recordingid')) + ')')
+        #autopep8: off
+        fetcher.WINDOW.setProperty(f"{request}.{count}.DBID"               , str(item.get('recordingid')))
+        fetcher.WINDOW.setProperty(f"{request}.{count}.Title"              , item['title'])
+        fetcher.WINDOW.setProperty(f"{request}.{count}.Plot"               , plot)
+        fetcher.WINDOW.setProperty(f"{request}.{count}.PlotOutline"        , fetcher.text(item['plotoutline']))
+        fetcher.WINDOW.setProperty(f"{request}.{count}.Genre"              , " / ".join(item['genre']))
+        fetcher.WINDOW.setProperty(f"{request}.{count}.Channel"            , item['channel'])
+        fetcher.WINDOW.setProperty(f"{request}.{count}.StartTime"          , local_time(item['starttime']))
+        fetcher.WINDOW.setProperty(f"{request}.{count}.EndTime"            , local_time(item['endtime']))
+        fetcher.WINDOW.setProperty(f"{request}.{count}.Runtime"            , str(int((item['runtime'] / 60) + 0.5)))
+        fetcher.WINDOW.setProperty(f"{request}.{count}.Art(thumb)"         , art.get('thumb', ''))
+        fetcher.WINDOW.setProperty(f"{request}.{count}.Art(fanart)"        , art.get('fanart', ''))
+        fetcher.WINDOW.setProperty(f"{request}.{count}.Art(icon)"          , art.get('icon', item['icon']))
+        fetcher.WINDOW.setProperty(f"{request}.{count}.File"               , item['file'])
+        fetcher.WINDOW.setProperty(f"{request}.{count}.Radio"              , str(item['radio']).lower())
+        fetcher.WINDOW.setProperty(f"{request}.{count}.Resume"             , played['Resume'])
+        fetcher.WINDOW.setProperty(f"{request}.{count}.PercentPlayed"      , played['PercentPlayed'])
+        fetcher.WINDOW.setProperty(f"{request}.{count}.PercentPlayedAsInt" , played['PercentPlayedAsInt'])
+        fetcher.WINDOW.setProperty(f"{request}.{count}.Watched"            , played['Watched'])
+        fetcher.WINDOW.setProperty(f"{request}.{count}.Play"               , play)
+        #autopep8: on
+
+
+def _timers(fetcher, request: str, items: list):
+    """sets the properties of timer items, Play tunes to the channel
+
+    Args:
+        fetcher (Widgets_Fetcher): sets the properties
+        request (str): UpcomingTimer
+        items (list): timers from the cache
+    """
+    fetcher.clear(request)
+    for count, item in enumerate(items, 1):
+        play = ('RunScript(' + fetcher.addonid + ',channelid='
+                + str(item['channelid']) + ')')
+        #autopep8: off
+        fetcher.WINDOW.setProperty(f"{request}.{count}.DBID"               , str(item.get('timerid')))
+        fetcher.WINDOW.setProperty(f"{request}.{count}.Title"              , item['title'])
+        fetcher.WINDOW.setProperty(f"{request}.{count}.Plot"               , fetcher.text(item['summary']))
+        fetcher.WINDOW.setProperty(f"{request}.{count}.ChannelID"          , str(item['channelid']))
+        fetcher.WINDOW.setProperty(f"{request}.{count}.StartTime"          , local_time(item['starttime']))
+        fetcher.WINDOW.setProperty(f"{request}.{count}.EndTime"            , local_time(item['endtime']))
+        fetcher.WINDOW.setProperty(f"{request}.{count}.State"              , item['state'])
+        fetcher.WINDOW.setProperty(f"{request}.{count}.Radio"              , str(item['isradio']).lower())
+        fetcher.WINDOW.setProperty(f"{request}.{count}.Play"               , play)
+        #autopep8: on
+
+
+def local_time(utc: str) -> str:
+    """converts a PVR time to local time
+
+    Args:
+        utc (str): UTC time ie 2024-01-01 20:00:00
+
+    Returns:
+        str: local time in the same format, empty if not set
+    """
+    if not utc:
+        return ''
+    return datetime.datetime.strptime(utc, DATE_FORMAT).replace(
+        tzinfo=datetime.timezone.utc).astimezone().strftime(DATE_FORMAT)
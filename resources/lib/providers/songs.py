@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# pylint: disable=line-too-long,invalid-name
+
+"""Module fetches the song widgets with AudioLibrary.GetSongs.  Imported by
+the fetcher on the first refresh of one of them
+
+"""
+
+import json as simplejson
+
+from resources.lib.providers import consume, media_path
+
+
+def fetch(fetcher, request):
+    if not fetcher.abort():
+        json_string = ('{"jsonrpc": "2.0", "id": 1, "method": "AudioLibrary.GetSongs", '
+                       '"params": {"properties": '
+                       '["title", '
+                       '"playcount", '
+                       '"artist", '
+                       '"album", '
+                       '"comment", '
+                       '"year", '
+                       '"file", '
+                       '"thumbnail", '
+                       '"fanart", '
+                       '"art", '
+                       '"rating", '
+                       '"userrating"], '
+                       '"limits": {"end": %d},' % fetcher.limit(request))
+        if request.startswith('Playlist'):
+            json_query = fetcher.execute(
+                fetcher.playlists.query(request, json_string))
+        elif request == 'RandomSong' and fetcher.settings.randomitems_unplayed:
+            json_query = fetcher.execute(
+                '%s "sort": {"method": "random"}, "filter": '
+                '{"field": "playcount", "operator": "lessthan", '
+                '"value": "1"}}}' % json_string)
+        else:
+            json_query = fetcher.execute(
+                '%s  "sort": {"method": "random"}}}' % json_string)
+        json_query = simplejson.loads(json_query)
+        if 'result' in json_query and 'songs' in json_query['result']:
+            fetcher.clear(request)
+            count = 0
+            for item in consume(json_query['result']['songs']):
+                count += 1
+                # if count <= 2:
+                # log('music song json respone: {}'.format(item))  # debug
+                play = 'RunScript(' + fetcher.addonid + \
+                    ',songid=' + str(item.get('songid')) + ')'
+                path = media_path(item['file'])
+                #autopep8: off
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Title"       , item['title'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Artist"      , " / ".join(item['artist']))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Year"        , str(item['year']))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Rating"      , str(int(item['rating'])-48))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Userrating"  , str(item['userrating']))
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Album"       , item['album'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Thumb"       , item['thumbnail']) #remove
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Fanart"      , item['fanart']) #remove
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Art(thumb)"  , item['thumbnail'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Art(fanart)" , item['fanart'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.File"        , item['file'])
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Path"        , path)
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Play"        , play)
+                fetcher.WINDOW.setProperty(f"{request}.{count}.Description" , fetcher.text(item['comment']))
+                #autopep8: on
+        del json_query
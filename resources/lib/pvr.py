@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# pylint: disable=line-too-long,invalid-name
+
+"""Module keeps the PVR recordings and timers for the recording widgets so
+large recording backends are not asked for everything on each refresh.
+Recordings and timers are fetched with paged queries on first use and
+kept current from notifications: a PVR, VideoLibrary or Player
+notification for one recording or timer (ie its resume point saved after
+playback) queries or drops just that item, other PVR
+notifications and more than MAX_UPDATES changes fetch the list again.
+A timer whose end time has passed is dropped without a query, Kodi
+numbers recordings as they appear so the recording it made is queried by
+the ids after the newest cached one.  Times are UTC as Kodi returns them.
+Does not import xbmc, the JSON-RPC function is passed in
+
+"""
+
+import datetime
+import json
+import threading
+
+# media type: list method, result key, id key, detail method, properties
+PVR_TYPES = {
+    'recording': ('PVR.GetRecordings', 'recordings', 'recordingid',
+                  'PVR.GetRecordingDetails',
+                  ['title', 'plot', 'plotoutline', 'genre', 'playcount',
+                   'resume', 'channel', 'starttime', 'endtime', 'runtime',
+                   'icon', 'art', 'file', 'radio', 'isdeleted']),
+    'timer': ('PVR.GetTimers', 'timers', 'timerid', 'PVR.GetTimerDetails',
+              ['title', 'summary', 'channelid', 'isradio', 'istimerrule',
+               'starttime', 'endtime', 'state']),
+}
+# timer states of recordings still to come
+UPCOMING_STATES = ('new', 'scheduled', 'recording', 'conflict_ok',
+                   'conflict_notok')
+# items per query when fetching a list
+PAGE_SIZE = 1000
+# changed items queried one by one, more fetch the list again
+MAX_UPDATES = 50
+# ids after the newest recording queried for the recordings of ended
+# timers, and syncs they are looked for before they are given up
+NEW_IDS = 3
+NEW_SYNCS = 5
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class PvrCache:
+    """per media type map of recording or timer id to its item
+    """
+
+    def __init__(self, execute):
+        """
+        Args:
+            execute (callable): sends a JSON-RPC request, returns the response
+        """
+        self.execute = execute
+        # media type: {id: item}
+        self.items = {}
+        # media type: ids changed since the last sync, None to fetch again
+        self.changed = {}
+        # recordings of ended timers not found yet, syncs left to find them
+        # and the newest recording id cached when the first timer ended
+        self.ended = 0
+        self.ended_syncs = 0
+        self.ended_after = 0
+        # newest recording id cached when a timer was first marked changed
+        self.timers_after = None
+        self.lock = threading.Lock()
+
+    def _query(self, method: str, params: dict) -> dict:
+        """sends a JSON-RPC request
+
+        Args:
+            method (str): method ie PVR.GetRecordings
+            params (dict): parameters
+
+        Returns:
+            dict: the result, empty on errors ie when PVR is disabled
+        """
+        response = json.loads(self.execute(json.dumps({
+            'jsonrpc': '2.0', 'id': 1, 'method': method, 'params': params})))
+        return response.get('result') or {}
+
+    def build(self, media: str):
+        """fetches all recordings or timers with paged queries, a failed
+        query keeps the previous items
+
+        Args:
+            media (str): recording or timer
+        """
+        method, key, id_key, _, properties = PVR_TYPES[media]
+        items = {}
+        start = 0
+        while True:
+            result = self._query(method, {
+                'properties': properties,
+                'limits': {'start': start, 'end': start + PAGE_SIZE}})
+            if not result:
+                return
+            page = result.get(key, [])
+            for item in page:
+                items[item[id_key]] = item
+            start += PAGE_SIZE
+            if len(page) < PAGE_SIZE or start >= result.get(
+                    'limits', {}).get('total', 0):
+                break
+        with self.lock:
+            self.items[media] = items
+            self.changed[media] = set()
+            if media == 'recording':
+                self.ended = 0
+            else:
+                self.timers_after = None
+
+    def sync(self, media: str):
+        """brings the recordings or timers up to date, fetched on first use
+
+        Args:
+            media (str): recording or timer
+        """
+        with self.lock:
+            changed = self.changed.get(media)
+            rebuild = media not in self.items or changed is None
+            if not rebuild:
+                self.changed[media] = set()
+            if media == 'timer':
+                after, self.timers_after = self.timers_after, None
+        if rebuild:
+            self.build(media)
+            return
+        gone = 0
+        for item_id in changed:
+            item = self._details(media, item_id)
+            with self.lock:
+                if item:
+                    self.items[media][item_id] = item
+                else:
+                    self.items[media].pop(item_id, None)
+                    gone += 1
+        if media == 'timer' and gone:
+            # changed timers that are gone may have ended before the sync
+            with self.lock:
+                self._ended(gone, after)
+        if media == 'recording' and self.ended:
+            self._new_recordings()
+
+    def _details(self, media: str, item_id: int) -> dict:
+        """queries one recording or timer
+
+        Args:
+            media (str): recording or timer
+            item_id (int): its id
+
+        Returns:
+            dict: the item, None if it does not exist
+        """
+        _, key, id_key, detail, properties = PVR_TYPES[media]
+        return self._query(detail, {id_key: item_id, 'properties':
+                                    properties}).get(key[:-1] + 'details')
+
+    def _new_recordings(self):
+        """queries the recordings of ended timers by the ids after the
+        newest recording cached when they ended, until NEW_IDS ids in a row
+        after the newest cached one are missing.  Recordings the backend
+        has not listed yet are looked for again at the next NEW_SYNCS syncs
+        """
+        with self.lock:
+            item_id = self.ended_after
+            cached = set(self.items['recording'])
+        newest = max(cached, default=0)
+        found = missing = 0
+        while missing < NEW_IDS:
+            item_id += 1
+            if item_id in cached:
+                continue
+            item = self._details('recording', item_id)
+            if not item:
+                # ids up to the newest cached one may have been removed
+                missing += item_id > newest
+                continue
+            found += 1
+            missing = 0
+            with self.lock:
+                self.items['recording'][item_id] = item
+        with self.lock:
+            self.ended_syncs -= 1
+            self.ended = (0 if self.ended_syncs <= 0
+                          else max(0, self.ended - found))
+
+    def notification(self, method: str, data: str) -> bool:
+        """records a PVR change.  A notification for one recording or timer
+        marks it for the next sync or drops it if it was removed, other PVR
+        notifications fetch everything again
+
+        Args:
+            method (str): notification ie PVR.OnScanFinished
+            data (str): JSON notification data
+
+        Returns:
+            bool: True if the cached items changed or have to be synced
+        """
+        library, _, event = method.partition('.')
+        if library not in ('PVR', 'VideoLibrary', 'Player'):
+            return False
+        try:
+            data = json.loads(data) or {}
+        except (ValueError, TypeError):
+            data = {}
+        item = data.get('item', data) if isinstance(data, dict) else {}
+        media = item.get('type', '')
+        with self.lock:
+            if media in PVR_TYPES and item.get('id') is not None:
+                if media not in self.items:
+                    return False
+                if 'Remove' in event or 'Delete' in event:
+                    return self.items[media].pop(item['id'], None) is not None
+                if self.changed.get(media) is not None:
+                    if media == 'timer' and self.timers_after is None:
+                        self.timers_after = max(
+                            self.items.get('recording', {}), default=0)
+                    self.changed[media].add(item['id'])
+                    if len(self.changed[media]) > MAX_UPDATES:
+                        self.changed[media] = None
+                return True
+            if library != 'PVR':
+                return False
+            for cached in self.items:
+                self.changed[cached] = None
+            return bool(self.items)
+
+    def expire(self, now: str = '') -> bool:
+        """drops the timers that have ended, the next recording syncs look
+        for what they recorded
+
+        Args:
+            now (str, optional): UTC time ie 2024-01-01 20:00:00, defaults
+            to now
+
+        Returns:
+            bool: True if timers were dropped
+        """
+        now = now or utc_now()
+        with self.lock:
+            timers = self.items.get('timer', {})
+            ended = [timer_id for timer_id, timer in timers.items()
+                     if timer['endtime'] and timer['endtime'] <= now]
+            for timer_id in ended:
+                del timers[timer_id]
+            if ended:
+                self._ended(len(ended), max(
+                    self.items.get('recording', {}), default=0))
+        return bool(ended)
+
+    def _ended(self, count: int, after: int):
+        """starts looking for the recordings of ended timers at the next
+        recording syncs, called with the lock held
+
+        Args:
+            count (int): ended timers
+            after (int): newest recording id cached before they ended
+        """
+        if 'recording' not in self.items:
+            return
+        self.ended_after = (min(self.ended_after, after) if self.ended
+                            else after)
+        self.ended += count
+        self.ended_syncs = NEW_SYNCS
+
+    def recordings(self, in_progress: bool = False, unplayed: bool = False,
+                   limit: int = 20) -> list:
+        """gets the newest recordings
+
+        Args:
+            in_progress (bool, optional): only recordings with a resume point
+            unplayed (bool, optional): only recordings not played yet
+            limit (int, optional): number of recordings returned
+
+        Returns:
+            list: recording items, newest first
+        """
+        with self.lock:
+            items = [item for item in self.items.get('recording', {}).values()
+                     if not item.get('isdeleted')
+                     and (not in_progress or item['resume']['position'] > 0)
+                     and (not unplayed or not item['playcount'])]
+        items.sort(key=lambda item: item['starttime'], reverse=True)
+        return items[:limit]
+
+    def timers(self, limit: int = 20, now: str = '') -> list:
+        """gets the timers of recordings still to come, timer rules are
+        left out
+
+        Args:
+            limit (int, optional): number of timers returned
+            now (str, optional): UTC time, defaults to now
+
+        Returns:
+            list: timer items, the next to start first
+        """
+        now = now or utc_now()
+        with self.lock:
+            items = [item for item in self.items.get('timer', {}).values()
+                     if not item['istimerrule']
+                     and item['state'] in UPCOMING_STATES
+                     and (not item['endtime'] or item['endtime'] > now)]
+        items.sort(key=lambda item: item['starttime'])
+        return items[:limit]
+
+
+def utc_now() -> str:
+    """gets the current UTC time in the format of the PVR times
+
+    Returns:
+        str: ie 2024-01-01 20:00:00
+    """
+    return datetime.datetime.now(datetime.timezone.utc).strftime(DATE_FORMAT)
+
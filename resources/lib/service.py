@@ -0,0 +1,1764 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+#    This script is based on script.randomitems & script.wacthlist
+#    Thanks to their original authors
+#
+# pylint: disable=line-too-long,invalid-name
+
+"""Module provides widget lists of various types from Kodi library data
+for display in skin by setting window properties.
+"get_shutdown_mode" is a helper to retrieve setting "powermanagement.shutdownstate"
+Started from default.py
+
+"""
+
+import contextlib
+import dataclasses
+import datetime
+import functools
+import json as simplejson
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+
+import xbmc
+import xbmcaddon
+import xbmcgui
+import xbmcvfs
+
+from resources.lib import generations, jsonrpc, play, trace
+from resources.lib.governor import QueryGovernor
+from resources.lib.prewarm import TexturePrewarmer
+from resources.lib.shared import SharedSnapshot
+from resources.lib.tuning import AutoTuner
+from resources.lib.fetchers import AGGREGATE_WIDGETS, Widgets_Fetcher
+from resources.lib.watermark import is_added
+from resources.lib.window import PropertyRecorder, WidgetWindow
+
+__addon__ = xbmcaddon.Addon()
+__addonversion__ = __addon__.getAddonInfo('version')
+__addonid__ = __addon__.getAddonInfo('id')
+__addonname__ = __addon__.getAddonInfo('name')
+__localize__ = __addon__.getLocalizedString
+
+# widget groups in refresh order, in progress widgets are what the user
+# expects to see updated first on return to Home
+WIDGET_PRIORITY = ['Recommended', 'Recent', 'Random']
+RECOMMENDED_WIDGETS = ['RecommendedMovie', 'RecommendedEpisode',
+                       'RecommendedAlbum', 'RecommendedMusicVideo']
+RANDOM_WIDGETS = ['RandomMovie', 'RandomEpisode', 'RandomMusicVideo',
+                  'RandomAlbum', 'RandomArtist', 'RandomSong', 'RandomAddon']
+RECENT_WIDGETS = ['RecentMovie', 'RecentEpisode', 'RecentMusicVideo',
+                  'RecentAlbum']
+PVR_WIDGETS = ['RecentRecording', 'InProgressRecording', 'UpcomingTimer']
+# widgets to refetch when a setting changes, see Widgets_Settings.changes
+SETTING_WIDGETS = {
+    'plot_enable': [request for request in (RECOMMENDED_WIDGETS
+                                            + RANDOM_WIDGETS + RECENT_WIDGETS)
+                    if request.endswith(('Movie', 'Episode'))],
+    'recommended_enable': RECOMMENDED_WIDGETS,
+    'randomitems_enable': RANDOM_WIDGETS,
+    'randomitems_unplayed': ['RandomMovie', 'RandomEpisode', 'RandomSong'],
+    'randomitems_seasonfolders': ['RandomEpisode', 'RecentEpisode'],
+    'recentitems_enable': RECENT_WIDGETS,
+    'recentitems_unplayed': ['RecentMovie', 'RecentEpisode',
+                             'RecentRecording'],
+    'lowmem_enable': RECOMMENDED_WIDGETS + RANDOM_WIDGETS + RECENT_WIDGETS,
+    'shared_enable': RANDOM_WIDGETS + RECENT_WIDGETS,
+    'shared_path': RANDOM_WIDGETS + RECENT_WIDGETS,
+    'index_enable': list(AGGREGATE_WIDGETS),
+    'pvr_enable': PVR_WIDGETS,
+}
+# timed runs of each fetcher in the replay harness
+REPLAY_RUNS = 5
+# window names skins may use when registering widgets
+WINDOW_IDS = {'home': 10000, 'programs': 10001, 'pictures': 10002,
+              'videos': 10025, 'music': 10502}
+# optional skin manifest of the widgets shown per window
+WIDGET_MANIFEST = 'special://skin/extras/skinwidgets.json'
+# fullscreen video and visualisation windows, no refreshes while shown
+BUSY_WINDOWS = [12005, 12006]
+# seconds without user input before deferred refreshes are run
+IDLE_TIME = 30
+# library query limits, per minute budget is lower during a library scan
+QUERY_CONCURRENCY = 2
+QUERIES_PER_MINUTE = 120
+SCAN_QUERIES_PER_MINUTE = 20
+# artwork of published widget items warmed in the texture cache
+PREWARM_ART = ['poster', 'fanart', 'thumb', 'landscape', 'clearlogo',
+               'tvshow.poster', 'tvshow.fanart', 'tvshow.landscape',
+               'tvshow.clearlogo']
+PREWARM_CONCURRENCY = 2
+# artwork urls remembered as warmed, normal and low memory mode
+PREWARM_REMEMBER = 2000
+PREWARM_REMEMBER_LOWMEM = 500
+# seconds a widget query is served from the result cache by widget group,
+# random widgets are never cached
+CACHE_TTL = {'Recommended': 60, 'Recent': 600}
+# cached query results, normal and low memory mode
+CACHE_SIZE = 64
+CACHE_SIZE_LOWMEM = 16
+# library wide widgets shared between clients of one library
+SHARED_WIDGETS = RECENT_WIDGETS + RANDOM_WIDGETS
+# seconds between checks for a new shared snapshot
+SHARED_POLL = 30
+# seconds a widget missing from the snapshot waits for the leader to fetch
+# it before this client fetches it itself
+SHARED_WAIT = 120
+# seconds without a daemon heartbeat before an instance is considered dead,
+# and between heartbeats written by the heartbeat thread
+HEARTBEAT_TIMEOUT = 10
+HEARTBEAT_INTERVAL = 2
+# seconds a single query of a widget refresh may take before the widget
+# keeps its previous items and is marked stale
+QUERY_DEADLINE = 10
+# seconds before a stale widget is retried, doubled per failure up to max
+RETRY_BACKOFF = 30
+RETRY_BACKOFF_MAX = 600
+# played media type: widgets refreshed after playback, see _update
+PLAYBACK_TYPES = {'movie': 'movie', 'episode': 'episode',
+                  'musicvideo': 'musicvideo', 'song': 'music'}
+# daemon ticks between checks whether Kodi's debug logging was toggled
+TRACE_POLL = 60
+# daemon ticks between checks for ended PVR timers, only the cache is
+# checked, not the PVR backend
+PVR_POLL = 60
+# seconds before the random timer fires that the next random items are
+# prepared, one widget per daemon tick after ROTATION_IDLE seconds without
+# user input
+ROTATION_LEAD = 60
+ROTATION_IDLE = 5
+
+
+def log(txt: str, *args) -> None:
+    """writes to kodi log at debug level, tagged with the refresh being
+    traced.  Nothing is formatted unless Kodi's debug logging or the trace
+    file is on
+
+    Args:
+        txt (str): %-format string, or the message if there are no args
+        *args: values for the format string
+    """
+    trace.event(txt, *args)
+
+
+def init_trace(trace_file: bool = False) -> bool:
+    """traces to kodi log while debug logging is on and to trace.log in
+    the addon profile if the trace_file setting is on
+
+    Args:
+        trace_file (bool, optional): also write the rotating trace file
+
+    Returns:
+        bool: True if debug logging is on
+    """
+    debug = play.debug_logging()
+    path = ''
+    if trace_file:
+        profile = xbmcvfs.translatePath(__addon__.getAddonInfo('profile'))
+        os.makedirs(profile, exist_ok=True)
+        path = os.path.join(profile, 'trace.log')
+    trace.configure(play.kodi_writer(__addonname__) if debug else None, path)
+    return debug
+
+
+class Main:
+    """
+    Provides all processing
+    """
+
+    def __init__(self):
+        """If called as a runscript starts a
+        Kodi player to play selected mediaid.  If running as a service initalizes
+        globals and starts the _daemon
+        """
+        self.debug_logging = init_trace()
+        self._parse_argv()
+        # check how we were executed via globals
+        if play.play(self.params):
+            log('played from Main, default.py normally handles play actions')
+        elif self.params.get('replay'):
+            self._replay(self.params['replay'])
+        elif self.SHUTDOWNDLOG:
+            xbmcgui.Window(10000).setProperty(
+                'Shutdown_mode',
+                self.get_shutdown_mode()
+            )
+        else:  # run as service
+            self._init_vars()
+            # another instance already running stops before we fetch
+            if not self._take_over():
+                return
+            self._start_heartbeat()
+            self._init_property()
+            a_total = datetime.datetime.now()
+            self._fetch_info_randomitems()
+            self._fetch_info_recommended()
+            self._fetch_info_recentitems()
+            self._fetch_info_aggregates()
+            self._fetch_info_pvr()
+            self._fetch_info_playlists()
+            b_total = datetime.datetime.now()
+            c_total = b_total - a_total
+            log('Total time needed for all queries: %s', c_total)
+            self._daemon()
+
+    def _init_vars(self):
+        """Creates a home window, player, and monitor object
+        """
+        self.WINDOW = WidgetWindow(xbmcgui.Window(10000))
+        self.Player = Widgets_Player(action=self._on_stopped)
+        self.Monitor = Widgets_Monitor(update_listitems=self._update,
+                                       update_settings=self._on_change,
+                                       update_scan=self._on_scan,
+                                       notification=self._on_notification)
+        self.governor = QueryGovernor(concurrency=QUERY_CONCURRENCY,
+                                      per_minute=QUERIES_PER_MINUTE,
+                                      scan_per_minute=SCAN_QUERIES_PER_MINUTE,
+                                      wait=self._wait)
+        jsonrpc.set_governor(self.governor)
+        # run everything held back during a library scan in one pass
+        self.consolidate = False
+        self.fetcher = Widgets_Fetcher(self.WINDOW, jsonrpc.execute,
+                                       __addonid__, __localize__(32014),
+                                       abort=self.Monitor.abortRequested)
+        # auto-tuner of item counts, intervals and concurrency if enabled
+        self.tuner = None
+        # fetch engine process if enabled and properties it fetched ahead
+        self.engine = None
+        self.prefetched = {}
+        self.prewarmer = TexturePrewarmer(jsonrpc.execute,
+                                          concurrency=PREWARM_CONCURRENCY)
+        self.LIMIT = 20
+        # queued widget refreshes, request: urgent
+        self.pending = {}
+        self.pending_lock = threading.Lock()
+        # widgets registered by the skin per window id, None if the skin
+        # does not register them and all widgets are fetched
+        self.manifest = load_manifest()
+        self.active = self.manifest
+        self.active_property = ''
+        # registered widgets that are waiting for their window to be shown
+        self.stale = set()
+        # widgets that missed the query deadline, request: (failures, due)
+        self.retries = {}
+        # what queued a widget refresh, request: trigger
+        self.triggers = {}
+        # next random items prepared before the timer fires, request:
+        # properties or None if preparing failed
+        self.rotation = {}
+        # stops the heartbeat thread when the daemon ends
+        self.heartbeat_stop = threading.Event()
+        self.heartbeat = None
+        # addon settings, None until _init_property first reads them
+        self.settings = None
+
+    def _take_over(self) -> bool:
+        """makes this instance the only running daemon.  Bumps the home
+        window property SkinWidgets_Generation, an older instance sees it
+        no longer owns the generation and stops at the next widget or
+        daemon tick.  Waits until it has stopped or its heartbeat is older
+        than HEARTBEAT_TIMEOUT
+
+        Returns:
+            bool: False if Kodi is exiting
+        """
+        generation = self.WINDOW.getProperty('SkinWidgets_Generation')
+        self.generation = int(generation) + 1 if generation.isdigit() else 1
+        self.WINDOW.setProperty('SkinWidgets_Generation', str(self.generation))
+        log('taking over as generation %d', self.generation)
+        if not self.WINDOW.getProperty('SkinWidgets_Heartbeat'):
+            # instances without a heartbeat stop when the property is cleared
+            self.WINDOW.clearProperty('SkinWidgets_Running')
+        while self.WINDOW.getProperty('SkinWidgets_Running') == 'true':
+            heartbeat = self.WINDOW.getProperty('SkinWidgets_Heartbeat')
+            try:
+                if time.time() - float(heartbeat) > HEARTBEAT_TIMEOUT:
+                    log('previous instance has no heartbeat, taking over')
+                    break
+            except ValueError:
+                break
+            if self.Monitor.waitForAbort(0.5):
+                return False
+            if not self._is_owner():
+                # an even newer instance is taking over
+                return False
+        self.WINDOW.setProperty('SkinWidgets_Heartbeat', str(time.time()))
+        self.WINDOW.setProperty('SkinWidgets_Running', 'true')
+        return not self.Monitor.abortRequested()
+
+    def _start_heartbeat(self):
+        """writes SkinWidgets_Heartbeat every HEARTBEAT_INTERVAL seconds on
+        its own thread until the daemon ends, so a startup pass or a refresh
+        waiting on slow queries is not mistaken for a dead instance
+        """
+        def beat():
+            while not (self.heartbeat_stop.is_set()
+                       or self.Monitor.abortRequested()):
+                self.WINDOW.setProperty('SkinWidgets_Heartbeat',
+                                        str(time.time()))
+                self.heartbeat_stop.wait(HEARTBEAT_INTERVAL)
+
+        self.heartbeat = threading.Thread(target=beat, name='heartbeat',
+                                          daemon=True)
+        self.heartbeat.start()
+
+    def _stop_heartbeat(self):
+        """stops the heartbeat thread and waits for its last write"""
+        self.heartbeat_stop.set()
+        if self.heartbeat is not None:
+            self.heartbeat.join()
+
+    def _is_owner(self) -> bool:
+        """checks that no newer instance has taken over
+
+        Returns:
+            bool: True if this instance owns the current generation
+        """
+        return (self.WINDOW.getProperty('SkinWidgets_Generation')
+                == str(self.generation))
+
+    def _on_change(self):
+        """Widget_Monitor runs when addon settings change to update widgets.
+        Compares the settings before and after the change and clears the
+        widgets of disabled groups, the widgets affected by the other
+        changed settings are queued for a refetch
+        """
+        log('_on_change called gettings add infos and properties')
+        old_settings = self.settings
+        self._init_property()
+        refresh, clear = old_settings.changes(self.settings)
+        if old_settings.playlist_enable != self.settings.playlist_enable:
+            # playlist widgets are found at runtime, not in SETTING_WIDGETS
+            (refresh if self.settings.playlist_enable else clear).extend(
+                self.fetcher.playlists.widgets)
+        if tracemalloc.is_tracing() and not (self.settings.lowmem_enable
+                                             and self.settings.lowmem_trace):
+            tracemalloc.stop()
+        log('_on_change refresh %s clear %s', refresh, clear)
+        with self.pending_lock:
+            for request in clear:
+                self.pending.pop(request, None)
+                self.triggers.pop(request, None)
+        self.stale.difference_update(clear)
+        self.rotation.clear()
+        # refreshes running with the old settings stop, nothing they
+        # fetched is published over the cleared widgets
+        with generations.superseding(refresh + clear):
+            for request in clear:
+                self._clear_properties(request)
+        self._queue(refresh, urgent=True, trigger='settings')
+        log('_on_change completed')
+
+    def get_shutdown_mode(self) -> str:
+        """gets the system shutdown mode and saves to home property
+
+        MODES
+        0 - quit
+        1 - shutdown
+        2 - hibernate
+        3 - suspend
+        4 - reboot
+        5 - minimise
+        Returns:
+            str:  the localized string for the current mode
+        """
+
+        MODES = [13009, 13005, 13010, 13011, 13013, 13014]
+        response = jsonrpc.execute(
+            '{"jsonrpc":"2.0", "method":"Settings.GetSettingValue", "params":{"setting":"powermanagement.shutdownstate"}, "id":1}')
+        response = simplejson.loads(response)
+        # log(f'json response from setting: {response}')
+        if 'result' in response:
+            return xbmc.getLocalizedString(MODES[response['result']['value']])
+        return ''
+
+    def _init_property(self):
+        """Initializes home window properties and some globals
+        from addon settings.  On a settings change only the state of the
+        changed settings is rebuilt
+        """
+        previous = self.settings
+        if previous is None:
+            self.WINDOW.setProperty(
+                'Shutdown_mode',
+                self.get_shutdown_mode()
+            )
+        # log(f'shutdown prop: {xbmc.getInfoLabel("Window(home).Property(Shutdown_mode)")}')
+        self.settings = Widgets_Settings.from_addon(__addon__)
+        self.fetcher.settings = self.settings
+        self.debug_logging = init_trace(self.settings.trace_file)
+        if self.settings.playlist_enable:
+            self._scan_playlists()
+        if not isinstance(self.WINDOW.window, PropertyRecorder):
+            jsonrpc.set_backend(
+                jsonrpc.RECORD if self.settings.rpc_record else jsonrpc.LIVE,
+                self.settings.rpc_fixture, self.settings.rpc_anonymise)
+            self._init_engine()
+            self._init_tuner()
+        self.WINDOW.setProperty(
+            'SkinWidgets_Recommended',
+            str(self.settings.recommended_enable).lower()
+        )
+        self.WINDOW.setProperty(
+            'SkinWidgets_RandomItems',
+            str(self.settings.randomitems_enable).lower()
+        )
+        self.WINDOW.setProperty(
+            'SkinWidgets_RecentItems',
+            str(self.settings.recentitems_enable).lower()
+        )
+        self.WINDOW.setProperty('SkinWidgets_RandomItems_Update', 'false')
+        self.prewarmer.remember = (PREWARM_REMEMBER_LOWMEM
+                                   if self.settings.lowmem_enable
+                                   else PREWARM_REMEMBER)
+        jsonrpc.set_cache_size(CACHE_SIZE_LOWMEM if self.settings.lowmem_enable
+                               else CACHE_SIZE)
+        if (previous is None
+                or previous.shared_enable != self.settings.shared_enable
+                or previous.shared_path != self.settings.shared_path):
+            self._init_shared()
+        # convert time to seconds, the daemon ticks once a second
+        self.RANDOMITEMS_TIME = self.settings.randomitems_time * 60
+
+    def _init_shared(self):
+        """opens the shared snapshot if enabled and starts over with the
+        leadership and the widgets wanted by other clients unknown
+        """
+        self.shared = None
+        self.shared_seen = 0
+        # store time of each snapshot widget last published
+        self.shared_times = {}
+        # widgets missing from the snapshot, request: first missed
+        self.shared_missing = {}
+        # widgets the other clients show, fetched too while leader
+        self.shared_wants = set()
+        # leadership last seen, see _is_shared_leader
+        self.shared_leader = None
+        if self.settings.shared_enable and self.settings.shared_path:
+            self.shared = SharedSnapshot(
+                xbmcvfs.translatePath(self.settings.shared_path),
+                client_id())
+
+    def _init_engine(self):
+        """starts using the fetch engine when enabled, the engine process
+        itself starts with the first fetch
+        """
+        command = [self.settings.engine_python, '-m', 'resources.lib.engine',
+                   '--port', str(self.settings.engine_port)]
+        if self.engine is not None and (not self.settings.engine_enable
+                                        or self.engine.command != command):
+            self.engine.close()
+            self.engine = None
+        if self.settings.engine_enable and self.engine is None:
+            # subprocess and socket are only loaded with the engine enabled
+            from resources.lib.engine import EngineProcess  # pylint: disable=import-outside-toplevel
+            self.engine = EngineProcess(command, xbmcvfs.translatePath(
+                __addon__.getAddonInfo('path')))
+
+    def _init_tuner(self):
+        """starts, reconfigures or stops the auto-tuner, the item counts
+        and concurrency go back to the defaults when it is turned off.  The
+        concurrency is only tuned with the fetch engine, without it widgets
+        are fetched one at a time
+        """
+        if not self.settings.tune_enable:
+            if self.tuner is not None:
+                self.tuner = None
+                self.fetcher.limits = {}
+                self.governor.resize(QUERY_CONCURRENCY)
+            return
+        if self.tuner is None:
+            self.tuner = AutoTuner(0, 0, 0, concurrency=QUERY_CONCURRENCY,
+                                   timed=RANDOM_WIDGETS)
+        self.tuner.target = self.settings.tune_latency / 1000
+        self.tuner.cpu_share = self.settings.tune_cpu / 100
+        self.tuner.items_max = self.settings.tune_items_max
+        self.tuner.tune_concurrency = self.engine is not None
+        if self.engine is None:
+            self.tuner.concurrency = QUERY_CONCURRENCY
+            self.WINDOW.clearProperty('SkinWidgets_TuneConcurrency')
+        # never lowered so items of a larger count are still cleared
+        self.LIMIT = self.fetcher.LIMIT = max(self.fetcher.LIMIT,
+                                              self.settings.tune_items_max)
+        self._apply_tuning()
+
+    def _apply_tuning(self):
+        """uses the item counts and concurrency chosen by the auto-tuner"""
+        self.fetcher.limits = self.tuner.limits()
+        self.governor.resize(self.tuner.concurrency)
+        for key, value in self.tuner.properties().items():
+            self.WINDOW.setProperty(key, value)
+
+    @contextlib.contextmanager
+    def _tuned(self, request: str):
+        """measures a widget refresh for the auto-tuner, a refresh that
+        missed the deadline counts with the time it waited
+
+        Args:
+            request (str): widget request ie RecentMovie
+        """
+        if self.tuner is None:
+            yield
+            return
+        start = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            with jsonrpc.measure() as cost:
+                yield
+        finally:
+            if self.tuner.record(request, time.perf_counter() - start,
+                                 time.thread_time() - cpu, *cost):
+                log('tuned %s', lambda: self.tuner.properties(request))
+                self._apply_tuning()
+            else:
+                for key, value in self.tuner.properties(request).items():
+                    self.WINDOW.setProperty(key, value)
+
+    def _is_due(self, request: str, lead: float = 0) -> bool:
+        """checks if a random widget is due at the next random timer run,
+        the auto-tuner may rotate heavy widgets every few runs
+
+        Args:
+            request (str): widget request ie RandomMovie
+            lead (float, optional): seconds before the timer runs
+
+        Returns:
+            bool: True if the widget rotates at the next run
+        """
+        return self.tuner is None or self.tuner.due(
+            request, self.RANDOMITEMS_TIME, lead)
+
+    def _replay(self, fixture: str):
+        """runs every fetcher against a fixture recorded with the rpc_record
+        setting.  Timings and the properties set by each widget are written
+        to replay_report.json in the addon profile, the property changes
+        since the previous report to replay_diff.json
+
+        Args:
+            fixture (str): path of the fixture file
+        """
+        self._init_vars()
+        self.WINDOW = WidgetWindow(PropertyRecorder())
+        self.fetcher.WINDOW = self.WINDOW
+        self.generation = 1
+        self.WINDOW.setProperty('SkinWidgets_Generation', '1')
+        self.active = None
+        jsonrpc.set_backend(jsonrpc.REPLAY, fixture)
+        self._init_property()
+        report = {}
+        for request in RECOMMENDED_WIDGETS + RANDOM_WIDGETS + RECENT_WIDGETS:
+            timings = []
+            for _ in range(REPLAY_RUNS):
+                # reload so every run is served the same responses
+                jsonrpc.set_backend(jsonrpc.REPLAY, fixture)
+                self.fetcher.watermark.invalidate()
+                # without its fingerprint the probe cannot skip the fetch
+                self.fetcher.forget(request)
+                start = time.perf_counter()
+                self._refresh(request, 'replay')
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            report[request] = {
+                'min_ms': round(timings[0], 2),
+                'median_ms': round(timings[len(timings) // 2], 2),
+                'properties': self.WINDOW.widget(request)}
+            log('replay %s median %s ms', request, report[request]['median_ms'])
+        jsonrpc.set_backend(jsonrpc.LIVE)
+        profile = xbmcvfs.translatePath(__addon__.getAddonInfo('profile'))
+        os.makedirs(profile, exist_ok=True)
+        report_path = os.path.join(profile, 'replay_report.json')
+        previous = {}
+        if os.path.isfile(report_path):
+            with open(report_path, encoding='utf-8') as report_file:
+                previous = simplejson.load(report_file)
+        diff = {}
+        for request, result in report.items():
+            old = previous.get(request, {}).get('properties', {})
+            new = result['properties']
+            changed = {key: [old.get(key), new.get(key)]
+                       for key in set(old) | set(new)
+                       if old.get(key) != new.get(key)}
+            if changed:
+                diff[request] = changed
+        with open(report_path, 'w', encoding='utf-8') as report_file:
+            simplejson.dump(report, report_file, indent=1, sort_keys=True)
+        with open(os.path.join(profile, 'replay_diff.json'), 'w',
+                  encoding='utf-8') as diff_file:
+            simplejson.dump(diff, diff_file, indent=1, sort_keys=True)
+        log('replay finished, %d widgets changed, report %s', len(diff),
+            report_path)
+
+    def _parse_argv(self):
+        """gets any arguments passed from Kodi and sets globals
+        """
+        self.params = play.parse_argv(sys.argv)
+        log('params %s', self.params)
+        self.SHUTDOWNDLOG = self.params.get("shutdown", "")
+
+    def _fetch_info_recommended(self):
+        """gets info for 'in progress' widgets by media type
+        """
+        a = datetime.datetime.now()
+        if self.settings.recommended_enable:
+            self._refresh_visible(RECOMMENDED_WIDGETS)
+            b = datetime.datetime.now()
+            c = b - a
+            log('Total time needed to request recommended queries: %s', c)
+
+    def _fetch_info_randomitems(self, trigger: str = 'startup'):
+        """gets info for random widgets by media type
+
+        Args:
+            trigger (str, optional): what caused the refresh
+        """
+        a = datetime.datetime.now()
+        if self.settings.randomitems_enable:
+            self._refresh_visible(RANDOM_WIDGETS, trigger)
+            b = datetime.datetime.now()
+            c = b - a
+            log('Total time needed to request random queries: %s', c)
+
+    def _fetch_info_recentitems(self):
+        """gets info for last added items by media type note tv shows get
+        episodes
+        """
+        a = datetime.datetime.now()
+        if self.settings.recentitems_enable:
+            self._refresh_visible(RECENT_WIDGETS)
+            b = datetime.datetime.now()
+            c = b - a
+            log('Total time needed to request recent items queries: %s', c)
+
+    def _fetch_info_aggregates(self):
+        """gets the aggregate widgets from the library index, the index is
+        built on the first refresh
+        """
+        a = datetime.datetime.now()
+        if self.settings.index_enable:
+            self._refresh_visible(list(AGGREGATE_WIDGETS))
+            b = datetime.datetime.now()
+            c = b - a
+            log('Total time needed for the aggregate widgets: %s', c)
+
+    def _fetch_info_pvr(self):
+        """gets the recording and timer widgets, the PVR cache is filled on
+        the first refresh
+        """
+        a = datetime.datetime.now()
+        if self.settings.pvr_enable:
+            self._refresh_visible(PVR_WIDGETS)
+            b = datetime.datetime.now()
+            c = b - a
+            log('Total time needed for the PVR widgets: %s', c)
+
+    def _fetch_info_playlists(self):
+        """gets the smart playlist widgets
+        """
+        a = datetime.datetime.now()
+        if self.settings.playlist_enable:
+            self._refresh_visible(self._scan_playlists())
+            b = datetime.datetime.now()
+            c = b - a
+            log('Total time needed for the playlist widgets: %s', c)
+
+    def _scan_playlists(self) -> list:
+        """finds the smart playlists of the profile, the widget names are
+        set in home window property SkinWidgets_Playlists
+
+        Returns:
+            list: the playlist widget requests
+        """
+        self.fetcher.playlists.directories = [
+            xbmcvfs.translatePath(f'special://profile/playlists/{library}')
+            for library in ('video', 'music')]
+        requests = self.fetcher.playlists.scan()
+        self.WINDOW.setProperty('SkinWidgets_Playlists', ','.join(requests))
+        return requests
+
+    def _daemon(self):
+        """keeps script running at all time
+        """
+        log('daemon started')
+        count = 0
+        ticks = 0
+        window = xbmcgui.getCurrentWindowId()
+        self.prewarmer.start(self._stop_prewarm)
+        while (not self.Monitor.abortRequested()) and self._is_owner():
+            if self.Monitor.waitForAbort(1):
+                break
+            ticks += 1
+            if (ticks % TRACE_POLL == 0
+                    and play.debug_logging() != self.debug_logging):
+                self.debug_logging = init_trace(self.settings.trace_file)
+            if not self._is_busy():
+                if self.settings.randomitems_method == 0:
+                    count += 1
+                    if self.governor.scanning:
+                        # nothing is prepared or published while a library
+                        # is scanned, the rotation is prepared after it
+                        count = min(
+                            count, self.RANDOMITEMS_TIME - ROTATION_LEAD - 1)
+                    elif count >= self.RANDOMITEMS_TIME:
+                        log('daemon random time queue random items')
+                        self._queue_randomitems()
+                        count = 0    # reset counter
+                    elif count >= self.RANDOMITEMS_TIME - ROTATION_LEAD:
+                        self._prepare_rotation()
+                if self.WINDOW.getProperty('SkinWidgets_RandomItems_Update') == 'true':
+                    count = 0
+                    self.WINDOW.setProperty(
+                        'SkinWidgets_RandomItems_Update', 'false')
+                    log('daemon update fetch_info_randomitems')
+                    self._fetch_info_randomitems('skin')
+                self._update_active()
+                if xbmcgui.getCurrentWindowId() != window:
+                    window = xbmcgui.getCurrentWindowId()
+                    self._on_window(window)
+                self._queue_retries()
+                self._run_pending()
+                if (self.settings.pvr_enable and ticks % PVR_POLL == 0
+                        and self.fetcher.pvr.expire()):
+                    self._queue(PVR_WIDGETS, trigger='pvr')
+                if self.shared is not None and ticks % SHARED_POLL == 0:
+                    self._poll_shared()
+        else:
+            if self.Monitor.abortRequested():
+                log('daemon got abortRequested returning to main __init__')
+                self._stop_heartbeat()
+                self.prewarmer.stop()
+                return
+            self.Monitor.update_listitems = None
+            self.Monitor.update_settings = None
+            self.Monitor.update_scan = None
+            self.Monitor.notification = None
+            self.Player.action = None
+        self._stop_heartbeat()
+        self.prewarmer.stop()
+        jsonrpc.shutdown()
+        if self.engine is not None:
+            self.engine.close()
+        clearlist_groups = ['Recommended', 'Random', 'Recent']
+        clearlist_types = ['Movie', 'Episode', 'MusicVideo',
+                           'Album', 'Artist', 'Song', 'Addon']
+        log('clearing properties')
+        for item_group in clearlist_groups:
+            for item_type in clearlist_types:
+                clear = item_group + item_type
+                self._clear_properties(clear)
+        for clear in list(AGGREGATE_WIDGETS) + PVR_WIDGETS + list(
+                self.fetcher.playlists.widgets):
+            self._clear_properties(clear)
+        if not self._is_owner():
+            # let the new instance start fetching
+            log('generation %d handing over', self.generation)
+            self.WINDOW.clearProperty('SkinWidgets_Running')
+        log('deamon completed returning')
+
+    def _clear_properties(self, request: str):
+        """Clears hoime window properties of the requested type
+
+        Args:
+            request (str): in progress/random/last added
+        """
+        self.fetcher.forget(request)
+        self.fetcher.clear(request)
+
+    def _is_busy(self) -> bool:
+        """checks if the user is watching something, refreshes are held back
+        while video or an audio visualisation is shown fullscreen
+
+        Returns:
+            bool: True if no refreshes should run now
+        """
+        return (self.Player.isPlayingVideo()
+                or xbmcgui.getCurrentWindowId() in BUSY_WINDOWS)
+
+    def _queue(self, requests: list, urgent: bool = False,
+               trigger: str = '', supersede: bool = False):
+        """queues widget refreshes to be run by the daemon
+
+        Args:
+            requests (list): widget requests ie RecentMovie
+            urgent (bool, optional): run as soon as Home is shown instead of
+            waiting for an idle period. Defaults to False.
+            trigger (str, optional): what queued the refresh ie scan, kept
+            until the refresh runs
+            supersede (bool, optional): stop refreshes of the widgets that
+            are running, their results are dropped
+        """
+        if supersede:
+            generations.supersede(requests)
+        with self.pending_lock:
+            for request in requests:
+                self.pending[request] = self.pending.get(request) or urgent
+                if trigger:
+                    self.triggers.setdefault(request, trigger)
+
+    def _queue_retries(self):
+        """queues the stale widgets whose retry is due
+        """
+        now = time.monotonic()
+        due = [request for request, (_, retry) in self.retries.items()
+               if retry <= now]
+        for request in due:
+            # queued once, the refresh schedules the next retry if needed
+            self.retries[request] = (self.retries[request][0], float('inf'))
+        if due:
+            self._queue(due, urgent=True, trigger='retry')
+
+    def _queue_randomitems(self):
+        """publishes the prepared random widgets at once and queues the
+        others for a refresh when idle, widgets the auto-tuner rotates less
+        often wait for a later run
+        """
+        if not self.settings.randomitems_enable:
+            return
+        due = [request for request in RANDOM_WIDGETS if self._is_due(request)]
+        prepared = [request for request in due
+                    if self.rotation.get(request) is not None]
+        for request in prepared:
+            self._refresh(request, 'timer')
+        self._queue([request for request in due if request not in prepared],
+                    trigger='timer')
+
+    def _prepare_rotation(self):
+        """fetches the next items of one random widget without publishing
+        them, _fetch publishes them when the widget is refreshed.  Runs
+        only while the user has not touched the GUI for ROTATION_IDLE
+        seconds, widgets published from the shared snapshot are skipped
+        """
+        if (not self.settings.randomitems_enable
+                or (xbmc.getGlobalIdleTime() < ROTATION_IDLE
+                    and not self.Monitor.screensaver_active)):
+            return
+        for request in RANDOM_WIDGETS:
+            if (request in self.rotation or not self._is_active(request)
+                    or not self.settings.enabled(request)
+                    or not self._is_due(request, ROTATION_LEAD)):
+                continue
+            if (self.shared is not None and request in SHARED_WIDGETS
+                    and not self._is_shared_leader()):
+                # published from the snapshot, tried again if this client
+                # becomes the leader
+                self.rotation[request] = None
+                return
+            self.rotation[request] = None
+            try:
+                with generations.running(request) as generation, \
+                        trace.refresh(request, 'prepare', generation), \
+                        jsonrpc.deadline(QUERY_DEADLINE):
+                    if self.engine is not None:
+                        properties = self._fetch_engine([request]).get(request)
+                    else:
+                        with self.WINDOW.capture(request) as properties:
+                            self.fetcher.fetch(request)
+            except (jsonrpc.DeadlineExceeded, generations.Superseded) as error:
+                log('%s not prepared: %s', request, error)
+                return
+            if request in self.rotation:
+                # not dropped by a library change while it was fetched
+                self.rotation[request] = properties
+            return
+
+    def _run_pending(self):
+        """runs queued widget refreshes.  Urgent refreshes run when Home is
+        shown, in progress widgets first.  Other refreshes wait for the
+        screensaver or for IDLE_TIME seconds without user input, then run
+        one per daemon tick so the GUI stays responsive.  With the
+        screensaver active everything queued runs at once.
+        """
+        if not self.pending:
+            return
+        screensaver = self.Monitor.screensaver_active
+        idle = screensaver or xbmc.getGlobalIdleTime() >= IDLE_TIME
+        window = xbmcgui.getCurrentWindowId()
+        with self.pending_lock:
+            queued = sorted(self.pending, key=lambda r: (
+                not self._is_needed(r, window), widget_priority(r)))
+            if self.governor.scanning:
+                # only playback refreshes while a library is scanned
+                ready = [r for r in queued
+                         if self.pending[r] and self._is_needed(r, window)]
+            elif screensaver or (idle and self.consolidate):
+                self.consolidate = False
+                ready = queued
+            else:
+                ready = [r for r in queued
+                         if self.pending[r] and self._is_needed(r, window)]
+                if idle:
+                    ready += [r for r in queued if r not in ready][:1]
+            # kept to put back what is not done with its urgency
+            urgent = {request: self.pending.pop(request) for request in ready}
+        with self._engine_batch([r for r in ready if self.active is None
+                                 or screensaver or self._is_needed(r, window)]):
+            for request in ready:
+                if not self._is_owner():
+                    return
+                if self.Monitor.abortRequested() or self._is_busy():
+                    # put back what was not done
+                    for left in ready[ready.index(request):]:
+                        self._queue([left], urgent=urgent[left])
+                    return
+                if (self.active is not None and not screensaver
+                        and not self._is_needed(request, window)):
+                    # wait until the window showing the widget is opened
+                    self.stale.add(request)
+                    continue
+                log('running queued refresh %s', request)
+                self._refresh(request, self.triggers.pop(request, ''))
+
+    def _wait(self, seconds: float) -> bool:
+        """waits for the query governor
+
+        Args:
+            seconds (float): time to wait
+
+        Returns:
+            bool: True if Kodi is exiting or a newer instance took over
+        """
+        return self.Monitor.waitForAbort(seconds) or not self._is_owner()
+
+    def _on_scan(self, library: str, scanning: bool):
+        """Widget_Monitor runs when a library scan starts or ends.  Widget
+        refreshes other than after playback are held back during the scan
+        and run as one consolidated pass at the next idle moment after it
+
+        Args:
+            library (str): video/music
+            scanning (bool): True if the scan started
+        """
+        log('%s scan %s', library, 'started' if scanning else 'finished')
+        if scanning:
+            self.governor.scan_started(library)
+        else:
+            self.governor.scan_finished(library)
+            self.consolidate = not self.governor.scanning
+
+    def _on_notification(self, method: str, data: str):
+        """Widget_Monitor runs for every Kodi notification.  Library
+        changes drop the cached query results of that library, changes
+        other than added items also the recently added marks and update
+        the widget slots of the changed item.  Player notifications tell
+        Widgets_Player what is played, PVR changes update the PVR cache
+
+        Args:
+            method (str): notification ie VideoLibrary.OnUpdate
+            data (str): JSON notification data
+        """
+        library, _, event = method.partition('.')
+        if method == 'Player.OnPlay':
+            self.Player.on_play(data)
+        elif method == 'Player.OnStop':
+            self.Player.on_stop(data)
+        elif (library in ('VideoLibrary', 'AudioLibrary')
+                and not event.endswith('Started')):
+            jsonrpc.invalidate(library)
+            # prepared random items may show removed or played items
+            self.rotation.clear()
+            self.fetcher.watermark.notification(method, data)
+            self.fetcher.index.notification(method, data)
+            if event == 'OnUpdate' and not is_added(data):
+                # playcount or resume point written, ie after playback
+                self._update_item(played_item(data))
+        if (self.settings.pvr_enable
+                and self.fetcher.pvr.notification(method, data)):
+            jsonrpc.invalidate('PVR')
+            self._queue(PVR_WIDGETS, trigger='pvr')
+
+    def _on_stopped(self, media: str, dbid: int):
+        """Widgets_Player runs when a library item stopped playing.  Its
+        widget slots are updated at once, the refresh of the widgets of its
+        type is queued for the return to Home
+
+        Args:
+            media (str): media type ie movie
+            dbid (int): library id of the item
+        """
+        self._update_item((media, dbid))
+        self._update(PLAYBACK_TYPES[media], urgent=True)
+
+    def _update_item(self, item):
+        """sets the playcount and resume point of a library item in the
+        published widget slots showing it.  Runs on the Monitor thread, the
+        query skips the governor and gives up after QUERY_DEADLINE
+
+        Args:
+            item (tuple): media type and library id, None to do nothing
+        """
+        if item is None or not self._is_owner():
+            return
+        try:
+            with jsonrpc.ungoverned(), jsonrpc.deadline(QUERY_DEADLINE):
+                slots = self.fetcher.update_item(*item)
+        except jsonrpc.DeadlineExceeded as error:
+            log('%s %d not updated: %s', item[0], item[1], error)
+            return
+        if slots:
+            log('%s %d updated in %s', item[0], item[1], slots)
+
+    def _update_active(self):
+        """reads the widgets registered by the skin in the home window
+        property SkinWidgets_Active, ie "home:RecentMovie,RandomMovie;videos:
+        RecentEpisode".  Falls back to the skin manifest if not set
+        """
+        value = self.WINDOW.getProperty('SkinWidgets_Active')
+        if value == self.active_property:
+            return
+        self.active_property = value
+        self.active = parse_active(value) if value else self.manifest
+        log('active widgets %s', self.active)
+
+    def _is_active(self, request: str) -> bool:
+        """checks if the skin shows a widget on any window
+
+        Args:
+            request (str): widget request ie RecentMovie
+
+        Returns:
+            bool: True if the widget is registered or the skin registers none
+        """
+        if self.active is None or request in self.shared_wants:
+            return True
+        return any(request in widgets for widgets in self.active.values())
+
+    def _is_needed(self, request: str, window: int) -> bool:
+        """checks if a widget is shown on a window, widgets of skins that
+        do not register them are treated as Home widgets
+
+        Args:
+            request (str): widget request ie RecentMovie
+            window (int): window id
+
+        Returns:
+            bool: True if the widget is shown on the window or, while this
+            client leads, by another client
+        """
+        if request in self.shared_wants:
+            return True
+        if self.active is None:
+            return window == 10000
+        return request in self.active.get(window, ())
+
+    def _on_window(self, window: int):
+        """queues the refreshes needed for a window that was just opened
+
+        Args:
+            window (int): id of the window now shown
+        """
+        needed = [request for request in self.stale
+                  if self._is_needed(request, window)]
+        if (self.settings.recentitems_homeupdate
+                and self.settings.recentitems_enable):
+            needed += [request for request in RECENT_WIDGETS
+                       if self._is_active(request)
+                       and self._is_needed(request, window)]
+        if needed:
+            log('window %d needs %s', window, needed)
+            self.stale.difference_update(needed)
+            self._queue(needed, urgent=True, trigger='window')
+
+    def _refresh_visible(self, requests: list, trigger: str = 'startup'):
+        """refreshes the widgets shown on the current window first, widgets
+        registered for other windows wait until they are needed
+
+        Args:
+            requests (list): widget requests ie RECENT_WIDGETS
+            trigger (str, optional): what caused the refresh
+        """
+        self._update_active()
+        if self.active is None:
+            with self._engine_batch(requests):
+                for request in requests:
+                    self._refresh(request, trigger)
+            return
+        window = xbmcgui.getCurrentWindowId()
+        with self._engine_batch([request for request in requests
+                                 if self._is_needed(request, window)]):
+            for request in requests:
+                if not self._is_active(request):
+                    continue
+                if self._is_needed(request, window):
+                    self._refresh(request, trigger)
+                else:
+                    self.stale.add(request)
+                    self.triggers.setdefault(request, trigger)
+
+    def _refresh(self, request: str, trigger: str = ''):
+        """runs the fetcher for a single widget, widgets the skin does not
+        show are skipped
+
+        Args:
+            request (str): widget request ie RecommendedEpisode
+            trigger (str, optional): what caused the refresh ie playback,
+            traced with the refresh
+        """
+        if not self._is_active(request) or not self.settings.enabled(request):
+            return
+        if not self._is_owner():
+            log('%s skipped, a newer instance has taken over', request)
+            return
+        self.stale.discard(request)
+        try:
+            with generations.running(request) as generation, \
+                    trace.refresh(request, trigger, generation), \
+                    self._memory_trace(request), \
+                    jsonrpc.cache_ttl(cache_ttl(request)), \
+                    jsonrpc.deadline(QUERY_DEADLINE):
+                if not self._load_shared(request):
+                    with self._tuned(request), self.WINDOW.stage(request):
+                        self._fetch(request)
+                        self.WINDOW.clearProperty(f'{request}.Stale')
+                    self._store_shared(request)
+        except jsonrpc.DeadlineExceeded as error:
+            self.fetcher.forget(request)
+            self._mark_stale(request, str(error))
+            return
+        except generations.Superseded as error:
+            # the newer trigger has queued or cleared the widget, its next
+            # fetch must not be skipped by the probe
+            self.fetcher.forget(request)
+            log('%s dropped, %s', request, error)
+            return
+        self.retries.pop(request, None)
+        self.WINDOW.setProperty('SkinWidgets_CacheHitRate',
+                                f'{jsonrpc.cache_hit_rate():.0f}')
+        if self.settings.prewarm_enable:
+            self.prewarmer.add(self._published_art(request))
+
+    def _mark_stale(self, request: str, reason: str):
+        """keeps the previous items of a widget whose refresh missed the
+        query deadline, sets "<request>.Stale" for the skin and schedules a
+        retry with exponential backoff
+
+        Args:
+            request (str): widget request ie RecentMovie
+            reason (str): why the refresh failed
+        """
+        failures = self.retries.get(request, (0, 0))[0] + 1
+        backoff = min(RETRY_BACKOFF * 2 ** (failures - 1), RETRY_BACKOFF_MAX)
+        self.retries[request] = (failures, time.monotonic() + backoff)
+        self.WINDOW.setProperty(f'{request}.Stale', 'true')
+        log('%s stale (%s), retry %d in %d s', request, reason, failures,
+            backoff)
+
+    def _fetch(self, request: str):
+        """runs the fetcher of a widget, in the fetch engine if enabled,
+        or publishes its prepared random items.  Falls back to fetching in
+        Kodi if the engine fails
+
+        Args:
+            request (str): widget request ie RecommendedEpisode
+        """
+        properties = self.rotation.pop(request, None)
+        if properties is not None:
+            # prepared before the random timer fired
+            self.WINDOW.publish(request, properties)
+            return
+        if self.engine is not None:
+            properties = self.prefetched.pop(request, None)
+            if properties is None:
+                properties = self._fetch_engine([request]).get(request)
+            if properties is not None:
+                self.WINDOW.publish(request, properties)
+                return
+        self.fetcher.fetch(request)
+
+    def _fetch_engine(self, requests: list) -> dict:
+        """fetches widgets together in the fetch engine so their queries
+        are pipelined
+
+        Args:
+            requests (list): widget requests ie RECENT_WIDGETS
+
+        Returns:
+            dict: properties by widget, empty if the engine failed
+        """
+        batch = {'settings': dataclasses.asdict(self.settings),
+                 'addonid': __addonid__,
+                 'unwatched_plot': __localize__(32014),
+                 'playlists': self.fetcher.playlists.directories,
+                 'deadline': QUERY_DEADLINE}
+        if self.tuner is not None:
+            batch.update(limit=self.fetcher.LIMIT, limits=self.fetcher.limits,
+                         workers=self.tuner.concurrency)
+        try:
+            with trace.span('fetch engine %s', requests):
+                return self.engine.fetch(requests, batch)
+        except (OSError, ValueError) as error:
+            log('fetch engine failed, fetching in Kodi: %s', error)
+            return {}
+
+    @contextlib.contextmanager
+    def _engine_batch(self, requests: list):
+        """fetches the widgets refreshed in the with block in one engine
+        batch up front, what the block does not use is dropped at its end
+
+        Args:
+            requests (list): widget requests about to be refreshed
+        """
+        requests = [request for request in requests if self._is_active(
+            request) and self.settings.enabled(request)]
+        if self.engine is not None and len(requests) > 1:
+            self.prefetched = self._fetch_engine(requests)
+        try:
+            yield
+        finally:
+            self.prefetched = {}
+
+    def _is_shared_leader(self) -> bool:
+        """checks if this client leads the shared snapshot.  When the
+        leadership changes the random widgets skipped or prepared under
+        the old role are prepared again, and a former leader stops fetching
+        for the other clients
+
+        Returns:
+            bool: True if leader, False if not or the directory is not
+            available
+        """
+        try:
+            leader = self.shared.is_leader()
+        except OSError as error:
+            log('shared directory not available: %s', error)
+            leader = False
+        if leader != self.shared_leader:
+            if self.shared_leader is not None:
+                log('shared leadership %s', 'taken' if leader else 'lost')
+            self.shared_leader = leader
+            for request in SHARED_WIDGETS:
+                self.rotation.pop(request, None)
+            if not leader:
+                self.shared_wants = set()
+        return leader
+
+    def _load_shared(self, request: str) -> bool:
+        """publishes a library wide widget from the shared snapshot when
+        another client is the leader.  A widget missing from the snapshot
+        keeps its items for SHARED_WAIT seconds while the leader fetches
+        it, then this client fetches it itself
+
+        Args:
+            request (str): widget request ie RecentMovie
+
+        Returns:
+            bool: True if the widget was published from the snapshot or
+            waits for it, False if it has to be fetched
+        """
+        if self.shared is None or request not in SHARED_WIDGETS:
+            return False
+        if self._is_shared_leader():
+            self.shared_missing.pop(request, None)
+            return False
+        try:
+            properties = self.shared.load(request)
+        except OSError as error:
+            log('shared snapshot not readable: %s', error)
+            return False
+        if properties is None:
+            missed = self.shared_missing.setdefault(request, time.time())
+            if time.time() - missed < SHARED_WAIT:
+                log('%s missing from the shared snapshot, waiting for the '
+                    'leader', request)
+                return True
+            log('%s missing from the shared snapshot, fetching', request)
+            del self.shared_missing[request]
+            return False
+        self.shared_missing.pop(request, None)
+        self.WINDOW.publish(request, properties)
+        return True
+
+    def _store_shared(self, request: str):
+        """adds a library wide widget fetched by the leader to the shared
+        snapshot
+
+        Args:
+            request (str): widget request ie RecentMovie
+        """
+        if self.shared is None or request not in SHARED_WIDGETS:
+            return
+        if not self._is_shared_leader():
+            return
+        try:
+            self.shared.store(request, self.WINDOW.widget(request))
+        except OSError as error:
+            log('shared snapshot not writable: %s', error)
+
+    def _poll_shared(self):
+        """the leader queues the widgets the other clients newly want, the
+        other clients list the widgets they show and publish the widgets
+        whose snapshot entries changed, or that waited SHARED_WAIT seconds
+        for the leader
+        """
+        leader = self._is_shared_leader()
+        try:
+            if leader:
+                wanted = self.shared.wanted().intersection(SHARED_WIDGETS)
+                new = wanted - self.shared_wants
+                self.shared_wants = wanted
+                if new:
+                    log('shared widgets wanted by other clients: %s', new)
+                    self._queue(sorted(new), trigger='shared')
+                return
+            shown = [request for request in SHARED_WIDGETS
+                     if self._is_active(request)
+                     and self.settings.enabled(request)]
+            self.shared.want(shown)
+            now = time.time()
+            waited = [request for request, missed
+                      in self.shared_missing.items()
+                      if now - missed >= SHARED_WAIT]
+            changed = self.shared.changed()
+            if changed <= self.shared_seen and not waited:
+                return
+            self.shared_seen = changed
+            times = self.shared.times()
+        except OSError as error:
+            log('shared directory not available: %s', error)
+            return
+        updated = [request for request in shown
+                   if request in times
+                   and times[request] != self.shared_times.get(request)]
+        self.shared_times = times
+        for request in dict.fromkeys(updated + waited):
+            self._refresh(request, 'shared')
+
+    def _published_art(self, request: str) -> list:
+        """gets the PREWARM_ART artwork urls a widget has published
+
+        Args:
+            request (str): widget request ie RecentMovie
+
+        Returns:
+            list: artwork urls
+        """
+        urls = []
+        for count in range(1, self.LIMIT + 1):
+            if not self.WINDOW.getProperty(f'{request}.{count}.Title'):
+                break
+            for art in PREWARM_ART:
+                url = self.WINDOW.getProperty(f'{request}.{count}.Art({art})')
+                if url:
+                    urls.append(url)
+        return urls
+
+    def _stop_prewarm(self) -> bool:
+        """checks if texture cache warming has to pause, called by the
+        prewarm worker thread
+
+        Returns:
+            bool: True if disabled, during playback, while refreshes are
+            queued, when busy or exiting
+        """
+        return (not self.settings.prewarm_enable or bool(self.pending)
+                or self.Player.isPlaying() or self._is_busy()
+                or self.Monitor.abortRequested() or not self._is_owner())
+
+    @contextlib.contextmanager
+    def _memory_trace(self, request: str):
+        """reports the peak traced memory of a widget refresh in low memory
+        mode, logged and set as home window property SkinWidgets_PeakMemory
+        in KiB
+
+        Args:
+            request (str): widget request ie RecentMovie
+        """
+        if not (self.settings.lowmem_enable and self.settings.lowmem_trace):
+            yield
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.clear_traces()
+        try:
+            yield
+        finally:
+            peak = tracemalloc.get_traced_memory()[1] // 1024
+            log('%s peak traced memory %d KiB', request, peak)
+            self.WINDOW.setProperty('SkinWidgets_PeakMemory', str(peak))
+
+    def _update(self, vidtype: str, urgent: bool = False):
+        """Widget_Monitor runs when OnScanFinished received to update
+        home window properties based on new library contents (music or
+        video), or when timer fires.  Widget_Player runs when playback
+        ended.  The refreshes are queued for the daemon, playback ended
+        refreshes are urgent and run on return to Home, scan refreshes
+        wait for an idle period
+
+        Args:
+            type (str): video/music (library was scanned)
+            music/movie/episode/musicvideo (playback ended)
+            urgent (bool, optional): refresh on return to Home. Defaults
+            to False.
+        """
+        if self.Monitor.abortRequested():
+            return
+        # what ran before the scan or playback is out of date
+        queue = functools.partial(self._queue, supersede=True,
+                                  trigger='playback' if urgent else 'scan')
+        if vidtype == 'movie':
+            queue(['RecommendedMovie', 'RecentMovie'], urgent)
+        elif vidtype == 'episode':
+            queue(['RecommendedEpisode', 'RecentEpisode'], urgent)
+        elif vidtype == 'video':
+            # only on db update
+            queue(['RecommendedMovie', 'RecommendedEpisode',
+                   'RecentMovie', 'RecentEpisode', 'RecentMusicVideo'],
+                  urgent)
+        elif vidtype == 'musicvideo':
+            queue(['RecommendedMusicVideo', 'RecentMusicVideo'], urgent)
+        elif vidtype == 'music':
+            queue(['RecommendedAlbum', 'RecentAlbum'], urgent)
+        if self.settings.randomitems_method == 1:
+            # update random if db update is selected instead of timer
+            if vidtype == 'video':
+                queue(['RandomMovie', 'RandomEpisode',
+                       'RandomMusicVideo'])
+            elif vidtype == 'music':
+                queue(['RandomAlbum', 'RandomArtist', 'RandomSong',
+                       'RandomAddon'])
+        if self.settings.index_enable:
+            # the index is synced from notifications when they refresh
+            if vidtype == 'video':
+                queue([request for request, (media, _, _, _)
+                       in AGGREGATE_WIDGETS.items() if media != 'album'])
+            elif vidtype == 'music':
+                queue(['TopArtist'])
+        if self.settings.playlist_enable:
+            # playlist rules may depend on playcounts, refresh them all
+            music = vidtype == 'music'
+            queue([request for request in self._scan_playlists()
+                   if (self.fetcher.playlists.fetcher(request)
+                       in ('Album', 'Song')) == music])
+
+
+def played_item(data: str):
+    """gets the library item of a Player.OnPlay or Player.OnStop
+    notification.  Items without a library id (trailers, streams, files)
+    are not library items
+
+    Args:
+        data (str): JSON notification data
+
+    Returns:
+        tuple: media type ie movie and library id, None if no library item
+        of PLAYBACK_TYPES is played
+    """
+    try:
+        item = simplejson.loads(data).get('item') or {}
+    except (ValueError, TypeError, AttributeError):
+        return None
+    if item.get('type') not in PLAYBACK_TYPES or not isinstance(
+            item.get('id'), int):
+        return None
+    return item['type'], item['id']
+
+
+def parse_active(value: str) -> dict:
+    """parses skin widget registration "window:Widget,Widget;window:Widget"
+    where window is a window id or a name from WINDOW_IDS
+
+    Args:
+        value (str): the registration string
+
+    Returns:
+        dict: set of widget requests by window id
+    """
+    active = {}
+    for entry in value.split(';'):
+        if ':' not in entry:
+            continue
+        window, widgets = entry.split(':', 1)
+        window = window.strip().lower()
+        if window in WINDOW_IDS:
+            window = WINDOW_IDS[window]
+        elif window.isdigit():
+            window = int(window)
+        else:
+            log('unknown window in widget registration: %s', window)
+            continue
+        active.setdefault(window, set()).update(
+            widget.strip() for widget in widgets.split(',') if widget.strip())
+    return active
+
+
+def load_manifest():
+    """reads the optional skin manifest WIDGET_MANIFEST, a json object of
+    widget lists by window ie {"home": ["RecentMovie", "RandomMovie"]}
+
+    Returns:
+        dict: set of widget requests by window id or None if the skin has
+        no manifest
+    """
+    path = xbmcvfs.translatePath(WIDGET_MANIFEST)
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, encoding='utf-8') as manifest:
+            windows = simplejson.load(manifest)
+        return parse_active(';'.join(f'{window}:{",".join(widgets)}'
+                                     for window, widgets in windows.items()))
+    except (OSError, ValueError, AttributeError, TypeError) as error:
+        log('could not read skin manifest %s: %s', path, error)
+        return None
+
+
+def client_id() -> str:
+    """gets the id of this client for the shared snapshot, a random id
+    kept in the addon profile
+
+    Returns:
+        str: the client id
+    """
+    profile = xbmcvfs.translatePath(__addon__.getAddonInfo('profile'))
+    path = os.path.join(profile, 'client_id')
+    try:
+        with open(path, encoding='utf-8') as id_file:
+            return id_file.read().strip()
+    except OSError:
+        client = uuid.uuid4().hex
+        os.makedirs(profile, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as id_file:
+            id_file.write(client)
+        return client
+
+
+def cache_ttl(request: str) -> int:
+    """gets the result cache ttl of a widget from CACHE_TTL
+
+    Args:
+        request (str): widget request ie RecentMovie
+
+    Returns:
+        int: seconds, 0 if the widget is not cached
+    """
+    for group, ttl in CACHE_TTL.items():
+        if request.startswith(group):
+            return ttl
+    return 0
+
+
+def widget_priority(request: str) -> int:
+    """gets the refresh priority of a widget from its group
+
+    Args:
+        request (str): widget request ie RecentMovie
+
+    Returns:
+        int: position of the widget group in WIDGET_PRIORITY
+    """
+    for priority, group in enumerate(WIDGET_PRIORITY):
+        if request.startswith(group):
+            return priority
+    return len(WIDGET_PRIORITY)
+
+
+@dataclasses.dataclass(frozen=True)
+class Widgets_Settings:
+    """typed snapshot of the addon settings, a new snapshot is taken
+    when the settings change
+    """
+    plot_enable: bool = True
+    recommended_enable: bool = True
+    randomitems_enable: bool = True
+    randomitems_unplayed: bool = True
+    randomitems_seasonfolders: bool = True
+    randomitems_method: int = 0
+    randomitems_time: int = 10
+    recentitems_enable: bool = True
+    recentitems_unplayed: bool = True
+    recentitems_homeupdate: bool = False
+    prewarm_enable: bool = False
+    index_enable: bool = False
+    pvr_enable: bool = False
+    playlist_enable: bool = False
+    lowmem_enable: bool = False
+    shared_enable: bool = False
+    shared_path: str = ''
+    lowmem_trace: bool = True
+    rpc_record: bool = False
+    rpc_fixture: str = ''
+    rpc_anonymise: bool = True
+    trace_file: bool = False
+    engine_enable: bool = False
+    engine_python: str = 'python3'
+    engine_port: int = 9090
+    tune_enable: bool = False
+    tune_latency: int = 1000
+    tune_cpu: int = 5
+    tune_items_max: int = 20
+
+    @classmethod
+    def from_addon(cls, addon: xbmcaddon.Addon) -> 'Widgets_Settings':
+        """reads all settings of the addon
+
+        Args:
+            addon (xbmcaddon.Addon): the addon
+
+        Returns:
+            Widgets_Settings: the settings snapshot
+        """
+        values = {}
+        for field in dataclasses.fields(cls):
+            if field.type in (int, 'int'):
+                values[field.name] = addon.getSettingInt(field.name)
+            elif field.type in (str, 'str'):
+                values[field.name] = addon.getSettingString(field.name)
+            else:
+                values[field.name] = addon.getSettingBool(field.name)
+        return cls(**values)
+
+    def enabled(self, request: str) -> bool:
+        """checks if the group of a widget is enabled
+
+        Args:
+            request (str): widget request ie RecentMovie
+
+        Returns:
+            bool: False if the widget group is disabled in settings
+        """
+        if request in PVR_WIDGETS:
+            return self.pvr_enable
+        if request.startswith('Recommended'):
+            return self.recommended_enable
+        if request.startswith('Random'):
+            return self.randomitems_enable
+        if request.startswith('Recent'):
+            return self.recentitems_enable
+        if request in AGGREGATE_WIDGETS:
+            return self.index_enable
+        if request.startswith('Playlist'):
+            return self.playlist_enable
+        return True
+
+    def changes(self, new: 'Widgets_Settings') -> tuple:
+        """gets the widgets affected by a settings change
+
+        Args:
+            new (Widgets_Settings): the settings after the change
+
+        Returns:
+            tuple: list of widgets to refetch, list of widgets to clear
+        """
+        refresh = []
+        for field in dataclasses.fields(self):
+            if getattr(self, field.name) != getattr(new, field.name):
+                refresh += [request for request
+                            in SETTING_WIDGETS.get(field.name, [])
+                            if request not in refresh]
+        clear = [request for request in refresh if not new.enabled(request)]
+        refresh = [request for request in refresh if new.enabled(request)]
+        return refresh, clear
+
+
+class Widgets_Monitor(xbmc.Monitor):
+    """wraps the Kodi Monitor class
+
+    Args:
+        xbmc.Monitor: Kodi Monitor class
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.update_listitems = kwargs['update_listitems']
+        self.update_settings = kwargs['update_settings']
+        self.update_scan = kwargs['update_scan']
+        self.notification = kwargs['notification']
+        self.screensaver_active = False
+
+    def onScanStarted(self, library: str):
+        """ holds back refreshes.  Called when a library scan starts
+
+        Args:
+            library (str): 'video'/'music'
+        """
+        self.update_scan(library, True)
+
+    def onScanFinished(self, library: str):
+        """ updates widgets. Called when library scan has ended and return
+        video or music to indicate which library has been scanned
+
+        Args:
+            library (str): 'video'/'music'
+        """
+        self.update_scan(library, False)
+        self.update_listitems(library)
+
+    def onSettingsChanged(self):
+        """ updates settings.  Called when addon settings are changed
+        """
+        self.update_settings()
+
+    def onNotification(self, sender: str, method: str, data: str):
+        """ passes Kodi notifications on to the service
+
+        Args:
+            sender (str): sender of the notification ie xbmc
+            method (str): notification ie VideoLibrary.OnUpdate
+            data (str): JSON notification data
+        """
+        self.notification(method, data)
+
+    def onScreensaverActivated(self):
+        """flags screensaver time, deferred refreshes can run
+        """
+        self.screensaver_active = True
+
+    def onScreensaverDeactivated(self):
+        """flags user is back, only urgent refreshes run
+        """
+        self.screensaver_active = False
+
+
+class Widgets_Player(xbmc.Player):
+    """Wraps Kodi Player class.  What is played is taken from the
+    Player.OnPlay notification, Player.OnStop runs the action for it so
+    the widgets of the played item are updated
+
+    Args:
+        xbmc.Player: Kodi Player class
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        # media type and library id of the item playing
+        self.item = None
+        self.action = kwargs["action"]
+
+    def on_play(self, data: str):
+        """remembers the library item that started playing
+
+        Args:
+            data (str): JSON data of Player.OnPlay
+        """
+        self.item = played_item(data)
+
+    def on_stop(self, data: str):
+        """runs the action for the library item that stopped or ended
+
+        Args:
+            data (str): JSON data of Player.OnStop
+        """
+        item = played_item(data) or self.item
+        self.item = None
+        if item is not None and self.action is not None:
+            self.action(*item)
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# pylint: disable=line-too-long,invalid-name
+
+"""Module shares widget properties between Kodi clients using one
+library.  The clients elect a leader through a lease file in a shared
+directory, the leader writes the widgets it fetched to a snapshot file
+and the other clients publish the snapshot instead of querying.  The
+other clients list the widgets they show in a wanted file each, the
+leader fetches those too.  File operations have a deadline so a hung
+network share fails like a missing one.  Does not import xbmc, the
+directory, client id and clock are passed in
+
+"""
+
+import json
+import os
+import threading
+import time
+
+LEASE_FILE = 'leader.json'
+SNAPSHOT_FILE = 'snapshot.json'
+# widgets a client shows, one file per client
+WANTED_FILE = 'wanted.{client}.json'
+# seconds a file operation may take
+IO_TIMEOUT = 5
+
+
+class SharedSnapshot:
+    """leader election and snapshot files in a shared directory
+    """
+
+    def __init__(self, directory: str, client: str, lease: float = 120,
+                 max_age: float = 900, clock=time.time,
+                 timeout: float = IO_TIMEOUT):
+        """
+        Args:
+            directory (str): shared directory, local or mounted
+            client (str): unique id of this client
+            lease (float, optional): seconds a leader stays elected without
+            renewing
+            max_age (float, optional): seconds a snapshot is used by the other
+            clients
+            clock (callable, optional): wall clock in seconds, shared between
+            clients
+            timeout (float, optional): seconds a file operation may take
+        """
+        self.directory = directory
+        self.client = client
+        self.lease = lease
+        self.max_age = max_age
+        self.clock = clock
+        self.timeout = timeout
+        self.leader_until = 0
+        # file operation still running after its deadline
+        self.hung = None
+        self.lock = threading.Lock()
+
+    def _call(self, function, *args):
+        """runs a file operation on a helper thread with the deadline.
+        While an operation that missed its deadline still hangs the next
+        ones fail at once
+
+        Args:
+            function (callable): the file operation
+            *args: its arguments
+
+        Returns:
+            the result of the operation
+
+        Raises:
+            TimeoutError: the directory did not answer in time
+            OSError: the operation failed
+        """
+        with self.lock:
+            if self.hung is not None and self.hung.is_alive():
+                raise TimeoutError(f'{self.directory} is not responding')
+            result = {}
+
+            def run():
+                try:
+                    result['value'] = function(*args)
+                except Exception as error:  # pylint: disable=broad-except
+                    result['error'] = error
+
+            worker = threading.Thread(target=run, name='shared', daemon=True)
+            worker.start()
+            worker.join(self.timeout)
+            if worker.is_alive():
+                self.hung = worker
+                raise TimeoutError(f'{self.directory} did not answer within '
+                                   f'{self.timeout} s')
+        if 'error' in result:
+            raise result['error']
+        return result['value']
+
+    def _read(self, name: str) -> dict:
+        """reads a json file of the shared directory
+
+        Args:
+            name (str): file name
+
+        Returns:
+            dict: the content, empty if missing or unreadable
+
+        Raises:
+            TimeoutError: the directory did not answer in time
+        """
+        def read():
+            try:
+                with open(os.path.join(self.directory, name),
+                          encoding='utf-8') as shared_file:
+                    return json.load(shared_file)
+            except (OSError, ValueError):
+                return {}
+
+        return self._call(read)
+
+    def _write(self, name: str, content: dict):
+        """writes a json file of the shared directory atomically, readers
+        see the old or the new file
+
+        Args:
+            name (str): file name
+            content (dict): the content
+
+        Raises:
+            OSError: the file was not written, TimeoutError if the
+            directory did not answer in time
+        """
+        def write():
+            path = os.path.join(self.directory, name)
+            temp = f'{path}.{self.client}.tmp'
+            with open(temp, 'w', encoding='utf-8') as shared_file:
+                json.dump(content, shared_file)
+            os.replace(temp, path)
+
+        self._call(write)
+
+    def is_leader(self) -> bool:
+        """takes or renews the lease if it is free, expired or ours.  The
+        lease is read back so of two clients writing at once only the last
+        writer leads.  Renewed after half the lease time
+
+        Returns:
+            bool: True if this client is the leader
+
+        Raises:
+            TimeoutError: the directory did not answer in time
+        """
+        now = self.clock()
+        if now < self.leader_until - self.lease / 2:
+            return True
+        lease = self._read(LEASE_FILE)
+        if lease.get('client') not in (None, self.client) and lease.get(
+                'expires', 0) > now:
+            self.leader_until = 0
+            return False
+        try:
+            self._write(LEASE_FILE, {'client': self.client,
+                                     'expires': now + self.lease})
+        except TimeoutError:
+            self.leader_until = 0
+            raise
+        except OSError:
+            self.leader_until = 0
+            return False
+        if self._read(LEASE_FILE).get('client') != self.client:
+            self.leader_until = 0
+            return False
+        self.leader_until = now + self.lease
+        return True
+
+    def store(self, request: str, properties: dict):
+        """adds the properties of a widget to the snapshot
+
+        Args:
+            request (str): widget request ie RecentMovie
+            properties (dict): the widget properties by key
+        """
+        snapshot = self._read(SNAPSHOT_FILE)
+        widgets = snapshot.get('widgets', {})
+        widgets[request] = {'time': self.clock(), 'properties': properties}
+        self._write(SNAPSHOT_FILE, {'client': self.client,
+                                    'widgets': widgets})
+
+    def load(self, request: str):
+        """gets the properties of a widget from the snapshot
+
+        Args:
+            request (str): widget request ie RecentMovie
+
+        Returns:
+            dict: the widget properties by key, None if the widget is not
+            in the snapshot or older than max_age
+        """
+        widget = self._read(SNAPSHOT_FILE).get('widgets', {}).get(request)
+        if not widget or self.clock() - widget.get('time', 0) > self.max_age:
+            return None
+        return widget.get('properties')
+
+    def times(self) -> dict:
+        """gets when each widget of the snapshot was stored
+
+        Returns:
+            dict: request: time, widgets older than max_age are left out
+        """
+        now = self.clock()
+        return {request: widget.get('time', 0) for request, widget
+                in self._read(SNAPSHOT_FILE).get('widgets', {}).items()
+                if now - widget.get('time', 0) <= self.max_age}
+
+    def want(self, requests: list):
+        """lists the widgets this client shows for the leader to fetch,
+        written again on each call so the list does not expire
+
+        Args:
+            requests (list): widget requests ie RECENT_WIDGETS
+        """
+        self._write(WANTED_FILE.format(client=self.client),
+                    {'time': self.clock(), 'widgets': sorted(requests)})
+
+    def wanted(self) -> set:
+        """gets the widgets the other clients show, lists older than
+        max_age are ignored
+
+        Returns:
+            set: widget requests
+        """
+        prefix, _, suffix = WANTED_FILE.partition('{client}')
+        own = WANTED_FILE.format(client=self.client)
+        names = [name for name in self._call(os.listdir, self.directory)
+                 if name.startswith(prefix) and name.endswith(suffix)
+                 and name != own]
+        now = self.clock()
+        requests = set()
+        for name in names:
+            wanted = self._read(name)
+            if now - wanted.get('time', 0) <= self.max_age:
+                requests.update(wanted.get('widgets', []))
+        return requests
+
+    def changed(self) -> float:
+        """gets the modification time of the snapshot file
+
+        Returns:
+            float: modification time, 0 if there is no snapshot
+
+        Raises:
+            TimeoutError: the directory did not answer in time
+        """
+        def mtime():
+            try:
+                return os.path.getmtime(os.path.join(self.directory,
+                                                     SNAPSHOT_FILE))
+            except OSError:
+                return 0
+
+        return self._call(mtime)
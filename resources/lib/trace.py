@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# pylint: disable=line-too-long,invalid-name
+
+"""Module traces the widget refreshes.  Each refresh gets a correlation id
+and the trigger that caused it (timer, scan, playback, settings, window,
+retry, startup, shared), its JSON-RPC requests and property writes are
+timed as spans and every line carries the id, ie
+    [3f2a91c0 playback RecentMovie] rpc VideoLibrary.GetMovies 41.2 ms
+Messages are %-format strings formatted only when tracing is on,
+arguments that are callables are called at that time, so a disabled
+trace costs a function call.  Lines go to the write function passed to
+configure and optionally to a rotating trace file.  Does not import
+xbmc, the write function is passed in
+
+"""
+
+import contextlib
+import threading
+import time
+import uuid
+
+# size of the trace file before it is rotated and rotated files kept
+TRACE_FILE_SIZE = 1024 * 1024
+TRACE_FILE_BACKUPS = 2
+
+_state = {'write': None, 'file': None}
+# correlation id, trigger and request of the refresh traced per thread
+_local = threading.local()
+
+
+def configure(write=None, path: str = ''):
+    """turns tracing on or off
+
+    Args:
+        write (callable, optional): called with each line, None to trace
+        only to the file
+        path (str, optional): trace file, rotated at TRACE_FILE_SIZE
+    """
+    handler = None
+    if path:
+        # logging is only loaded with a trace file
+        import logging.handlers  # pylint: disable=import-outside-toplevel
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=TRACE_FILE_SIZE, backupCount=TRACE_FILE_BACKUPS,
+            encoding='utf-8', delay=True)
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+    previous = _state['file']
+    _state.update(write=write, file=handler)
+    if previous is not None:
+        previous.close()
+
+
+def enabled() -> bool:
+    """checks if tracing is on
+
+    Returns:
+        bool: True if lines are written anywhere
+    """
+    return _state['write'] is not None or _state['file'] is not None
+
+
+def event(message: str, *args):
+    """traces a line tagged with the refresh of this thread
+
+    Args:
+        message (str): %-format string, or the line if there are no args
+        *args: values for the format string, callables are called first
+    """
+    write, handler = _state['write'], _state['file']
+    if write is None and handler is None:
+        return
+    if args:
+        message = message % tuple(arg() if callable(arg) else arg
+                                  for arg in args)
+    context = getattr(_local, 'context', None)
+    if context:
+        message = f'[{" ".join(context)}] {message}'
+    if write is not None:
+        write(message)
+    if handler is not None:
+        _write_file(handler, message)
+
+
+def _write_file(handler, message: str):
+    """appends a line to the trace file
+
+    Args:
+        handler (logging.handlers.RotatingFileHandler): the trace file
+        message (str): the line
+    """
+    import logging  # pylint: disable=import-outside-toplevel
+    handler.handle(logging.LogRecord('SkinWidgets', logging.DEBUG, '', 0,
+                                     message, None, None))
+
+
+@contextlib.contextmanager
+def refresh(request: str, trigger: str = '', generation: int = 0):
+    """tags everything traced by this thread in the with block with a new
+    correlation id, use as "with trace.refresh('RecentMovie', 'scan'):"
+
+    Args:
+        request (str): widget request ie RecentMovie
+        trigger (str, optional): what caused the refresh ie playback
+        generation (int, optional): generation of the widget, shown as
+        RecentMovie#3 if not 0
+    """
+    if not enabled():
+        yield
+        return
+    previous = getattr(_local, 'context', None)
+    _local.context = (uuid.uuid4().hex[:8], trigger or 'direct',
+                      f'{request}#{generation}' if generation else request)
+    try:
+        with span('refresh'):
+            yield
+    finally:
+        _local.context = previous
+
+
+@contextlib.contextmanager
+def span(message: str, *args):
+    """times the with block and traces it with its duration, use as
+    "with trace.span('rpc %s', method):"
+
+    Args:
+        message (str): %-format string naming the span
+        *args: values for the format string, callables are called first
+    """
+    if not enabled():
+        yield
+        return
+    start = time.perf_counter()
+    outcome = ''
+    try:
+        yield
+    except BaseException as error:
+        outcome = f' failed {type(error).__name__}'
+        raise
+    finally:
+        event(message + ' %.1f ms%s', *args,
+              (time.perf_counter() - start) * 1000, outcome)
+
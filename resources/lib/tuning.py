@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# pylint: disable=line-too-long,invalid-name
+
+"""Module tunes the widget refreshes to the device.  Each refresh reports
+its latency, the CPU time the service spent on it and the time its
+JSON-RPC requests took.  Per widget the item count is lowered while the
+average latency is above the target and raised again while it is well
+below.  The CPU time of all refreshes is compared with a budget (share
+of one core over TUNE_WINDOW): over budget the heaviest timed widget
+rotates less often and fewer fetches run at the same time, well under
+budget the intervals come back down and a widget that is slow on
+requests gets another concurrent fetch.  Values move one step at a time
+after TUNE_SETTLE refreshes so a single slow refresh changes nothing.
+Does not import xbmc, the clock is passed in
+
+"""
+
+import collections
+import threading
+import time
+
+# item count bounds and step, the upper bound is the tune_items_max setting
+TUNE_ITEMS_MIN = 5
+TUNE_ITEMS_STEP = 2
+# interval of timed widgets as a multiple of their timer
+TUNE_INTERVAL_MAX = 4
+# fetches running at the same time
+TUNE_CONCURRENCY_MAX = 4
+# weight of a new measurement in the moving averages
+TUNE_SMOOTHING = 0.3
+# refreshes of a widget measured before its item count changes again
+TUNE_SETTLE = 3
+# seconds of CPU time kept for the budget, and between budget decisions
+TUNE_WINDOW = 600
+TUNE_COOLDOWN = 60
+
+
+class AutoTuner:
+    """chooses the item count and interval of each widget and the fetch
+    concurrency from measured refreshes
+    """
+
+    def __init__(self, target: float, cpu_share: float, items_max: int,
+                 concurrency: int = 2, timed: tuple = (),
+                 tune_concurrency: bool = True, clock=time.monotonic):
+        """
+        Args:
+            target (float): refresh latency aimed for in seconds
+            cpu_share (float): share of one core the refreshes may use
+            items_max (int): largest item count of a widget
+            concurrency (int, optional): fetches at the same time to start
+            with
+            timed (tuple, optional): widgets refreshed by a timer, only
+            their interval is tuned
+            tune_concurrency (bool, optional): False keeps the concurrency,
+            ie when nothing fetches in parallel
+            clock (callable, optional): monotonic clock in seconds
+        """
+        self.target = target
+        self.cpu_share = cpu_share
+        self.items_max = items_max
+        self.concurrency = concurrency
+        self.tune_concurrency = tune_concurrency
+        self.timed = tuple(timed)
+        self.clock = clock
+        self.started = clock()
+        self.adjusted = self.started
+        # request: {'items', 'interval', 'latency', 'cpu', 'rpc',
+        # 'samples', 'last'}
+        self.widgets = {}
+        # (time, cpu seconds) of the refreshes within TUNE_WINDOW
+        self.spent = collections.deque()
+        self.lock = threading.Lock()
+
+    def _widget(self, request: str) -> dict:
+        """gets the state of a widget, called with the lock held
+
+        Args:
+            request (str): widget request ie RecentMovie
+
+        Returns:
+            dict: its values and averages
+        """
+        widget = self.widgets.get(request)
+        if widget is None:
+            widget = self.widgets[request] = {
+                'items': self.items_max, 'interval': 1, 'latency': 0.0,
+                'cpu': 0.0, 'rpc': 0.0, 'samples': 0, 'last': None}
+        return widget
+
+    def items(self, request: str) -> int:
+        """gets the item count of a widget
+
+        Args:
+            request (str): widget request ie RecentMovie
+
+        Returns:
+            int: items to fetch
+        """
+        with self.lock:
+            return min(self._widget(request)['items'], self.items_max)
+
+    def limits(self) -> dict:
+        """gets the item counts of all measured widgets
+
+        Returns:
+            dict: request: items to fetch
+        """
+        with self.lock:
+            return {request: min(widget['items'], self.items_max)
+                    for request, widget in self.widgets.items()}
+
+    def due(self, request: str, period: float, lead: float = 0) -> bool:
+        """checks if a timed widget is due at its tuned interval
+
+        Args:
+            request (str): widget request ie RandomMovie
+            period (float): seconds between timer runs
+            lead (float, optional): seconds before the timer runs
+
+        Returns:
+            bool: True if the widget should be refreshed at the next run
+        """
+        with self.lock:
+            widget = self._widget(request)
+            if widget['last'] is None:
+                return True
+            # half a period of slack for the timer's jitter
+            return (self.clock() + lead - widget['last']
+                    >= (widget['interval'] - 0.5) * period)
+
+    def record(self, request: str, latency: float, cpu: float,
+               requests: int = 0, rpc: float = 0) -> bool:
+        """adds a measured refresh and tunes the values
+
+        Args:
+            request (str): widget request ie RecentMovie
+            latency (float): seconds the refresh took
+            cpu (float): CPU seconds the service spent on it
+            requests (int, optional): JSON-RPC requests it sent
+            rpc (float, optional): seconds its requests took
+
+        Returns:
+            bool: True if a value changed
+        """
+        now = self.clock()
+        with self.lock:
+            widget = self._widget(request)
+            weight = TUNE_SMOOTHING if widget['samples'] else 1.0
+            widget['latency'] += weight * (latency - widget['latency'])
+            widget['cpu'] += weight * (cpu - widget['cpu'])
+            if requests:
+                widget['rpc'] += weight * (rpc / requests - widget['rpc'])
+            widget['samples'] += 1
+            widget['last'] = now
+            self.spent.append((now, cpu))
+            while self.spent and self.spent[0][0] <= now - TUNE_WINDOW:
+                self.spent.popleft()
+            changed = self._tune_items(widget)
+            if now - self.adjusted >= TUNE_COOLDOWN:
+                self.adjusted = now
+                changed = self._tune_budget(now) or changed
+        return changed
+
+    def _tune_items(self, widget: dict) -> bool:
+        """moves the item count of a widget towards the latency target,
+        called with the lock held
+
+        Args:
+            widget (dict): the widget state
+
+        Returns:
+            bool: True if the item count changed
+        """
+        if widget['samples'] < TUNE_SETTLE:
+            return False
+        items = widget['items']
+        if widget['latency'] > self.target:
+            items = max(TUNE_ITEMS_MIN, items * 3 // 4)
+        elif widget['latency'] < self.target / 2:
+            items = min(self.items_max, items + TUNE_ITEMS_STEP)
+        if items == widget['items']:
+            return False
+        widget['items'] = items
+        widget['samples'] = 0
+        return True
+
+    def cpu_used(self, now: float = None) -> float:
+        """gets the share of one core the refreshes used lately
+
+        Args:
+            now (float, optional): clock time, defaults to now
+
+        Returns:
+            float: CPU seconds per second within TUNE_WINDOW
+        """
+        now = self.clock() if now is None else now
+        elapsed = min(TUNE_WINDOW, max(now - self.started, TUNE_COOLDOWN))
+        return sum(cpu for _, cpu in self.spent) / elapsed
+
+    def _tune_budget(self, now: float) -> bool:
+        """moves the intervals and the concurrency towards the CPU budget,
+        called with the lock held
+
+        Args:
+            now (float): clock time
+
+        Returns:
+            bool: True if a value changed
+        """
+        used = self.cpu_used(now)
+        timed = [self._widget(request) for request in self.timed]
+        if used > self.cpu_share:
+            slower = [widget for widget in timed
+                      if widget['interval'] < TUNE_INTERVAL_MAX]
+            changed = self.tune_concurrency and self.concurrency > 1
+            if changed:
+                self.concurrency -= 1
+            if slower:
+                max(slower, key=lambda widget: widget['cpu'])['interval'] += 1
+                changed = True
+            return changed
+        if used < self.cpu_share / 2:
+            faster = [widget for widget in timed if widget['interval'] > 1]
+            if faster:
+                max(faster, key=lambda widget: widget['interval'])[
+                    'interval'] -= 1
+                return True
+            # waiting on requests rather than computing, fetch in parallel
+            waiting = [widget for widget in self.widgets.values()
+                       if widget['latency'] > self.target
+                       and widget['latency'] > 2 * widget['cpu']]
+            if (waiting and self.tune_concurrency
+                    and self.concurrency < TUNE_CONCURRENCY_MAX):
+                self.concurrency += 1
+                return True
+        return False
+
+    def properties(self, request: str = '') -> dict:
+        """gets the chosen values as home window properties for
+        troubleshooting, ie SkinWidgets_TuneRecentMovie is
+        "items 20, interval 1, latency 180 ms, cpu 35 ms, rpc 12 ms"
+
+        Args:
+            request (str, optional): only this widget, all if empty
+
+        Returns:
+            dict: property: value
+        """
+        with self.lock:
+            properties = {
+                'SkinWidgets_TuneCpuShare': f'{self.cpu_used() * 100:.1f}'}
+            if self.tune_concurrency:
+                properties['SkinWidgets_TuneConcurrency'] = str(
+                    self.concurrency)
+            for name, widget in self.widgets.items():
+                if request and name != request:
+                    continue
+                properties[f'SkinWidgets_Tune{name}'] = (
+                    f"items {widget['items']}, interval {widget['interval']}, "
+                    f"latency {widget['latency'] * 1000:.0f} ms, "
+                    f"cpu {widget['cpu'] * 1000:.0f} ms, "
+                    f"rpc {widget['rpc'] * 1000:.0f} ms")
+        return properties
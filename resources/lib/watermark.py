@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# pylint: disable=line-too-long,invalid-name
+
+"""Module refreshes the recently added widgets incrementally.  The items
+of the last full query are kept with their newest dateadded as high-water
+mark, the next refresh only asks for items added after the mark and merges
+them in front of the kept items.  Kodi takes dateadded from the file time
+by default, so an added item can be dated before the mark: the ids of
+added items are kept from the OnUpdate notifications and a refresh that
+does not see all of them requeries in full.  Anything but additions
+(removals, edits, playcount changes) invalidates the mark and the next
+refresh requeries.  Does not import xbmc, the JSON-RPC function is passed
+in
+
+"""
+
+import datetime
+import json
+import threading
+
+# method: result list key, id key
+RESULT_KEYS = {'VideoLibrary.GetMovies': ('movies', 'movieid'),
+               'VideoLibrary.GetEpisodes': ('episodes', 'episodeid'),
+               'VideoLibrary.GetMusicVideos': ('musicvideos', 'musicvideoid'),
+               'AudioLibrary.GetAlbums': ('albums', 'albumid')}
+
+# notification item type: method of its recently added widgets
+ADDED_TYPES = {'movie': 'VideoLibrary.GetMovies',
+               'episode': 'VideoLibrary.GetEpisodes',
+               'musicvideo': 'VideoLibrary.GetMusicVideos',
+               'album': 'AudioLibrary.GetAlbums'}
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class RecentWatermark:
+    """keeps the items and dateadded high-water mark of each recently added
+    widget
+    """
+
+    def __init__(self, execute):
+        """
+        Args:
+            execute (callable): sends a JSON-RPC request, returns the response
+        """
+        self.execute = execute
+        # request: {'request', 'query', 'method', 'items', 'mark', 'unseen'},
+        # unseen are ids of added items since the items were kept
+        self.widgets = {}
+        self.lock = threading.Lock()
+
+    def query(self, request: str, query: str) -> str:
+        """runs a recently added query, incrementally if the widget has a
+        valid mark.  dateadded is added to the requested properties
+
+        Args:
+            request (str): widget request ie RecentMovie
+            query (str): JSON-RPC request sorted by dateadded descending
+
+        Returns:
+            str: JSON-RPC response with the merged items
+        """
+        query = json.loads(query)
+        params = query['params']
+        if 'dateadded' not in params['properties']:
+            params['properties'].append('dateadded')
+        key = json.dumps(query, sort_keys=True)
+        with self.lock:
+            state = self.widgets.get(request)
+        if state and state['query'] == key and state['mark']:
+            response = self._newer(query, state)
+            if response is not None:
+                return response
+        response = self.execute(json.dumps(query))
+        decoded = json.loads(response)
+        items = decoded.get('result', {}).get(RESULT_KEYS[query['method']][0])
+        if items is not None:
+            self._remember(request, key, items)
+        return response
+
+    def _newer(self, query: dict, state: dict):
+        """asks for the items added after the mark and merges them in front
+        of the kept items
+
+        Args:
+            query (dict): the full query
+            state (dict): kept items and mark of the widget
+
+        Returns:
+            str: JSON-RPC response with the merged items, None if the
+            incremental query failed
+        """
+        list_key, id_key = RESULT_KEYS[query['method']]
+        try:
+            # one second earlier so items added in the mark's second are
+            # not missed, duplicates are dropped by id
+            after = (datetime.datetime.strptime(state['mark'], DATE_FORMAT)
+                     - datetime.timedelta(seconds=1)).strftime(DATE_FORMAT)
+        except ValueError:
+            return None
+        newer = json.loads(json.dumps(query))
+        rule = {'field': 'dateadded', 'operator': 'after', 'value': after}
+        if 'filter' in newer['params']:
+            rule = {'and': [newer['params']['filter'], rule]}
+        newer['params']['filter'] = rule
+        decoded = json.loads(self.execute(json.dumps(newer)))
+        if 'result' not in decoded:
+            return None
+        added = decoded['result'].get(list_key, [])
+        ids = {item.get(id_key) for item in added}
+        with self.lock:
+            unseen = set(state['unseen'])
+        if unseen - ids - {item.get(id_key) for item in state['items']}:
+            # an added item is dated before the mark
+            return None
+        items = (added + [item for item in state['items']
+                          if item.get(id_key) not in ids])
+        items = items[:query['params'].get('limits', {}).get('end', len(items))]
+        self._remember(state['request'], state['query'], items)
+        return json.dumps({'jsonrpc': '2.0', 'id': query.get('id', 1),
+                           'result': {list_key: items}})
+
+    def unseen(self, request: str) -> bool:
+        """checks if items were added since the items of a widget were kept
+
+        Args:
+            request (str): widget request ie RecentMovie
+
+        Returns:
+            bool: True if added ids are waiting for its next refresh
+        """
+        with self.lock:
+            return bool(self.widgets.get(request, {}).get('unseen'))
+
+    def _remember(self, request: str, key: str, items: list):
+        """keeps the items of a widget and their newest dateadded
+
+        Args:
+            request (str): widget request ie RecentMovie
+            key (str): normalised query
+            items (list): items of the result
+        """
+        mark = max((item.get('dateadded', '') for item in items), default='')
+        with self.lock:
+            self.widgets[request] = {'request': request, 'query': key,
+                                     'method': json.loads(key)['method'],
+                                     'items': list(items),
+                                     'mark': mark, 'unseen': set()}
+
+    def invalidate(self, library: str = ''):
+        """drops the marks of a library so its widgets are queried in full
+
+        Args:
+            library (str, optional): method prefix ie VideoLibrary, all if
+            empty
+        """
+        with self.lock:
+            for request in [request for request, state in self.widgets.items()
+                            if json.loads(state['query']).get(
+                                'method', '').startswith(library)]:
+                del self.widgets[request]
+
+    def notification(self, method: str, data: str):
+        """drops the marks of a library for a Kodi notification that is not
+        an added item, ie VideoLibrary.OnRemove or a playcount update
+
+        Args:
+            method (str): notification ie VideoLibrary.OnUpdate
+            data (str): JSON notification data
+        """
+        library, _, event = method.partition('.')
+        if library not in ('VideoLibrary', 'AudioLibrary'):
+            return
+        if event in ('OnRemove', 'OnCleanFinished') or (
+                event == 'OnUpdate' and not is_added(data)):
+            self.invalidate(library)
+        elif event == 'OnUpdate':
+            self._added(data)
+
+    def _added(self, data: str):
+        """keeps the id of an added item for the widgets of its type, their
+        next refresh requeries in full unless it finds the item
+
+        Args:
+            data (str): JSON notification data of the added item
+        """
+        item = json.loads(data).get('item', {})
+        method = ADDED_TYPES.get(item.get('type'))
+        if method is None or item.get('id') is None:
+            return
+        with self.lock:
+            for state in self.widgets.values():
+                if state['method'] == method:
+                    state['unseen'].add(item['id'])
+
+
+def is_added(data: str) -> bool:
+    """checks if a library OnUpdate notification is for a newly added item
+
+    Args:
+        data (str): JSON notification data
+
+    Returns:
+        bool: True if the item was added by a scan
+    """
+    try:
+        return json.loads(data).get('added') is True
+    except (ValueError, AttributeError, TypeError):
+        return False
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# pylint: disable=line-too-long,invalid-name
+
+"""Module wraps the home window and keeps a copy of the properties each
+widget has published, ie everything set as "RecentMovie.<n>.<key>" is
+kept under RecentMovie.  A widget can be staged, its properties are then
+set on a copy and published together or dropped, or captured to be
+published later.  Publishing is traced as a span.  Does not import xbmc, the window is passed in
+
+"""
+
+import contextlib
+import threading
+
+from resources.lib import generations, trace
+
+
+class WidgetWindow:
+    """home window that remembers the published widget properties
+    """
+
+    def __init__(self, window):
+        """
+        Args:
+            window (xbmcgui.Window): the window properties are set on
+        """
+        self.window = window
+        self.widgets = {}
+        self.lock = threading.Lock()
+        # widget staged by the current thread and its properties
+        self.local = threading.local()
+
+    def _staged(self, key: str):
+        """gets the staged properties a key belongs to
+
+        Args:
+            key (str): property key
+
+        Returns:
+            dict: the staged properties or None if the key is not staged
+        """
+        staged = getattr(self.local, 'staged', None)
+        if staged and key.partition('.')[0] == staged[0]:
+            return staged[1]
+        return None
+
+    def setProperty(self, key: str, value: str):
+        """see xbmcgui.Window.setProperty"""
+        staged = self._staged(key)
+        if staged is not None:
+            staged[key] = value
+            return
+        request, dot, _ = key.partition('.')
+        if dot:
+            with self.lock:
+                self.widgets.setdefault(request, {})[key] = value
+        self.window.setProperty(key, value)
+
+    def getProperty(self, key: str) -> str:
+        """see xbmcgui.Window.getProperty"""
+        staged = self._staged(key)
+        if staged is not None:
+            return staged.get(key, '')
+        return self.window.getProperty(key)
+
+    def clearProperty(self, key: str):
+        """see xbmcgui.Window.clearProperty"""
+        staged = self._staged(key)
+        if staged is not None:
+            staged.pop(key, None)
+            return
+        request, dot, _ = key.partition('.')
+        if dot:
+            with self.lock:
+                self.widgets.get(request, {}).pop(key, None)
+        self.window.clearProperty(key)
+
+    def widget(self, request: str) -> dict:
+        """gets the properties a widget has published
+
+        Args:
+            request (str): widget request ie RecentMovie
+
+        Returns:
+            dict: copy of the properties by key
+        """
+        with self.lock:
+            return dict(self.widgets.get(request, {}))
+
+    def find(self, name: str, value: str) -> list:
+        """finds the published widget items with a property value, ie the
+        items with DBID 12
+
+        Args:
+            name (str): item property ie DBID
+            value (str): the value
+
+        Returns:
+            list: item prefixes ie RecentMovie.3
+        """
+        suffix = f'.{name}'
+        with self.lock:
+            return [key[:-len(suffix)] for properties in self.widgets.values()
+                    for key, current in properties.items()
+                    if current == value and key.endswith(suffix)]
+
+    def publish(self, request: str, properties: dict):
+        """replaces the published properties of a widget, properties no
+        longer present are cleared.  Nothing is published if the refresh
+        of this thread was superseded
+
+        Args:
+            request (str): widget request ie RecentMovie
+            properties (dict): the new properties by key
+
+        Raises:
+            generations.Superseded: a newer trigger replaced the refresh
+        """
+        with trace.span('publish %s', request), generations.publishing():
+            old = self.widget(request)
+            for key in old:
+                if key not in properties:
+                    self.clearProperty(key)
+            for key, value in properties.items():
+                if old.get(key) != value:
+                    self.setProperty(key, value)
+
+    @contextlib.contextmanager
+    def stage(self, request: str):
+        """stages the properties of a widget set by this thread in the with
+        block, use as "with window.stage('RecentMovie'):".  They are
+        published when the block completes and dropped if it raises, so
+        the skin keeps the previous widget
+
+        Args:
+            request (str): widget request ie RecentMovie
+        """
+        with self.capture(request) as properties:
+            yield
+        self.publish(request, properties)
+
+    @contextlib.contextmanager
+    def capture(self, request: str):
+        """stages the properties of a widget set by this thread in the with
+        block without publishing them, ie to prepare the next items of a
+        widget ahead of time
+
+        Args:
+            request (str): widget request ie RandomMovie
+
+        Yields:
+            dict: the properties, the published ones changed by the block
+        """
+        properties = self.widget(request)
+        self.local.staged = (request, properties)
+        try:
+            yield properties
+        finally:
+            self.local.staged = None
+
+
+class PropertyRecorder:
+    """stands in for the home window in the replay harness and the fetch
+    engine and keeps the properties set by the fetchers
+    """
+
+    def __init__(self):
+        self.properties = {}
+
+    def setProperty(self, key: str, value: str):
+        """see xbmcgui.Window.setProperty"""
+        self.properties[key] = value
+
+    def getProperty(self, key: str) -> str:
+        """see xbmcgui.Window.getProperty"""
+        return self.properties.get(key, '')
+
+    def clearProperty(self, key: str):
+        """see xbmcgui.Window.clearProperty"""
+        self.properties.pop(key, None)
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Benchmarks building and aggregating the library index on a generated
+library, run as "python3 tests/benchmark_index.py 100000" from the addon
+folder
+
+"""
+
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resources.lib.index import MAKERS, PLAYCOUNT, LibraryIndex  # noqa: E402 pylint: disable=wrong-import-position
+
+
+def benchmark(size: int):
+    """times building and aggregating an index of generated movies
+
+    Args:
+        size (int): number of movies
+    """
+    generator = random.Random(1)
+    genres = [f'Genre {n}' for n in range(40)]
+    studios = [f'Studio {n}' for n in range(2000)]
+    movies = [{'movieid': n, 'genre': generator.sample(genres, 2),
+               'studio': [generator.choice(studios)],
+               'year': generator.randint(1950, 2024),
+               'dateadded': f'2024-{generator.randint(1, 12):02d}-{generator.randint(1, 28):02d} 10:00:00',
+               'playcount': generator.randint(0, 3),
+               'rating': generator.random() * 10} for n in range(size)]
+
+    def execute(request: str) -> str:
+        params = json.loads(request)['params']
+        page = movies[params['limits']['start']:params['limits']['end']]
+        return json.dumps({'result': {'movies': page,
+                                      'limits': {'total': size}}})
+
+    index = LibraryIndex(execute)
+    start = time.perf_counter()
+    index.build('movie')
+    print(f'build {size} movies: {time.perf_counter() - start:.3f} s')
+    for name, kwargs in (('top genres', {}),
+                         ('new per studio', {'field': MAKERS,
+                                             'since': '2024-12-01 00:00:00'}),
+                         ('most played studios', {'field': MAKERS,
+                                                  'weight': PLAYCOUNT})):
+        runs = []
+        for _ in range(5):
+            start = time.perf_counter()
+            index.aggregate('movie', **kwargs)
+            runs.append(time.perf_counter() - start)
+        print(f'{name}: {min(runs) * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
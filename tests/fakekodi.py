@@ -0,0 +1,691 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Fake Kodi for the tests: a simulated library answering JSON-RPC
+requests, a JSON-RPC TCP server for the engine tests that pushes
+notifications to the connected clients, Kodi's web server for texture
+prewarming and the xbmc modules the service imports, on a simulated clock
+
+"""
+
+import collections
+import datetime
+import heapq
+import http.server
+import itertools
+import json
+import os
+import random
+import socket
+import socketserver
+import threading
+import types
+
+# library size per media type
+LIBRARY_SIZE = {'movie': 400, 'tvshow': 40, 'episode': 800,
+                'musicvideo': 100, 'album': 150, 'artist': 80, 'song': 1500,
+                'addon': 30}
+# method: media type, result key
+LIST_METHODS = {
+    'VideoLibrary.GetMovies': ('movie', 'movies'),
+    'VideoLibrary.GetTVShows': ('tvshow', 'tvshows'),
+    'VideoLibrary.GetEpisodes': ('episode', 'episodes'),
+    'VideoLibrary.GetMusicVideos': ('musicvideo', 'musicvideos'),
+    'AudioLibrary.GetAlbums': ('album', 'albums'),
+    'AudioLibrary.GetArtists': ('artist', 'artists'),
+    'AudioLibrary.GetSongs': ('song', 'songs'),
+    'Addons.GetAddons': ('addon', 'addons'),
+}
+DETAIL_METHODS = {
+    'VideoLibrary.GetMovieDetails': ('movie', 'moviedetails'),
+    'VideoLibrary.GetTVShowDetails': ('tvshow', 'tvshowdetails'),
+    'VideoLibrary.GetEpisodeDetails': ('episode', 'episodedetails'),
+    'VideoLibrary.GetMusicVideoDetails': ('musicvideo', 'musicvideodetails'),
+    'AudioLibrary.GetAlbumDetails': ('album', 'albumdetails'),
+    'AudioLibrary.GetSongDetails': ('song', 'songdetails'),
+}
+# values of properties the simulated items do not set
+LIST_PROPERTIES = {'genre', 'studio', 'country', 'director', 'writer',
+                   'artist', 'style', 'mood', 'theme', 'instrument',
+                   'yearsactive', 'albumlabel', 'tag', 'showlink'}
+NUMBER_PROPERTIES = {'playcount', 'year', 'runtime', 'season', 'episode',
+                     'tvshowid', 'userrating', 'duration', 'track',
+                     'albumid'}
+GENRES = [f'Genre {n}' for n in range(20)]
+MAKERS = [f'Studio {n}' for n in range(60)]
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+# what the addon API of the fake Kodi reports
+ADDON_INFO = {'id': 'service.skin.widgets', 'name': 'Skin Widgets',
+              'version': '0.0.0', 'path': os.path.dirname(
+                  os.path.dirname(os.path.abspath(__file__)))}
+# windows of the fake Kodi
+HOME = 10000
+FULLSCREEN_VIDEO = 12005
+
+
+class FakeJsonRpcServer(socketserver.ThreadingTCPServer):
+    """JSON-RPC TCP interface on a free local port, requests are answered
+    by execute, use as a context manager
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, execute):
+        """
+        Args:
+            execute (callable): answers a JSON-RPC request string
+        """
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self.execute = execute
+        self.requests = []
+        self.clients = []
+        self.lock = threading.Lock()
+        # set to hold back responses
+        self.stalled = threading.Event()
+
+    @property
+    def port(self) -> int:
+        """port the server listens on"""
+        return self.server_address[1]
+
+    def notify(self, method: str, data: dict):
+        """sends a notification to the connected clients
+
+        Args:
+            method (str): notification ie VideoLibrary.OnUpdate
+            data (dict): notification data
+        """
+        message = json.dumps({'jsonrpc': '2.0', 'method': method, 'params': {
+            'sender': 'xbmc', 'data': data}}).encode('utf-8')
+        with self.lock:
+            for client in self.clients:
+                client.sendall(message)
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        with self.lock:
+            for client in self.clients:
+                client.close()
+        self.server_close()
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    """answers the json messages a client sends back to back"""
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.clients.append(self.request)
+        decoder = json.JSONDecoder()
+        buffer = ''
+        while True:
+            try:
+                chunk = self.request.recv(65536)
+            except OSError:
+                return
+            if not chunk:
+                return
+            buffer += chunk.decode('utf-8')
+            while buffer.strip():
+                buffer = buffer.lstrip()
+                try:
+                    message, end = decoder.raw_decode(buffer)
+                except ValueError:
+                    break
+                buffer = buffer[end:]
+                server.requests.append(message['method'])
+                if server.stalled.is_set():
+                    continue
+                response = server.execute(json.dumps(message))
+                with server.lock:
+                    try:
+                        self.request.sendall(response.encode('utf-8'))
+                    except OSError:
+                        return
+
+
+def free_port() -> int:
+    """gets a local port nothing listens on"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class SimulatedLibrary:
+    """Kodi library answering the JSON-RPC requests of the fetchers, items
+    are added, played and removed on the simulated clock
+    """
+
+    def __init__(self, clock, seed: int = 1):
+        """
+        Args:
+            clock (callable): simulated time in seconds
+            seed (int, optional): seed of the generated library
+        """
+        self.clock = clock
+        self.random = random.Random(seed)
+        # Kodi system settings answered to Settings.GetSettingValue, the
+        # web server is off so texture prewarming stops at once
+        self.settings = {'services.webserver': False,
+                         'powermanagement.shutdownstate': 0}
+        # media type: {id: item}
+        self.items = {media: {} for media in LIBRARY_SIZE}
+        self.ids = dict.fromkeys(LIBRARY_SIZE, 0)
+        for media, size in LIBRARY_SIZE.items():
+            for _ in range(size):
+                self.add(media)
+
+    def _date(self) -> str:
+        """gets the simulated time as dateadded"""
+        return datetime.datetime.fromtimestamp(self.clock()).strftime(
+            DATE_FORMAT)
+
+    def add(self, media: str) -> dict:
+        """adds a generated item
+
+        Args:
+            media (str): media type ie movie
+
+        Returns:
+            dict: the item
+        """
+        self.ids[media] += 1
+        number = self.ids[media]
+        item = {f'{media}id': number, 'label': f'{media} {number}',
+                'title': f'{media} {number}',
+                'genre': self.random.sample(GENRES, 2),
+                'studio': [self.random.choice(MAKERS)],
+                'artist': [self.random.choice(MAKERS)],
+                'year': self.random.randint(1960, 2024),
+                'dateadded': self._date(), 'playcount': 0, 'lastplayed': '',
+                'rating': round(self.random.random() * 10, 1),
+                'file': f'/media/{media}/{number}/{media}.mkv',
+                'art': {'poster': f'image://{media}{number}.jpg/',
+                        'fanart': f'image://{media}{number}f.jpg/'}}
+        if media == 'episode':
+            item['tvshowid'] = self.random.randint(1, self.ids['tvshow'] or 1)
+            item['season'] = 1
+            item['episode'] = number
+        elif media == 'song':
+            item['albumid'] = self.random.choice(list(self.items['album'])
+                                                 or [0])
+        elif media == 'addon':
+            item.update(addonid=f'plugin.video.{number}',
+                        type='xbmc.python.pluginsource', name=item['title'],
+                        enabled=True,
+                        extrainfo=[{'key': 'provides', 'value': 'video'}])
+        self.items[media][number] = item
+        return item
+
+    def remove_oldest(self, media: str) -> int:
+        """removes the oldest item
+
+        Args:
+            media (str): media type ie movie
+
+        Returns:
+            int: id of the removed item
+        """
+        oldest = min(self.items[media])
+        del self.items[media][oldest]
+        return oldest
+
+    def play(self, media: str) -> dict:
+        """plays an item, it is either finished or left in progress
+
+        Args:
+            media (str): media type ie movie
+
+        Returns:
+            dict: the item
+        """
+        item = self.random.choice(list(self.items[media].values()))
+        if self.random.random() < 0.3:
+            item['resume'] = {'position': 600.0, 'total': 5400.0}
+        else:
+            item['resume'] = {'position': 0.0, 'total': 0.0}
+            item['playcount'] += 1
+        item['lastplayed'] = self._date()
+        return item
+
+    def execute(self, request: str) -> str:
+        """answers a JSON-RPC request
+
+        Args:
+            request (str): JSON-RPC request
+
+        Returns:
+            str: JSON-RPC response
+        """
+        request = json.loads(request)
+        method = request['method']
+        params = request.get('params', {})
+        if method in LIST_METHODS:
+            media, key = LIST_METHODS[method]
+            items, total = self._list(media, params)
+            result = {key: items, 'limits': {'start': 0, 'end': len(items),
+                                             'total': total}}
+        elif method in DETAIL_METHODS:
+            media, key = DETAIL_METHODS[method]
+            item = self.items[media].get(params.get(f'{media}id'))
+            if item is None:
+                return json.dumps({'jsonrpc': '2.0', 'id': request.get('id'),
+                                   'error': {'code': -32602,
+                                             'message': 'Invalid params.'}})
+            result = {key: self._project(media, item,
+                                         params.get('properties', []))}
+        elif method == 'VideoLibrary.GetSeasons':
+            result = {'seasons': [{'season': 1, 'label': 'Season 1',
+                                   'thumbnail': 'image://season.jpg/'}]}
+        elif method == 'Settings.GetSettingValue':
+            result = {'value': self.settings.get(params.get('setting'))}
+        else:
+            result = {}
+        return json.dumps({'jsonrpc': '2.0', 'id': request.get('id'),
+                           'result': result})
+
+    def _list(self, media: str, params: dict) -> tuple:
+        """filters, sorts and limits the items of a list request
+
+        Args:
+            media (str): media type ie movie
+            params (dict): request parameters
+
+        Returns:
+            tuple: projected items, total before the limit
+        """
+        items = [item for item in self.items[media].values()
+                 if self._match(item, params.get('filter'))
+                 and item.get('tvshowid', params.get('tvshowid'))
+                 == params.get('tvshowid', item.get('tvshowid'))]
+        sort = params.get('sort', {})
+        if sort.get('method') == 'random':
+            self.random.shuffle(items)
+        elif sort.get('method') in ('dateadded', 'lastplayed', 'playcount',
+                                    'episode'):
+            items.sort(key=lambda item: item.get(sort['method']) or 0,
+                       reverse=sort.get('order') == 'descending')
+        end = params.get('limits', {}).get('end', len(items))
+        return ([self._project(media, item, params.get('properties', []))
+                 for item in items[:end]], len(items))
+
+    def _match(self, item: dict, rule) -> bool:
+        """evaluates a JSON-RPC filter, unknown fields match
+
+        Args:
+            item (dict): library item
+            rule (dict): filter or None
+
+        Returns:
+            bool: True if the item passes the filter
+        """
+        if not rule:
+            return True
+        if 'and' in rule:
+            return all(self._match(item, part) for part in rule['and'])
+        if 'or' in rule:
+            return any(self._match(item, part) for part in rule['or'])
+        field, operator, value = (rule.get('field'), rule.get('operator'),
+                                  rule.get('value'))
+        if field == 'inprogress':
+            return item.get('resume', {}).get('position', 0) > 0
+        if field == 'playcount':
+            count = int(value)
+            return {'is': item['playcount'] == count,
+                    'lessthan': item['playcount'] < count,
+                    'greaterthan': item['playcount'] > count}.get(operator, True)
+        if field == 'dateadded' and operator == 'after':
+            return item['dateadded'] > value
+        if field == 'genre':
+            return value in item['genre']
+        return True
+
+    def _project(self, media: str, item: dict, properties: list) -> dict:
+        """keeps the requested properties of an item, properties the item
+        does not set get an empty value of their type
+
+        Args:
+            media (str): media type ie movie
+            item (dict): library item
+            properties (list): requested properties
+
+        Returns:
+            dict: the item as returned by Kodi
+        """
+        projected = {f'{media}id': item[f'{media}id'], 'label': item['label']}
+        if media == 'addon':
+            projected.update(addonid=item['addonid'], type=item['type'])
+        for name in properties:
+            if name in item:
+                projected[name] = item[name]
+            elif name in LIST_PROPERTIES:
+                projected[name] = []
+            elif name in NUMBER_PROPERTIES:
+                projected[name] = 0
+            elif name == 'resume':
+                projected[name] = {'position': 0.0, 'total': 0.0}
+            elif name == 'streamdetails':
+                projected[name] = {'video': [{'width': 1920, 'height': 1080,
+                                              'codec': 'h264',
+                                              'aspect': 1.78}],
+                                   'audio': [{'codec': 'ac3', 'channels': 6}],
+                                   'subtitle': []}
+            elif name == 'cast':
+                projected[name] = []
+            else:
+                projected[name] = ''
+        return projected
+
+
+class FakeWebServer(http.server.ThreadingHTTPServer):
+    """Kodi's web server on a free local port, every /image/ url is served
+    as an empty image and counted, use as a context manager
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _ImageHandler)
+        self.images = 0
+
+    @property
+    def port(self) -> int:
+        """port the server listens on"""
+        return self.server_address[1]
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+
+class _ImageHandler(http.server.BaseHTTPRequestHandler):
+    """answers the image requests of the texture prewarmer"""
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        found = self.path.startswith('/image/')
+        if found:
+            self.server.images += 1
+        self.send_response(200 if found else 404)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+class FakeKodi:
+    """Kodi behind the xbmc, xbmcgui, xbmcaddon and xbmcvfs modules of
+    modules().  Time is simulated, it only advances while the service waits
+    in Monitor.waitForAbort.  Events scheduled with at run during the wait
+    they fall in, as Kodi's callbacks would arrive meanwhile.  Library
+    queries and the daemon wakeups that sent them are counted per
+    simulated hour
+    """
+
+    def __init__(self, execute, settings: dict, root: str, start: float):
+        """
+        Args:
+            execute (callable): answers a JSON-RPC request string
+            settings (dict): addon settings by id, see change_settings
+            root (str): folder special:// paths are translated to
+            start (float): simulated time at the start in seconds
+        """
+        self.execute = execute
+        self.settings = dict(settings)
+        self.root = root
+        self.start = self.now = self.last_input = start
+        # home window properties
+        self.properties = {}
+        self.window = HOME
+        # what is played: '', 'video' or 'audio'
+        self.playing = ''
+        self.screensaver = False
+        self.aborted = False
+        self.monitors = []
+        # (time, order, callback, args) heap
+        self.events = []
+        self.order = itertools.count()
+        self.running = False
+        # simulated hour: [wakeups with library queries, library queries]
+        self.hours = collections.defaultdict(lambda: [0, 0])
+        self.queried = False
+        self.lock = threading.Lock()
+
+    def time(self) -> float:
+        """gets the simulated time in seconds"""
+        return self.now
+
+    def hour(self) -> int:
+        """gets the simulated hour since the start"""
+        return int((self.now - self.start) // 3600)
+
+    def at(self, when: float, callback, *args):
+        """schedules an event
+
+        Args:
+            when (float): simulated time in seconds
+            callback (callable): called with args at that time
+        """
+        heapq.heappush(self.events, (when, next(self.order), callback, args))
+
+    def wait(self, seconds: float) -> bool:
+        """advances the simulated clock, running the events due meanwhile.
+        Waits of the service inside an event only advance the clock
+
+        Args:
+            seconds (float): time waited
+
+        Returns:
+            bool: True if Kodi is exiting
+        """
+        if self.queried:
+            self.hours[self.hour()][0] += 1
+            self.queried = False
+        end = self.now + (seconds or 0)
+        if not self.running:
+            self.running = True
+            try:
+                while (self.events and self.events[0][0] <= end
+                       and not self.aborted):
+                    when, _, callback, args = heapq.heappop(self.events)
+                    self.now = max(self.now, when)
+                    callback(*args)
+            finally:
+                self.running = False
+        self.now = max(self.now, end)
+        return self.aborted
+
+    def execute_jsonrpc(self, request: str) -> str:
+        """answers a JSON-RPC request, library queries are counted
+
+        Args:
+            request (str): JSON-RPC request
+
+        Returns:
+            str: JSON-RPC response
+        """
+        with self.lock:
+            if 'Library.Get' in request or 'Addons.Get' in request:
+                self.hours[self.hour()][1] += 1
+                self.queried = True
+            return self.execute(request)
+
+    def translate_path(self, path: str) -> str:
+        """translates special:// paths to the root folder"""
+        if path.startswith('special://'):
+            return os.path.join(self.root, path[len('special://'):])
+        return path
+
+    def notify(self, method: str, data):
+        """sends a notification to the monitors
+
+        Args:
+            method (str): notification ie VideoLibrary.OnUpdate
+            data: notification data, sent as JSON
+        """
+        for monitor in self.monitors:
+            monitor.onNotification('xbmc', method, json.dumps(data))
+
+    def scan(self, library: str, started: bool):
+        """tells the monitors a library scan started or finished
+
+        Args:
+            library (str): video or music
+            started (bool): True if the scan started
+        """
+        for monitor in self.monitors:
+            if started:
+                monitor.onScanStarted(library)
+            else:
+                monitor.onScanFinished(library)
+
+    def user_input(self, window: int = None):
+        """the user presses a key, ending the screensaver
+
+        Args:
+            window (int, optional): window opened by the key
+        """
+        self.last_input = self.now
+        if window is not None:
+            self.window = window
+        if self.screensaver:
+            self.screensaver = False
+            for monitor in self.monitors:
+                monitor.onScreensaverDeactivated()
+
+    def start_screensaver(self):
+        """starts the screensaver"""
+        self.screensaver = True
+        for monitor in self.monitors:
+            monitor.onScreensaverActivated()
+
+    def change_settings(self, **settings):
+        """changes addon settings like the settings dialog
+
+        Args:
+            **settings: new values by setting id
+        """
+        self.settings.update(settings)
+        for monitor in self.monitors:
+            monitor.onSettingsChanged()
+
+    def abort(self):
+        """asks the service to exit, like Kodi shutting down"""
+        self.aborted = True
+
+    def modules(self) -> dict:
+        """builds the Kodi modules the service imports, backed by this
+        fake Kodi
+
+        Returns:
+            dict: module by name ie xbmc
+        """
+        kodi = self
+
+        class Monitor:
+            """see xbmc.Monitor"""
+
+            def __init__(self):
+                kodi.monitors.append(self)
+
+            def waitForAbort(self, timeout: float = 0) -> bool:
+                return kodi.wait(timeout)
+
+            def abortRequested(self) -> bool:
+                return kodi.aborted
+
+        class Player:
+            """see xbmc.Player"""
+
+            def isPlaying(self) -> bool:
+                return bool(kodi.playing)
+
+            def isPlayingVideo(self) -> bool:
+                return kodi.playing == 'video'
+
+            def isPlayingAudio(self) -> bool:
+                return kodi.playing == 'audio'
+
+        class Window:
+            """see xbmcgui.Window, only the home window keeps properties"""
+
+            def __init__(self, window_id: int):
+                self.properties = kodi.properties if window_id == HOME else {}
+
+            def setProperty(self, key: str, value: str):
+                self.properties[key] = value
+
+            def getProperty(self, key: str) -> str:
+                return self.properties.get(key, '')
+
+            def clearProperty(self, key: str):
+                self.properties.pop(key, None)
+
+        class Addon:
+            """see xbmcaddon.Addon, the settings are read from the fake
+            Kodi
+            """
+
+            def __init__(self, addon_id: str = ''):
+                self.addon_id = addon_id
+
+            def getAddonInfo(self, key: str) -> str:
+                if key == 'profile':
+                    return kodi.translate_path(
+                        f'special://profile/addon_data/{ADDON_INFO["id"]}/')
+                return ADDON_INFO.get(key, '')
+
+            def getLocalizedString(self, string_id: int) -> str:
+                return f'string {string_id}'
+
+            def getSettingBool(self, setting: str) -> bool:
+                return bool(kodi.settings.get(setting, False))
+
+            def getSettingInt(self, setting: str) -> int:
+                return int(kodi.settings.get(setting, 0))
+
+            def getSettingString(self, setting: str) -> str:
+                return str(kodi.settings.get(setting, ''))
+
+        xbmc = types.ModuleType('xbmc')
+        xbmc.LOGDEBUG = 0
+        xbmc.Monitor = Monitor
+        xbmc.Player = Player
+        xbmc.executeJSONRPC = self.execute_jsonrpc
+        xbmc.getGlobalIdleTime = lambda: int(kodi.now - kodi.last_input)
+        xbmc.getCondVisibility = lambda condition: False
+        xbmc.getLocalizedString = lambda string_id: f'string {string_id}'
+        xbmc.log = lambda msg, level=0: None
+        xbmcgui = types.ModuleType('xbmcgui')
+        xbmcgui.Window = Window
+        xbmcgui.getCurrentWindowId = lambda: kodi.window
+        xbmcaddon = types.ModuleType('xbmcaddon')
+        xbmcaddon.Addon = Addon
+        xbmcvfs = types.ModuleType('xbmcvfs')
+        xbmcvfs.translatePath = self.translate_path
+        return {'xbmc': xbmc, 'xbmcgui': xbmcgui, 'xbmcaddon': xbmcaddon,
+                'xbmcvfs': xbmcvfs}
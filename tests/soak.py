@@ -0,0 +1,485 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Soak test of months of service uptime, run as "python3 tests/soak.py
+--days 90" from the addon folder.  The service daemon runs unchanged on a
+fake Kodi whose clock is fast-forwarded while the daemon waits: random
+widget timer ticks, a nightly library scan with additions and removals,
+playback during the day, window changes, the screensaver at night, weekly
+settings changes with a smart playlist edit and monthly library cleans
+all arrive through the Monitor callbacks.  Every simulated day the RSS
+and the size of the caches and queues the service keeps are sampled, the
+library queries and the daemon wakeups that sent them are counted per
+simulated hour.  The run fails if memory or kept state grows after the
+first week, a queue outgrows its bound, the wakeups per hour drift or the
+service raises
+
+"""
+
+import argparse
+import contextlib
+import datetime
+import functools
+import gc
+import importlib
+import os
+import resource
+import sys
+import tempfile
+import time
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakekodi import (FULLSCREEN_VIDEO, GENRES, HOME, FakeKodi,  # noqa: E402 pylint: disable=wrong-import-position
+                      FakeWebServer, SimulatedLibrary)
+from resources.lib import generations  # noqa: E402 pylint: disable=wrong-import-position
+from resources.lib.governor import QueryGovernor  # noqa: E402 pylint: disable=wrong-import-position
+from resources.lib.prewarm import TexturePrewarmer  # noqa: E402 pylint: disable=wrong-import-position
+
+# days before memory and kept state are taken as the baseline
+WARMUP_DAYS = 7
+# RSS growth allowed after the warmup
+RSS_GROWTH_LIMIT = 8 * 1024 * 1024
+# growth of each kept state allowed after the warmup, factor and items
+STATE_GROWTH_LIMIT = (1.25, 10)
+# change of the mean wakeups per hour allowed between the second and the
+# last simulated week
+WAKEUP_DRIFT_LIMIT = 0.2
+# simulated time at the start, a midnight
+START = datetime.datetime(2024, 1, 1).timestamp()
+# items the nightly scan adds and removes per media type so the library
+# stays the same size, hour of the scan and minutes it takes per library
+SCAN_ITEMS = {'video': {'movie': 3, 'episode': 10, 'musicvideo': 1},
+              'music': {'album': 2, 'song': 20}}
+SCAN_HOUR = 3
+SCAN_MINUTES = 10
+# hour: media type played, minutes played
+PLAYBACK_HOURS = {12: 'song', 19: 'episode', 20: 'movie', 22: 'episode'}
+PLAYBACK_MINUTES = 40
+# hours the user opens the videos window for a few minutes
+BROWSE_HOURS = (9, 18, 21)
+BROWSE_MINUTES = 3
+VIDEOS = 10025
+# hours the screensaver starts and the user comes back
+SCREENSAVER_HOURS = (1, 8)
+# addon settings, every widget group the fake library answers is on
+SETTINGS = {'plot_enable': True, 'recommended_enable': True,
+            'randomitems_enable': True, 'randomitems_unplayed': True,
+            'randomitems_seasonfolders': True, 'randomitems_method': 0,
+            'randomitems_time': 10, 'recentitems_enable': True,
+            'recentitems_unplayed': True, 'recentitems_homeupdate': True,
+            'prewarm_enable': True, 'index_enable': True,
+            'playlist_enable': True, 'lowmem_enable': False,
+            'lowmem_trace': False, 'rpc_anonymise': True,
+            'engine_python': 'python3', 'engine_port': 9090,
+            'tune_latency': 1000, 'tune_cpu': 5, 'tune_items_max': 20}
+PLAYLIST = '''<?xml version="1.0" encoding="UTF-8" standalone="yes" ?>
+<smartplaylist type="movies">
+    <name>Unwatched {genre}</name>
+    <match>all</match>
+    <rule field="genre" operator="is"><value>{genre}</value></rule>
+    <rule field="playcount" operator="is"><value>0</value></rule>
+    <order direction="descending">dateadded</order>
+</smartplaylist>
+'''
+PLAYLIST_PATH = 'special://profile/playlists/video/unwatched_genre.xsp'
+PLAYLIST_WIDGET = 'PlaylistUnwatchedGenre'
+# Kodi modules replaced by the fake Kodi and the addon modules importing
+# them, imported again for the run
+KODI_MODULES = ('xbmc', 'xbmcgui', 'xbmcaddon', 'xbmcvfs')
+SERVICE_MODULES = ('resources.lib.jsonrpc', 'resources.lib.play',
+                   'resources.lib.service')
+
+
+@contextlib.contextmanager
+def kodi_service(kodi: FakeKodi):
+    """imports the service against a fake Kodi, its clocks are the
+    simulated clock.  What was imported before is restored at exit
+
+    Args:
+        kodi (FakeKodi): the fake Kodi
+
+    Yields:
+        module: resources.lib.service
+    """
+    package = importlib.import_module('resources.lib')
+    saved = {name: sys.modules.get(name)
+             for name in KODI_MODULES + SERVICE_MODULES}
+    attributes = {name: getattr(package, name.rpartition('.')[2], None)
+                  for name in SERVICE_MODULES}
+    argv = sys.argv
+    sys.modules.update(kodi.modules())
+    for name in SERVICE_MODULES:
+        sys.modules.pop(name, None)
+    sys.argv = ['service.py']
+    try:
+        service = importlib.import_module('resources.lib.service')
+        service.time = service.jsonrpc.time = types.SimpleNamespace(
+            time=kodi.time, monotonic=kodi.time,
+            perf_counter=time.perf_counter, thread_time=time.thread_time)
+        service.QueryGovernor = functools.partial(QueryGovernor,
+                                                  clock=kodi.time)
+        service.TexturePrewarmer = functools.partial(TexturePrewarmer,
+                                                     clock=kodi.time)
+        yield service
+    finally:
+        sys.argv = argv
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+        for name, module in attributes.items():
+            if module is None:
+                delattr(package, name.rpartition('.')[2])
+            else:
+                setattr(package, name.rpartition('.')[2], module)
+
+
+class Soak:
+    """schedules the simulated days on the fake Kodi and samples the
+    service at the end of each day
+    """
+
+    def __init__(self, kodi: FakeKodi, library: SimulatedLibrary,
+                 verbose: bool = True):
+        """
+        Args:
+            kodi (FakeKodi): the fake Kodi the service runs on
+            library (SimulatedLibrary): the library it queries
+            verbose (bool, optional): print a sample per simulated week
+        """
+        self.kodi = kodi
+        self.library = library
+        self.verbose = verbose
+        self.service = None
+        # item being played
+        self.item = None
+        self.playlist = kodi.translate_path(PLAYLIST_PATH)
+        # kept state by day, RSS by day
+        self.samples = []
+        self.rss = []
+        self.failed = []
+        self.started = time.perf_counter()
+
+    def main(self):
+        """gets the running service.Main from its monitor"""
+        return self.kodi.monitors[0].notification.__self__
+
+    def schedule(self, days: int):
+        """schedules the Kodi events of the simulated days, Kodi exits at
+        the end of the last
+
+        Args:
+            days (int): simulated days
+        """
+        for day in range(days):
+            start = START + day * 86400
+
+            def at(hour, callback, *args, start=start):
+                self.kodi.at(start + hour * 3600, callback, *args)
+
+            if day % 7 == 6:
+                at(18.5, self.change_settings, day // 7 + 1)
+            if day % 30 == 29:
+                for library in ('VideoLibrary', 'AudioLibrary'):
+                    at(4, self.kodi.notify, f'{library}.OnCleanFinished',
+                       None)
+            for offset, library in enumerate(SCAN_ITEMS):
+                hour = SCAN_HOUR + offset
+                at(hour, self.scan, library)
+                at(hour + SCAN_MINUTES / 60, self.kodi.scan, library, False)
+            for hour, media in PLAYBACK_HOURS.items():
+                at(hour, self.play, media)
+                at(hour + PLAYBACK_MINUTES / 60, self.stop, media)
+            for hour in BROWSE_HOURS:
+                at(hour, self.kodi.user_input, VIDEOS)
+                at(hour + BROWSE_MINUTES / 60, self.kodi.user_input, HOME)
+            at(SCREENSAVER_HOURS[0], self.kodi.start_screensaver)
+            at(SCREENSAVER_HOURS[1], self.kodi.user_input, HOME)
+            at(24 - 1 / 3600, self.sample, day)
+        self.kodi.at(START + days * 86400, self.kodi.abort)
+
+    def write_playlist(self, week: int):
+        """writes the smart playlist, a new genre each week
+
+        Args:
+            week (int): simulated week
+        """
+        os.makedirs(os.path.dirname(self.playlist), exist_ok=True)
+        with open(self.playlist, 'w', encoding='utf-8') as playlist:
+            playlist.write(PLAYLIST.format(genre=GENRES[week % len(GENRES)]))
+        os.utime(self.playlist, (self.kodi.now, self.kodi.now))
+
+    def change_settings(self, week: int):
+        """edits the smart playlist and toggles settings in the settings
+        dialog
+
+        Args:
+            week (int): simulated week
+        """
+        self.write_playlist(week)
+        settings = self.kodi.settings
+        self.kodi.change_settings(
+            lowmem_enable=not settings['lowmem_enable'],
+            randomitems_unplayed=not settings['randomitems_unplayed'])
+
+    def scan(self, library: str):
+        """starts a library scan that adds and removes items
+
+        Args:
+            library (str): video or music
+        """
+        namespace = 'AudioLibrary' if library == 'music' else 'VideoLibrary'
+        self.kodi.scan(library, True)
+        for media, count in SCAN_ITEMS[library].items():
+            for _ in range(count):
+                item = self.library.add(media)
+                self.kodi.notify(f'{namespace}.OnUpdate', {
+                    'item': {'id': item[f'{media}id'], 'type': media},
+                    'added': True})
+                removed = self.library.remove_oldest(media)
+                self.kodi.notify(f'{namespace}.OnRemove',
+                                 {'id': removed, 'type': media})
+
+    def play(self, media: str):
+        """starts playing a library item, videos fullscreen
+
+        Args:
+            media (str): movie, episode or song
+        """
+        item = self.library.play(media)
+        self.kodi.playing = 'audio' if media == 'song' else 'video'
+        if media != 'song':
+            self.kodi.user_input(FULLSCREEN_VIDEO)
+        self.kodi.notify('Player.OnPlay', {
+            'item': {'id': item[f'{media}id'], 'type': media},
+            'player': {'playerid': 1, 'speed': 1}})
+        self.item = item
+
+    def stop(self, media: str):
+        """stops playback, Kodi writes the playcount and resume point
+
+        Args:
+            media (str): movie, episode or song
+        """
+        item = self.item
+        data = {'id': item[f'{media}id'], 'type': media}
+        namespace = 'AudioLibrary' if media == 'song' else 'VideoLibrary'
+        self.kodi.notify(f'{namespace}.OnUpdate',
+                         {'item': data, 'playcount': item['playcount']})
+        self.kodi.playing = ''
+        self.kodi.notify('Player.OnStop', {'item': data, 'end': True})
+        self.kodi.user_input(HOME)
+
+    def widgets(self) -> list:
+        """gets every widget the service may refresh"""
+        service = self.service
+        return (service.RECOMMENDED_WIDGETS + service.RANDOM_WIDGETS
+                + service.RECENT_WIDGETS + list(service.AGGREGATE_WIDGETS)
+                + service.PVR_WIDGETS + [PLAYLIST_WIDGET])
+
+    def state(self) -> dict:
+        """gets the size of every cache and queue the service keeps
+
+        Returns:
+            dict: size by name
+        """
+        main = self.main()
+        fetcher = main.fetcher
+        return {
+            'pending': len(main.pending),
+            'triggers': len(main.triggers),
+            'retries': len(main.retries),
+            'rotation': len(main.rotation),
+            'stale': len(main.stale),
+            'generations': len(generations._current),  # pylint: disable=protected-access
+            'fingerprints': len(fetcher.fingerprints),
+            'jsonrpc cache': len(self.service.jsonrpc._cache),  # pylint: disable=protected-access
+            'watermark items': sum(len(state['items']) for state
+                                   in fetcher.watermark.widgets.values()),
+            'index items': sum(len(items) for items
+                               in fetcher.index.items.values()),
+            'index names': len(fetcher.index.names),
+            'window properties': len(self.kodi.properties),
+            'published properties': sum(len(properties) for properties
+                                        in main.WINDOW.widgets.values()),
+            'compiled playlists': len(fetcher.playlists.compiled),
+            'prewarm queue': len(main.prewarmer.queue),
+            'prewarm remembered': len(main.prewarmer.warmed),
+            'governor starts': len(main.governor.started),
+        }
+
+    def bounds(self) -> dict:
+        """gets the most items each queue of the service may hold
+
+        Returns:
+            dict: limit by name in state
+        """
+        service = self.service
+        widgets = len(self.widgets())
+        return {'pending': widgets, 'triggers': widgets, 'retries': widgets,
+                'stale': widgets, 'generations': widgets,
+                'fingerprints': widgets,
+                'rotation': len(service.RANDOM_WIDGETS),
+                'jsonrpc cache': service.CACHE_SIZE,
+                'prewarm remembered': service.PREWARM_REMEMBER,
+                'governor starts': service.QUERIES_PER_MINUTE}
+
+    def sample(self, day: int):
+        """samples the RSS and the kept state at the end of a day
+
+        Args:
+            day (int): simulated day from 0
+        """
+        gc.collect()
+        state = self.state()
+        self.samples.append(state)
+        self.rss.append(rss())
+        for name, limit in self.bounds().items():
+            if state[name] > limit:
+                self.failed.append(f'day {day + 1}: {name} {state[name]} '
+                                   f'over its bound {limit}')
+        if self.verbose and day % 7 == 6:
+            wakeups, queries = hourly(self.kodi.hours, day - 6, day + 1)
+            elapsed = (time.perf_counter() - self.started) / 7
+            self.started = time.perf_counter()
+            print(f'day {day + 1}: rss {self.rss[-1] / 1048576:.1f} MiB, '
+                  f'{wakeups:.1f} wakeups and {queries:.1f} queries per '
+                  f'hour, {elapsed:.2f} s per day')
+
+    def check(self) -> list:
+        """compares the last week with the first two
+
+        Returns:
+            list: the failed checks
+        """
+        days = len(self.samples)
+        failed = list(self.failed)
+        growth = self.rss[-1] - self.rss[WARMUP_DAYS - 1]
+        if growth > RSS_GROWTH_LIMIT:
+            failed.append(f'rss grew {growth / 1048576:.1f} MiB after the '
+                          f'warmup')
+        factor, items = STATE_GROWTH_LIMIT
+        for name, size in self.samples[-1].items():
+            baseline = max(sample[name]
+                           for sample in self.samples[:WARMUP_DAYS])
+            if size > baseline * factor + items:
+                failed.append(f'{name} grew from {baseline} to {size}')
+        second = hourly(self.kodi.hours, WARMUP_DAYS, 2 * WARMUP_DAYS)
+        last = hourly(self.kodi.hours, days - WARMUP_DAYS, days)
+        for name, before, after in zip(('wakeups', 'queries'), second, last):
+            if abs(after - before) > before * WAKEUP_DRIFT_LIMIT:
+                failed.append(f'{name} per hour drifted from {before:.1f} '
+                              f'to {after:.1f}')
+        return failed
+
+
+def rss() -> int:
+    """gets the resident set size of this process
+
+    Returns:
+        int: RSS in bytes, the peak RSS where /proc is missing
+    """
+    try:
+        with open('/proc/self/statm', encoding='ascii') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def hourly(hours: dict, first: int, last: int) -> tuple:
+    """gets the mean wakeups and queries per hour of a range of days
+
+    Args:
+        hours (dict): [wakeups, queries] by simulated hour
+        first (int): first day
+        last (int): day after the last
+
+    Returns:
+        tuple: mean wakeups, mean queries per hour
+    """
+    counts = [hours.get(hour, [0, 0]) for hour in range(first * 24, last * 24)]
+    return (sum(count[0] for count in counts) / len(counts),
+            sum(count[1] for count in counts) / len(counts))
+
+
+def soak(days: int, seed: int = 1, verbose: bool = True) -> Soak:
+    """runs the service for simulated days, Kodi's web server is on so
+    texture prewarming runs
+
+    Args:
+        days (int): simulated days, at least three weeks
+        seed (int, optional): seed of the library
+        verbose (bool, optional): print a sample per simulated week
+
+    Returns:
+        Soak: the run, its samples and failed checks
+    """
+    days = max(days, 3 * WARMUP_DAYS)
+    with tempfile.TemporaryDirectory() as root, FakeWebServer() as web:
+        kodi = FakeKodi(lambda request: library.execute(request), SETTINGS,
+                        root, START)
+        library = SimulatedLibrary(kodi.time, seed)
+        library.settings.update({'services.webserver': True,
+                                 'services.webserverport': web.port,
+                                 'services.webserverusername': 'kodi',
+                                 'services.webserverpassword': ''})
+        run = Soak(kodi, library, verbose)
+        run.write_playlist(0)
+        run.schedule(days)
+        with kodi_service(kodi) as service:
+            run.service = service
+            kodi.properties['SkinWidgets_Active'] = ';'.join((
+                'home:' + ','.join(service.RECOMMENDED_WIDGETS
+                                   + service.RANDOM_WIDGETS
+                                   + service.RECENT_WIDGETS),
+                'videos:' + ','.join(list(service.AGGREGATE_WIDGETS)
+                                     + [PLAYLIST_WIDGET])))
+            service.Main()
+        run.images = web.images
+    run.failed = run.check()
+    if verbose:
+        print(f'state: {run.samples[-1]}, {run.images} images prewarmed')
+    return run
+
+
+def main(argv: list = None) -> int:
+    """runs the soak test from the command line
+
+    Args:
+        argv (list, optional): command line arguments
+
+    Returns:
+        int: exit status, 1 if a check failed
+    """
+    parser = argparse.ArgumentParser(description='Skin Widgets soak test')
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+    run = soak(args.days, args.seed)
+    for failure in run.failed:
+        print(f'FAILED: {failure}')
+    print('soak test failed' if run.failed else 'soak test passed')
+    return 1 if run.failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Tests of the fetch engine end to end against the fake JSON-RPC server
+
+"""
+
+import itertools
+import json
+import os
+import sys
+import time
+
+import pytest
+
+from fakekodi import FakeJsonRpcServer, SimulatedLibrary, free_port
+from resources.lib.engine import EngineProcess, Engine, JsonRpcConnection
+
+ADDON = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SETTINGS = {'lowmem_enable': False, 'plot_enable': True,
+            'randomitems_unplayed': True, 'randomitems_seasonfolders': True,
+            'recentitems_unplayed': False}
+
+
+@pytest.fixture(name='library')
+def fixture_library():
+    # every item is added a minute after the previous one
+    return SimulatedLibrary(itertools.count(1700000000, 60).__next__)
+
+
+def batch(widgets: list, **extra) -> dict:
+    return dict({'widgets': widgets, 'settings': SETTINGS, 'addonid': 'test',
+                 'unwatched_plot': ''}, **extra)
+
+
+def test_engine_fetches_widgets_over_one_connection(library):
+    with FakeJsonRpcServer(library.execute) as server:
+        connection = JsonRpcConnection(port=server.port, timeout=5)
+        engine = Engine(connection)
+        results = {result['widget']: result
+                   for result in engine.fetch(batch(['RecentMovie',
+                                                     'RecentAlbum']))}
+        connection.close()
+    newest = max(library.items['movie'])
+    assert results['RecentMovie']['properties'][
+        'RecentMovie.1.Title'] == f'movie {newest}'
+    assert 'RecentAlbum.1.Title' in results['RecentAlbum']['properties']
+    assert len(server.clients) == 1
+
+
+def test_notifications_reach_the_watermark(library):
+    with FakeJsonRpcServer(library.execute) as server:
+        connection = JsonRpcConnection(port=server.port, timeout=5)
+        engine = Engine(connection)
+        list(engine.fetch(batch(['RecentMovie'])))
+        item = library.add('movie')
+        server.notify('VideoLibrary.OnUpdate', {
+            'item': {'type': 'movie', 'id': item['movieid']}, 'added': True})
+        for _ in range(50):
+            if engine.fetcher.watermark.unseen('RecentMovie'):
+                break
+            time.sleep(0.02)
+        result = next(engine.fetch(batch(['RecentMovie'])))
+        connection.close()
+    assert result['properties']['RecentMovie.1.Title'] == item['title']
+
+
+def test_request_deadline_fails_the_widget(library):
+    with FakeJsonRpcServer(library.execute) as server:
+        server.stalled.set()
+        connection = JsonRpcConnection(port=server.port)
+        engine = Engine(connection)
+        started = time.monotonic()
+        result = next(engine.fetch(batch(['RecentMovie'], deadline=0.2)))
+        connection.close()
+    assert time.monotonic() - started < 5
+    assert not any(key.endswith('.Title') for key in result['properties'])
+
+
+def test_connection_error_without_server():
+    connection = JsonRpcConnection(port=free_port(), timeout=1)
+    response = json.loads(connection.execute(json.dumps({
+        'jsonrpc': '2.0', 'id': 7, 'method': 'JSONRPC.Ping'})))
+    assert response['id'] == 7
+    assert 'not connected' in response['error']['message']
+
+
+def test_engine_process_against_the_fake_server(library):
+    with FakeJsonRpcServer(library.execute) as server:
+        engine = EngineProcess([sys.executable, '-m', 'resources.lib.engine',
+                                '--port', str(server.port)], ADDON, timeout=30)
+        try:
+            results = engine.fetch(['RecentMovie', 'RandomMovie'], batch([]))
+        finally:
+            engine.close()
+    assert set(results) == {'RecentMovie', 'RandomMovie'}
+
+
+def test_hung_engine_is_stopped_and_restarted(tmp_path):
+    script = tmp_path / 'hung.py'
+    script.write_text('import sys, time\nsys.stdin.readline()\ntime.sleep(60)\n')
+    engine = EngineProcess([sys.executable, str(script)], str(tmp_path),
+                           timeout=0.5)
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        engine.fetch(['RecentMovie'], batch([]))
+    assert time.monotonic() - started < 5
+    assert engine.process is None
+    with pytest.raises(TimeoutError):
+        engine.fetch(['RecentMovie'], batch([]))
+    engine.close()
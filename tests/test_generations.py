@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Tests of superseding widget refreshes by generation
+
+"""
+
+import threading
+
+import pytest
+
+from resources.lib import generations
+
+
+@pytest.fixture(name='fresh', autouse=True)
+def fixture_fresh(monkeypatch):
+    """every test starts with all widgets at generation 0"""
+    monkeypatch.setattr(generations, '_current', {})
+
+
+def test_superseded_refresh_stops_at_its_next_check():
+    with generations.running('RecentMovie') as generation:
+        assert generation == 0
+        generations.check()
+        generations.supersede(['RecentMovie', 'RecentEpisode'])
+        with pytest.raises(generations.Superseded):
+            generations.check()
+    assert generations.generation('RecentMovie') == 1
+
+
+def test_other_widgets_and_threads_outside_a_refresh_go_on():
+    generations.supersede(['RecentMovie'])
+    # no refresh running on this thread
+    generations.check()
+    with generations.running('RandomMovie'):
+        generations.supersede(['RecentMovie'])
+        generations.check()
+    # a refresh started after the bump runs with the new generation
+    with generations.running('RecentMovie') as generation:
+        assert generation == 2
+        generations.check()
+
+
+def test_nested_refresh_restores_the_outer_one():
+    with generations.running('RecentMovie'):
+        with generations.running('RandomMovie'):
+            generations.supersede(['RecentMovie'])
+            generations.check()
+        with pytest.raises(generations.Superseded):
+            generations.check()
+
+
+def test_superseded_refresh_never_publishes():
+    with generations.running('RecentMovie'):
+        generations.supersede(['RecentMovie'])
+        with pytest.raises(generations.Superseded):
+            with generations.publishing():
+                pytest.fail('published')
+
+
+def test_publishing_waits_for_the_widget_to_be_cleared():
+    published = []
+    clearing = threading.Event()
+
+    def refresh():
+        with generations.running('RecentMovie'):
+            clearing.wait(5)
+            try:
+                with generations.publishing():
+                    published.append(True)
+            except generations.Superseded:
+                published.append(False)
+
+    thread = threading.Thread(target=refresh)
+    thread.start()
+    with generations.superseding(['RecentMovie']):
+        clearing.set()
+        # the refresh cannot publish between the bump and the clearing
+        thread.join(0.2)
+        assert thread.is_alive()
+    thread.join(5)
+    assert published == [False]
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Tests of the query governor limits on a simulated clock
+
+"""
+
+import threading
+
+from resources.lib.governor import QueryGovernor
+
+
+class Clock:
+    """simulated clock, waiting advances it"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.waited = 0.0
+
+    def time(self) -> float:
+        return self.now
+
+    def wait(self, seconds: float) -> bool:
+        self.now += seconds
+        self.waited += seconds
+        return False
+
+
+def governor(clock: Clock, **limits) -> QueryGovernor:
+    """builds a governor waiting on the simulated clock"""
+    return QueryGovernor(wait=clock.wait, clock=clock.time, **limits)
+
+
+def run(limiter: QueryGovernor, queries: int) -> list:
+    """runs queries one after another, returns if each was allowed"""
+    allowed = []
+    for _ in range(queries):
+        with limiter.query() as ok:
+            allowed.append(ok)
+    return allowed
+
+
+def test_queries_wait_for_a_free_slot():
+    limiter = QueryGovernor(concurrency=2)
+    release = threading.Event()
+    started = threading.Semaphore(0)
+
+    def query():
+        with limiter.query():
+            started.release()
+            release.wait(5)
+
+    threads = [threading.Thread(target=query) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    assert started.acquire(timeout=5) and started.acquire(timeout=5)
+    # the third waits while two are running
+    assert not started.acquire(timeout=0.2)
+    release.set()
+    assert started.acquire(timeout=5)
+    for thread in threads:
+        thread.join()
+
+
+def test_queries_per_minute():
+    clock = Clock()
+    limiter = governor(clock, per_minute=3)
+    assert run(limiter, 3) == [True] * 3
+    assert clock.waited == 0
+    assert run(limiter, 1) == [True]
+    # the fourth waits until the first is a minute old
+    assert clock.waited == 60
+
+
+def test_lower_budget_during_a_scan():
+    clock = Clock()
+    limiter = governor(clock, per_minute=10, scan_per_minute=1)
+    limiter.scan_started('video')
+    limiter.scan_started('music')
+    run(limiter, 2)
+    assert clock.waited == 60
+    # still scanning until both libraries are done
+    limiter.scan_finished('video')
+    assert limiter.scanning
+    limiter.scan_finished('music')
+    assert not limiter.scanning
+    clock.waited = 0
+    run(limiter, 9)
+    assert clock.waited == 0
+
+
+def test_aborted_wait_does_not_allow_the_query():
+    clock = Clock()
+    limiter = QueryGovernor(per_minute=1, wait=lambda seconds: True,
+                            clock=clock.time)
+    assert run(limiter, 2) == [True, False]
+
+
+def test_resize_keeps_running_queries_in_their_slots():
+    limiter = QueryGovernor(concurrency=1)
+    with limiter.query():
+        limiter.resize(2)
+        # both new slots are free while the old query runs
+        assert run(limiter, 1) == [True]
+        slots = limiter.slots
+    assert slots.acquire(blocking=False) and slots.acquire(blocking=False)
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Tests of the library index kept current from notifications against a
+fake music library
+
+"""
+
+import json
+
+from resources.lib.index import MAKERS, PLAYCOUNT, LibraryIndex
+
+
+class MusicLibrary:
+    """albums of songs, an album's playcount is the sum of its songs"""
+
+    def __init__(self):
+        # songid: [albumid, playcount]
+        self.songs = {song: [1 + song % 3, 0] for song in range(1, 61)}
+        self.methods = []
+
+    def album(self, albumid: int) -> dict:
+        return {'albumid': albumid, 'genre': ['Rock'],
+                'artist': [f'Artist {albumid}'], 'year': 2000,
+                'dateadded': '2024-01-01 10:00:00', 'rating': 0,
+                'playcount': sum(count for album, count
+                                 in self.songs.values() if album == albumid)}
+
+    def play(self, song: int) -> str:
+        self.songs[song][1] += 1
+        return json.dumps({'item': {'type': 'song', 'id': song},
+                           'playcount': self.songs[song][1]})
+
+    def execute(self, request: str) -> str:
+        request = json.loads(request)
+        method, params = request['method'], request['params']
+        self.methods.append(method)
+        if method == 'AudioLibrary.GetAlbums':
+            albums = [self.album(albumid) for albumid in (1, 2, 3)]
+            result = {'albums': albums, 'limits': {'total': len(albums)}}
+        elif method == 'AudioLibrary.GetAlbumDetails':
+            result = {'albumdetails': self.album(params['albumid'])}
+        elif method == 'AudioLibrary.GetSongDetails':
+            result = {'songdetails': {'songid': params['songid'],
+                                      'albumid': self.songs[params['songid']][0]}}
+        else:
+            result = {}
+        return json.dumps({'id': request['id'], 'result': result})
+
+
+def test_played_song_updates_only_its_album():
+    library = MusicLibrary()
+    index = LibraryIndex(library.execute)
+    index.sync('album')
+    assert index.aggregate('album', MAKERS, PLAYCOUNT) == []
+    index.notification('AudioLibrary.OnUpdate', library.play(4))
+    index.notification('AudioLibrary.OnUpdate', library.play(4))
+    library.methods.clear()
+    index.sync('album')
+    assert library.methods == ['AudioLibrary.GetSongDetails',
+                               'AudioLibrary.GetAlbumDetails']
+    assert index.aggregate('album', MAKERS, PLAYCOUNT) == [('Artist 2', 2)]
+
+
+def test_many_song_changes_rebuild():
+    library = MusicLibrary()
+    index = LibraryIndex(library.execute)
+    index.sync('album')
+    # more songs than MAX_UPDATES
+    for song in range(1, 61):
+        index.notification('AudioLibrary.OnUpdate', library.play(song))
+    library.methods.clear()
+    index.sync('album')
+    assert library.methods == ['AudioLibrary.GetAlbums']
+    assert dict(index.aggregate('album', MAKERS, PLAYCOUNT)) == {
+        'Artist 1': 20, 'Artist 2': 20, 'Artist 3': 20}
+
+
+def test_song_changes_before_the_first_build_are_ignored():
+    library = MusicLibrary()
+    index = LibraryIndex(library.execute)
+    index.notification('AudioLibrary.OnUpdate', library.play(1))
+    assert not index.songs
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Tests of the JSON-RPC layer against a fake xbmc.executeJSONRPC
+
+"""
+
+import concurrent.futures
+import importlib
+import json
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+from resources.lib.governor import QueryGovernor
+
+MOVIES = json.dumps({'jsonrpc': '2.0', 'id': 1,
+                     'method': 'VideoLibrary.GetMovies', 'params': {}})
+
+
+class FakeKodi:
+    """answers every request with an empty result after a delay"""
+
+    def __init__(self):
+        self.delay = 0
+        self.sent = []
+        self.answered = threading.Semaphore(0)
+
+    def execute(self, request: str) -> str:
+        self.sent.append(json.loads(request))
+        time.sleep(self.delay)
+        self.answered.release()
+        return json.dumps({'jsonrpc': '2.0', 'id': 1, 'result': {
+            'sent': len(self.sent)}})
+
+
+@pytest.fixture(name='kodi')
+def fixture_kodi():
+    return FakeKodi()
+
+
+@pytest.fixture(name='jsonrpc')
+def fixture_jsonrpc(kodi, monkeypatch):
+    xbmc = types.ModuleType('xbmc')
+    xbmc.executeJSONRPC = kodi.execute
+    monkeypatch.setitem(sys.modules, 'xbmc', xbmc)
+    monkeypatch.delitem(sys.modules, 'resources.lib.jsonrpc', raising=False)
+    monkeypatch.setattr(importlib.import_module('resources.lib'), 'jsonrpc',
+                        None, raising=False)
+    module = importlib.import_module('resources.lib.jsonrpc')
+    yield module
+    module.shutdown()
+
+
+@pytest.fixture(name='clock')
+def fixture_clock(jsonrpc, monkeypatch):
+    """simulated monotonic clock of the response cache"""
+    now = [0.0]
+    monkeypatch.setattr(jsonrpc, 'time', types.SimpleNamespace(
+        monotonic=lambda: now[0], perf_counter=time.perf_counter))
+    return now
+
+
+def query(method: str, **params) -> str:
+    """builds a JSON-RPC request"""
+    return json.dumps({'jsonrpc': '2.0', 'id': 1, 'method': method,
+                       'params': params})
+
+
+def cached(jsonrpc, request: str) -> int:
+    """sends a request within a 60 s cache ttl, returns which request to
+    Kodi answered it
+    """
+    with jsonrpc.cache_ttl(60):
+        return json.loads(jsonrpc.execute(request))['result']['sent']
+
+
+def late(jsonrpc, seconds: float):
+    """sends MOVIES within a deadline, returns True if it timed out"""
+    try:
+        with jsonrpc.deadline(seconds):
+            jsonrpc.execute(MOVIES)
+    except jsonrpc.DeadlineExceeded:
+        return True
+    return False
+
+
+def test_requests_waiting_for_a_worker_are_not_sent(jsonrpc, kodi):
+    kodi.delay = 0.5
+    with concurrent.futures.ThreadPoolExecutor(6) as pool:
+        timed_out = list(pool.map(lambda _: late(jsonrpc, 0.1), range(6)))
+    assert all(timed_out)
+    for _ in range(2):
+        assert kodi.answered.acquire(timeout=5)
+    time.sleep(0.2)
+    # only the two requests the workers had started reached Kodi
+    assert len(kodi.sent) == 2
+
+
+def test_late_request_keeps_its_governor_slot(jsonrpc, kodi):
+    governor = QueryGovernor(concurrency=1)
+    jsonrpc.set_governor(governor)
+    kodi.delay = 0.5
+    assert late(jsonrpc, 0.1)
+    # still running in Kodi, no other query may start
+    assert not governor.slots.acquire(blocking=False)
+    assert kodi.answered.acquire(timeout=5)
+    time.sleep(0.1)
+    assert governor.slots.acquire(blocking=False)
+
+
+def test_ungoverned_request_skips_a_full_governor(jsonrpc, kodi):
+    governor = QueryGovernor(concurrency=1)
+    jsonrpc.set_governor(governor)
+    assert governor.slots.acquire(blocking=False)
+    with jsonrpc.ungoverned(), jsonrpc.deadline(1):
+        jsonrpc.execute(MOVIES)
+    assert len(kodi.sent) == 1
+    # its slot was never taken so nothing is released for it
+    assert not governor.slots.acquire(blocking=False)
+
+
+def test_recorded_responses_are_replayed_in_order(jsonrpc, kodi, tmp_path):
+    fixture = str(tmp_path / 'fixture.jsonl')
+    jsonrpc.set_backend(jsonrpc.RECORD, fixture)
+    for _ in range(2):
+        jsonrpc.execute(MOVIES)
+    jsonrpc.set_backend(jsonrpc.REPLAY, fixture)
+    # id, key order and whitespace do not matter
+    same = json.dumps({'params': {}, 'method': 'VideoLibrary.GetMovies',
+                       'id': 7, 'jsonrpc': '2.0'}, indent=1)
+    replayed = [json.loads(jsonrpc.execute(same))['result']['sent']
+                for _ in range(3)]
+    # the last recorded response is repeated
+    assert replayed == [1, 2, 2]
+    assert len(kodi.sent) == 2
+
+
+def test_unrecorded_request_is_an_error(jsonrpc, kodi, tmp_path):
+    fixture = tmp_path / 'fixture.jsonl'
+    fixture.write_text('', encoding='utf-8')
+    jsonrpc.set_backend(jsonrpc.REPLAY, str(fixture))
+    response = json.loads(jsonrpc.execute(MOVIES))
+    assert response['error']['code'] == -32601
+    assert not kodi.sent
+
+
+def test_anonymise_keeps_lengths_separators_and_protocols(jsonrpc):
+    movie = {'movieid': 5, 'title': 'The Matrix', 'year': 1999,
+             'file': 'smb://nas/movies/The Matrix (1999).mkv',
+             'art': {'poster': 'image://http%3a%2f%2fexample.org%2fp.jpg/'}}
+    anonymised = jsonrpc.anonymise(movie)
+    assert anonymised['movieid'] == 5 and anonymised['year'] == 1999
+    assert anonymised['title'] != movie['title']
+    assert len(anonymised['title']) == len(movie['title'])
+    assert anonymised['file'].startswith('smb://')
+    assert anonymised['file'].count('/') == movie['file'].count('/')
+    poster = anonymised['art']['poster']
+    assert poster.startswith('image://http%3a%2f%2f') and poster.endswith('/')
+    # the same word is always hashed the same
+    assert jsonrpc.anonymise(movie) == anonymised
+
+
+def test_cached_response_expires_after_its_ttl(jsonrpc, kodi, clock):
+    assert cached(jsonrpc, MOVIES) == 1
+    clock[0] = 59
+    assert cached(jsonrpc, MOVIES) == 1
+    clock[0] = 61
+    assert cached(jsonrpc, MOVIES) == 2
+    # requests outside cache_ttl are always sent
+    jsonrpc.execute(MOVIES)
+    assert len(kodi.sent) == 3
+    assert jsonrpc.cache_hit_rate() == 100 / 3
+
+
+@pytest.mark.usefixtures('clock')
+def test_least_recently_used_response_is_dropped(jsonrpc):
+    jsonrpc.set_cache_size(2)
+    first, second, third = (query('VideoLibrary.GetMovies', limit=limit)
+                            for limit in range(3))
+    assert cached(jsonrpc, first) == 1
+    assert cached(jsonrpc, second) == 2
+    # used again, second is now the oldest
+    assert cached(jsonrpc, first) == 1
+    assert cached(jsonrpc, third) == 3
+    assert cached(jsonrpc, first) == 1
+    assert cached(jsonrpc, second) == 4
+
+
+@pytest.mark.usefixtures('clock')
+def test_invalidate_drops_only_the_changed_library(jsonrpc):
+    albums = query('AudioLibrary.GetAlbums')
+    assert cached(jsonrpc, MOVIES) == 1
+    assert cached(jsonrpc, albums) == 2
+    jsonrpc.invalidate('VideoLibrary')
+    assert cached(jsonrpc, MOVIES) == 3
+    assert cached(jsonrpc, albums) == 2
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Tests of the click-to-play path of default.py, run in a new interpreter
+as Kodi does for every RunScript
+
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# stub xbmc, records the JSON-RPC requests in the file named by SENT
+XBMC = '''import os
+LOGDEBUG = 0
+def executeJSONRPC(request):
+    with open(os.environ['SENT'], 'a', encoding='utf-8') as sent:
+        sent.write(request + '\\n')
+    return '{"jsonrpc": "2.0", "id": 1, "result": "OK"}'
+def getCondVisibility(condition):
+    return False
+def log(msg, level=LOGDEBUG):
+    pass
+'''
+
+
+def run_default(tmp_path, *args) -> tuple:
+    """runs default.py with -X importtime against the stub xbmc
+
+    Args:
+        tmp_path (Path): folder for the stub and the sent requests
+        args (str): script arguments
+
+    Returns:
+        tuple: names of the imported modules and the sent requests
+    """
+    (tmp_path / 'xbmc.py').write_text(XBMC, encoding='utf-8')
+    sent = tmp_path / 'sent.jsonl'
+    env = dict(os.environ, PYTHONPATH=str(tmp_path), SENT=str(sent))
+    done = subprocess.run(
+        [sys.executable, '-X', 'importtime', 'default.py', *args],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    imported = {line.rsplit('|', 1)[1].strip()
+                for line in done.stderr.splitlines()
+                if line.startswith('import time:') and '|' in line}
+    requests = [json.loads(line)
+                for line in sent.read_text(encoding='utf-8').splitlines()]
+    return imported, requests
+
+
+def test_play_never_loads_the_service(tmp_path):
+    imported, requests = run_default(tmp_path, 'movieid=5')
+    assert 'resources.lib.play' in imported
+    assert 'resources.lib.service' not in imported
+    assert 'resources.lib.jsonrpc' not in imported
+    # debug logging is off in the stub
+    assert 'resources.lib.trace' not in imported
+    assert [request['method'] for request in requests] == ['Player.Open']
+    assert requests[0]['params']['item'] == {'movieid': 5}
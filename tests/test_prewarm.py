@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Tests of the texture cache prewarmer against a fake texture database
+
+"""
+
+import json
+
+from resources.lib.prewarm import TexturePrewarmer, unwrap
+
+CACHED = 'image://https%3a%2f%2fexample.org%2fposter.jpg/'
+UNCACHED = 'image://smb%3a%2f%2fnas%2fmovies%2ffanart.jpg/'
+
+
+class TextureDatabase:
+    """answers Textures.GetTextures, urls are stored unwrapped like Kodi
+    does
+    """
+
+    def __init__(self, urls):
+        self.urls = list(urls)
+
+    def execute(self, request: str) -> str:
+        request = json.loads(request)
+        assert request['method'] == 'Textures.GetTextures'
+        wanted = {rule['value'] for rule in request['params']['filter']['or']}
+        return json.dumps({'jsonrpc': '2.0', 'id': 1, 'result': {
+            'textures': [{'textureid': number, 'url': url}
+                         for number, url in enumerate(self.urls)
+                         if url in wanted]}})
+
+
+def test_unwrap():
+    assert unwrap(CACHED) == 'https://example.org/poster.jpg'
+    assert unwrap('image://C%3a%5cart%5cthumb.png/') == 'C:\\art\\thumb.png'
+    assert unwrap('special://home/icon.png') == 'special://home/icon.png'
+
+
+def test_cached_artwork_is_not_warmed_again():
+    database = TextureDatabase(['https://example.org/poster.jpg'])
+    prewarmer = TexturePrewarmer(database.execute)
+    assert prewarmer._uncached([CACHED, UNCACHED]) == [UNCACHED]  # pylint: disable=protected-access
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Tests of the PVR cache against a fake PVR backend through adds,
+plays, deletes and ended timers
+
+"""
+
+import collections
+import datetime
+import json
+import random
+
+import pytest
+
+from resources.lib.pvr import DATE_FORMAT, PVR_TYPES, PvrCache
+
+
+class FakePvrBackend:
+    """answers the PVR JSON-RPC requests of the cache from generated
+    recordings and timers and counts the requests per method
+    """
+
+    def __init__(self, recordings: int, timers: int, seed: int = 1):
+        self.random = random.Random(seed)
+        self.calls = collections.Counter()
+        self.items = {'recording': {}, 'timer': {}}
+        self.ids = {'recording': 0, 'timer': 0}
+        for _ in range(recordings):
+            self.add('recording')
+        for _ in range(timers):
+            self.add('timer')
+
+    def add(self, media: str) -> int:
+        self.ids[media] += 1
+        item_id = self.ids[media]
+        start = datetime.datetime(2024, 1, 1) + datetime.timedelta(
+            minutes=self.random.randint(0, 60 * 24 * 365))
+        end = (start + datetime.timedelta(minutes=60)).strftime(DATE_FORMAT)
+        start = start.strftime(DATE_FORMAT)
+        if media == 'recording':
+            item = {'recordingid': item_id, 'label': f'Recording {item_id}',
+                    'title': f'Recording {item_id}', 'plot': '',
+                    'plotoutline': '', 'genre': ['News'], 'playcount': 0,
+                    'resume': {'position': 0, 'total': 0},
+                    'channel': 'Channel 1', 'starttime': start,
+                    'endtime': end, 'runtime': 3600, 'icon': '', 'art': {},
+                    'file': f'pvr://recordings/tv/active/{item_id}.pvr',
+                    'radio': False, 'isdeleted': False}
+        else:
+            item = {'timerid': item_id, 'label': f'Timer {item_id}',
+                    'title': f'Timer {item_id}', 'summary': '',
+                    'channelid': 1, 'isradio': False, 'istimerrule': False,
+                    'starttime': start, 'endtime': end, 'state': 'scheduled'}
+        self.items[media][item_id] = item
+        return item_id
+
+    def execute(self, request: str) -> str:
+        request = json.loads(request)
+        method, params = request['method'], request['params']
+        self.calls[method] += 1
+        for media, (list_method, key, id_key, detail, _) in PVR_TYPES.items():
+            if method == list_method:
+                items = sorted(self.items[media].values(),
+                               key=lambda item: item[id_key])
+                limits = params.get('limits', {})
+                page = items[limits.get('start', 0):limits.get('end')]
+                return json.dumps({'id': 1, 'result': {key: page, 'limits': {
+                    'start': limits.get('start', 0),
+                    'end': limits.get('start', 0) + len(page),
+                    'total': len(items)}}})
+            if method == detail:
+                item = self.items[media].get(params[id_key])
+                if item is None:
+                    return json.dumps({'id': 1, 'error': {
+                        'code': -32602, 'message': 'Invalid params.'}})
+                return json.dumps({'id': 1, 'result': {
+                    key[:-1] + 'details': item}})
+        return json.dumps({'id': 1, 'error': {
+            'code': -32601, 'message': 'Method not found.'}})
+
+
+def end_first_timers(backend: FakePvrBackend, cache: PvrCache):
+    """ends the first timers, each leaves a recording"""
+    timers = backend.items['timer']
+    if not timers:
+        return
+    ended = min(timer['endtime'] for timer in timers.values())
+    for timer_id in [timer_id for timer_id, timer in timers.items()
+                     if timer['endtime'] == ended]:
+        del timers[timer_id]
+        backend.add('recording')
+    cache.expire(ended)
+
+
+@pytest.mark.parametrize('size', [100, 5000])
+def test_cache_follows_the_backend_without_list_queries(size):
+    backend = FakePvrBackend(size, max(size // 10, 20))
+    cache = PvrCache(backend.execute)
+    cache.sync('recording')
+    cache.sync('timer')
+    generator = random.Random(2)
+    for step in range(1000):
+        media = generator.choice(('recording', 'timer'))
+        items = backend.items[media]
+        action = generator.random()
+        if action < 0.4:
+            item_id = backend.add(media)
+            cache.notification('PVR.OnUpdate', json.dumps(
+                {'item': {'type': media, 'id': item_id}}))
+        elif action < 0.8 and media == 'recording':
+            item_id = generator.choice(list(items))
+            items[item_id]['playcount'] += 1
+            cache.notification('VideoLibrary.OnUpdate', json.dumps(
+                {'item': {'type': media, 'id': item_id}, 'playcount': 1}))
+        elif action < 0.8:
+            end_first_timers(backend, cache)
+        elif items:
+            item_id = generator.choice(list(items))
+            del items[item_id]
+            cache.notification('PVR.OnRemove', json.dumps(
+                {'item': {'type': media, 'id': item_id}}))
+        if step % 10 == 0:
+            # timers first, the gone ones are looked for in the recordings
+            for synced in ('timer', 'recording'):
+                cache.sync(synced)
+            for synced in PVR_TYPES:
+                assert cache.items[synced] == backend.items[synced], synced
+    # one paged build each, ended timers never fetch the list again
+    pages = -(-size // 1000)
+    assert backend.calls['PVR.GetRecordings'] == pages
+    assert backend.calls['PVR.GetTimers'] == 1
+
+
+def test_recording_not_listed_yet_is_given_up():
+    backend = FakePvrBackend(10, 5)
+    cache = PvrCache(backend.execute)
+    cache.sync('recording')
+    cache.sync('timer')
+    timer = min(backend.items['timer'].values(),
+                key=lambda timer: timer['endtime'])
+    del backend.items['timer'][timer['timerid']]
+    assert cache.expire(timer['endtime'])
+    for _ in range(10):
+        cache.sync('recording')
+    # NEW_IDS details per sync for NEW_SYNCS syncs, then no more queries
+    assert backend.calls['PVR.GetRecordingDetails'] == 15
+    assert backend.calls['PVR.GetRecordings'] == 1
+
+
+def test_other_pvr_notifications_fetch_again():
+    backend = FakePvrBackend(10, 5)
+    cache = PvrCache(backend.execute)
+    cache.sync('recording')
+    assert cache.notification('PVR.OnScanFinished', 'null')
+    cache.sync('recording')
+    assert backend.calls['PVR.GetRecordings'] == 2
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Tests of the replay harness on the fake Kodi
+
+"""
+
+import json
+import os
+import sys
+
+from fakekodi import FakeKodi, SimulatedLibrary
+from soak import SETTINGS, START, kodi_service
+
+
+def test_every_replay_run_fetches_in_full(tmp_path):
+    kodi = FakeKodi(lambda request: library.execute(request), SETTINGS,
+                    str(tmp_path), START)
+    library = SimulatedLibrary(kodi.time)
+    fixture = str(tmp_path / 'fixture.jsonl')
+    with kodi_service(kodi) as service:
+        jsonrpc = service.jsonrpc
+        # record one fetch of each widget, probes included
+        jsonrpc.set_backend(jsonrpc.RECORD, fixture)
+        fetcher = service.Widgets_Fetcher(
+            service.WidgetWindow(service.PropertyRecorder()),
+            jsonrpc.execute, 'test', '')
+        fetcher.settings = service.Widgets_Settings.from_addon(
+            service.__addon__)
+        for request in (service.RECOMMENDED_WIDGETS + service.RANDOM_WIDGETS
+                        + service.RECENT_WIDGETS):
+            fetcher.fetch(request)
+        replayed = []
+        replay = jsonrpc._replay  # pylint: disable=protected-access
+
+        def count(request):
+            replayed.append(json.loads(request))
+            return replay(request)
+
+        jsonrpc._replay = count  # pylint: disable=protected-access
+        sys.argv = ['service.py', f'replay={fixture}']
+        service.Main()
+    # RecentMovie is probed, its full query has to run in every run
+    full = [request for request in replayed
+            if request['method'] == 'VideoLibrary.GetMovies'
+            and request['params']['sort']['method'] == 'dateadded'
+            and request['params']['limits']['end'] > 1]
+    assert len(full) == service.REPLAY_RUNS
+    with open(os.path.join(kodi.translate_path(
+            'special://profile/addon_data/service.skin.widgets'),
+            'replay_report.json'), encoding='utf-8') as report:
+        assert 'RecentMovie.1.Title' in json.load(report)['RecentMovie'][
+            'properties']
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Tests of the shared snapshot with clients sharing a temporary
+directory on one clock
+
+"""
+
+import threading
+
+import pytest
+
+from resources.lib.shared import SharedSnapshot
+
+
+class Clock:
+    """wall clock moved by the tests"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture(name='clock')
+def fixture_clock():
+    return Clock()
+
+
+def client(directory, name: str, clock: Clock, **kwargs) -> SharedSnapshot:
+    return SharedSnapshot(str(directory), name, lease=120, max_age=900,
+                          clock=clock, **kwargs)
+
+
+def test_one_leader_until_the_lease_expires(tmp_path, clock):
+    first, second = client(tmp_path, 'a', clock), client(tmp_path, 'b', clock)
+    assert first.is_leader()
+    assert not second.is_leader()
+    clock.now += 60
+    # renewed after half the lease
+    assert first.is_leader()
+    clock.now += 100
+    assert not second.is_leader()
+    clock.now += 200
+    assert second.is_leader()
+    assert not first.is_leader()
+
+
+def test_snapshot_round_trip_and_max_age(tmp_path, clock):
+    leader, other = client(tmp_path, 'a', clock), client(tmp_path, 'b', clock)
+    leader.store('RecentMovie', {'RecentMovie.1.Title': 'Alien'})
+    assert other.load('RecentMovie') == {'RecentMovie.1.Title': 'Alien'}
+    assert other.load('RandomMovie') is None
+    assert other.times() == {'RecentMovie': 1000.0}
+    clock.now += 901
+    assert other.load('RecentMovie') is None
+    assert other.times() == {}
+
+
+def test_times_change_per_widget(tmp_path, clock):
+    leader, other = client(tmp_path, 'a', clock), client(tmp_path, 'b', clock)
+    leader.store('RecentMovie', {'RecentMovie.1.Title': 'Alien'})
+    leader.store('RecentEpisode', {'RecentEpisode.1.Title': 'Pilot'})
+    seen = other.times()
+    clock.now += 30
+    leader.store('RecentMovie', {'RecentMovie.1.Title': 'Aliens'})
+    times = other.times()
+    assert [request for request in times
+            if times[request] != seen.get(request)] == ['RecentMovie']
+    assert other.changed() > 0
+
+
+def test_wanted_lists_the_other_clients(tmp_path, clock):
+    leader = client(tmp_path, 'a', clock)
+    client(tmp_path, 'b', clock).want(['RecentMovie'])
+    client(tmp_path, 'c', clock).want(['RandomSong', 'RecentMovie'])
+    leader.want(['RecentAlbum'])
+    assert leader.wanted() == {'RecentMovie', 'RandomSong'}
+    clock.now += 901
+    assert leader.wanted() == set()
+
+
+def test_hung_directory_times_out_and_fails_fast(tmp_path, clock):
+    shared = client(tmp_path, 'a', clock, timeout=0.1)
+    release = threading.Event()
+    with pytest.raises(TimeoutError):
+        shared._call(release.wait)  # pylint: disable=protected-access
+    # the hung operation blocks nothing, later ones fail at once
+    with pytest.raises(OSError):
+        shared.is_leader()
+    release.set()
+    shared.hung.join()
+    assert shared.is_leader()
+
+
+def test_unwritable_directory_is_not_leader(tmp_path, clock):
+    assert not client(tmp_path / 'missing', 'a', clock).is_leader()
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Soak test of the service daemon on the fake Kodi for the shortest run
+with a warmup and two weeks to compare, "python3 tests/soak.py --days 90"
+runs months
+
+"""
+
+from soak import WARMUP_DAYS, soak
+
+
+def test_service_state_stays_bounded_for_three_weeks():
+    run = soak(3 * WARMUP_DAYS, verbose=False)
+    assert run.failed == []
+    last = run.samples[-1]
+    # the caches the checks cover were filled by the service
+    assert last['watermark items'] > 0
+    assert last['index items'] > 0
+    assert last['compiled playlists'] == 1
+    assert last['prewarm remembered'] > 0
+    assert run.images > 0
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# pylint: disable=protected-access
+
+"""Tests of the single running service instance on the fake Kodi
+
+"""
+
+import pytest
+
+from fakekodi import FakeKodi, SimulatedLibrary
+from soak import SETTINGS, START, kodi_service
+
+
+@pytest.fixture(name='kodi')
+def fixture_kodi(tmp_path):
+    kodi = FakeKodi(lambda request: library.execute(request), SETTINGS,
+                    str(tmp_path), START)
+    library = SimulatedLibrary(kodi.time)
+    return kodi
+
+
+@pytest.fixture(name='service')
+def fixture_service(kodi):
+    with kodi_service(kodi) as service:
+        yield service
+
+
+def instance(service):
+    """a service instance that has not taken over yet"""
+    main = service.Main.__new__(service.Main)
+    main._init_vars()
+    return main
+
+
+def running(kodi, generation: int, heartbeat: float):
+    """an older instance is running with its last heartbeat at a time"""
+    kodi.properties.update(SkinWidgets_Generation=str(generation),
+                           SkinWidgets_Running='true',
+                           SkinWidgets_Heartbeat=str(heartbeat))
+
+
+def test_first_instance_starts_at_once(kodi, service):
+    main = instance(service)
+    assert main._take_over()
+    assert main.generation == 1 and main._is_owner()
+    assert kodi.properties['SkinWidgets_Running'] == 'true'
+    assert kodi.time() == START
+
+
+def test_waits_for_the_older_instance_to_stop(kodi, service):
+    running(kodi, 3, START)
+    older = instance(service)
+    older.generation = 3
+
+    def tick():
+        # the older instance stops once it lost ownership
+        if not older._is_owner():
+            kodi.properties.pop('SkinWidgets_Running')
+
+    kodi.at(START + 2, tick)
+    main = instance(service)
+    assert main._take_over()
+    assert main.generation == 4
+    assert kodi.time() == START + 2
+    assert kodi.properties['SkinWidgets_Running'] == 'true'
+
+
+def test_takes_over_from_an_instance_without_heartbeat(kodi, service):
+    running(kodi, 3, START)
+    main = instance(service)
+    assert main._take_over()
+    # the older instance hung, waited out its heartbeat timeout only
+    assert START + service.HEARTBEAT_TIMEOUT < kodi.time()
+    assert kodi.time() <= START + service.HEARTBEAT_TIMEOUT + 1
+
+
+def test_newer_instance_wins(kodi, service):
+    running(kodi, 3, START)
+    kodi.at(START + 1, kodi.properties.update, {'SkinWidgets_Generation': '5'})
+    main = instance(service)
+    assert not main._take_over()
+    assert not main._is_owner()
+
+
+def test_heartbeat_keeps_a_busy_instance_alive(kodi, service):
+    main = instance(service)
+    assert main._take_over()
+    kodi.now += service.HEARTBEAT_TIMEOUT * 2
+    main._start_heartbeat()
+    main._stop_heartbeat()
+    assert not main.heartbeat.is_alive()
+    assert float(kodi.properties['SkinWidgets_Heartbeat']) == kodi.time()
+    # a new instance does not mistake it for dead and waits
+    kodi.at(kodi.time() + 3, kodi.properties.pop, 'SkinWidgets_Running')
+    started = kodi.time()
+    assert instance(service)._take_over()
+    assert kodi.time() == started + 3
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+#
+#     Copyright (C) 2012 Team-Kodi
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Tests of the incremental recently added query against a fake library
+
+"""
+
+import json
+
+from resources.lib.watermark import RecentWatermark
+
+QUERY = json.dumps({
+    'jsonrpc': '2.0', 'id': 1, 'method': 'VideoLibrary.GetMovies',
+    'params': {'properties': ['title'],
+               'sort': {'method': 'dateadded', 'order': 'descending'},
+               'limits': {'end': 5}}})
+
+
+class Library:
+    """movies answering GetMovies with an optional dateadded filter"""
+
+    def __init__(self):
+        self.movies = [{'movieid': day, 'title': str(day),
+                        'dateadded': f'2024-01-{day:02d} 10:00:00'}
+                       for day in range(1, 11)]
+        self.queries = []
+
+    def add(self, movieid: int, dateadded: str) -> str:
+        self.movies.append({'movieid': movieid, 'title': str(movieid),
+                            'dateadded': dateadded})
+        return json.dumps({'item': {'type': 'movie', 'id': movieid},
+                           'added': True})
+
+    def execute(self, request: str) -> str:
+        query = json.loads(request)
+        self.queries.append(query)
+        movies = sorted(self.movies, key=lambda movie: movie['dateadded'],
+                        reverse=True)
+        rule = query['params'].get('filter')
+        if rule:
+            movies = [movie for movie in movies
+                      if movie['dateadded'] > rule['value']]
+        end = query['params']['limits']['end']
+        return json.dumps({'result': {'movies': movies[:end]}})
+
+
+def ids(response: str) -> list:
+    return [movie['movieid'] for movie in json.loads(response)['result']['movies']]
+
+
+def test_newer_items_are_merged_incrementally():
+    library = Library()
+    watermark = RecentWatermark(library.execute)
+    watermark.query('RecentMovie', QUERY)
+    data = library.add(11, '2024-01-20 10:00:00')
+    watermark.notification('VideoLibrary.OnUpdate', data)
+    assert ids(watermark.query('RecentMovie', QUERY)) == [11, 10, 9, 8, 7]
+    assert 'filter' in library.queries[-1]['params']
+    assert not watermark.unseen('RecentMovie')
+
+
+def test_item_dated_before_the_mark_requeries_in_full():
+    library = Library()
+    watermark = RecentWatermark(library.execute)
+    watermark.query('RecentMovie', QUERY)
+    # scanned now, dated from an older file time
+    data = library.add(12, '2024-01-09 12:00:00')
+    watermark.notification('VideoLibrary.OnUpdate', data)
+    assert watermark.unseen('RecentMovie')
+    assert ids(watermark.query('RecentMovie', QUERY)) == [10, 12, 9, 8, 7]
+    assert 'filter' not in library.queries[-1]['params']
+    # the full result is the new mark
+    watermark.query('RecentMovie', QUERY)
+    assert 'filter' in library.queries[-1]['params']
+
+
+def test_changes_other_than_additions_invalidate():
+    library = Library()
+    watermark = RecentWatermark(library.execute)
+    watermark.query('RecentMovie', QUERY)
+    watermark.notification('VideoLibrary.OnUpdate', json.dumps(
+        {'item': {'type': 'movie', 'id': 3}, 'playcount': 1}))
+    watermark.query('RecentMovie', QUERY)
+    assert 'filter' not in library.queries[-1]['params']